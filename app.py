@@ -1,19 +1,174 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+from flask import Flask, Response, abort, g, make_response, render_template, request, redirect, session, url_for, flash, jsonify
 from database import Database
-from datetime import datetime
+from visit_queue import VisitQueue
+from live_feed import LiveFeed
+from page_cache import PageCache
+from exports import ExportStream, FORMATS as EXPORT_FORMATS
+from request_profiling import RequestProfiler
+import donation_import
+import benchmark
+import query_plans
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import atexit
+import glob
+import json
 import os
+import uuid
+import click
 
 app = Flask(__name__)
 app.secret_key = os.getenv('SESSION_SECRET', 'your-secret-key-here')
 
 db = Database()
+visit_queue = VisitQueue(
+    db,
+    max_size=int(os.getenv('VISIT_QUEUE_SIZE', 10000)),
+    batch_size=int(os.getenv('VISIT_BATCH_SIZE', 500)),
+    flush_interval=int(os.getenv('VISIT_FLUSH_MS', 200)) / 1000,
+    put_timeout=int(os.getenv('VISIT_ENQUEUE_TIMEOUT_MS', 50)) / 1000,
+)
+atexit.register(visit_queue.stop)
+live_feed = LiveFeed(
+    db,
+    poll_interval=int(os.getenv('LIVE_POLL_MS', 500)) / 1000,
+    keepalive=float(os.getenv('LIVE_KEEPALIVE_SECONDS', 15)),
+    backlog=int(os.getenv('LIVE_BACKLOG', 1000)),
+    max_subscribers=int(os.getenv('LIVE_MAX_SUBSCRIBERS', 10000)),
+)
+atexit.register(live_feed.stop)
+
+def source_stamp():
+    """Newest modification time of the app's code and templates: a deploy
+    that changes how pages render changes their versions"""
+    paths = glob.glob(os.path.join(app.root_path, '*.py')) + \
+        glob.glob(os.path.join(app.root_path, app.template_folder, '*.html'))
+    return str(max(os.path.getmtime(path) for path in paths))
+
+page_cache = PageCache(
+    db,
+    ttl=int(os.getenv('PAGE_VERSION_TTL', 60)),
+    salt=os.getenv('PAGE_VERSION_SALT') or source_stamp(),
+)
+profiler = RequestProfiler(
+    sample_every=int(os.getenv('PROFILE_SAMPLE_EVERY', 0)),
+    header_token=os.getenv('PROFILE_HEADER_TOKEN') or None,
+    keep=int(os.getenv('PROFILE_KEEP', 50)),
+    window=int(os.getenv('PROFILE_WINDOW', 1000)),
+)
+profiler.init_app(app, db.metrics)
+import_chunk_size = int(os.getenv('DONATION_IMPORT_CHUNK_SIZE', 1000))
+idempotency_ttl_hours = int(os.getenv('DONATION_IDEMPOTENCY_TTL_HOURS', 24))
+leaderboard_periods = {'all': 'All time', '24h': '24 hours', '7d': '7 days', '30d': '30 days'}
+trend_days = int(os.getenv('TREND_DAYS', 30))
+fundraiser_events_keep = int(os.getenv('FUNDRAISER_EVENTS_KEEP', 100000))
+
+@app.before_request
+def restore_last_write():
+    """Read-your-writes: reads of this request see the session's last donation or visit"""
+    g.last_write = session.get('last_write')
+    db.read_after(g.last_write)
+
+@app.after_request
+def save_last_write(response):
+    written = db.last_write()
+    if written != g.get('last_write'):
+        session['last_write'] = written
+    return response
+
+def page_args():
+    """Keyset pagination arguments shared by the list pages"""
+    return {
+        'cursor': request.args.get('cursor'),
+        'direction': request.args.get('direction', 'next'),
+        'limit': request.args.get('limit', type=int),
+    }
+
+def trend_range():
+    """(date_from, date_to) of the daily trend charts: the last ``TREND_DAYS`` days"""
+    today = datetime.now().date()
+    return (today - timedelta(days=trend_days - 1)).isoformat(), today.isoformat()
+
+def page_version(*tags, extra=()):
+    """Version of the page about to be rendered from reads tagged ``tags``
+    (see page_cache.py), or None when it must not be reused: the page
+    shows flashed messages, or the session's last write may not be
+    reflected in the counters yet"""
+    if '_flashes' in session or db.reading_own_writes():
+        return None
+    # Taken before the route's reads: a page built across a database error
+    # gets no validators
+    g.page_errors = db.error_count()
+    return page_cache.version(tags, datetime.now().date().isoformat(), *extra)
+
+def not_modified(version):
+    """A 304 for a browser whose copy of the page (If-None-Match, else
+    If-Modified-Since) is still ``version``; None when it has to be rendered"""
+    if version is None:
+        return None
+    if request.if_none_match:
+        current = request.if_none_match.contains_weak(version.etag)
+    else:
+        since = request.if_modified_since
+        current = since is not None and version.last_modified <= since.timestamp()
+    if not current:
+        return None
+    page_cache.count_not_modified()
+    return versioned(Response(status=304), version)
+
+def versioned(response, version):
+    """Send ``version`` as the page's validators; browsers revalidate every
+    time. A page whose reads hit a database error is not stored at all."""
+    response = make_response(response)
+    if version is not None and db.error_count() != g.page_errors:
+        response.headers['Cache-Control'] = 'no-store'
+    elif version is not None:
+        response.set_etag(version.etag, weak=True)
+        response.last_modified = version.last_modified
+        response.headers['Cache-Control'] = 'private, no-cache'
+        response.vary.add('Cookie')
+    return response
+
+def page_fragments(version, tags_by_name, *extra):
+    """The cached fragments of this render, for ``fragment()`` in its template"""
+    g.page_fragments = page_cache.fragments(version, tags_by_name, *extra)
+    return g.page_fragments
+
+@app.template_global()
+def fragment(name, caller):
+    """``{% call fragment(name) %}...{% endcall %}``: the block's cached HTML
+    when the route found it, else the block rendered (and cached)"""
+    fragments = g.get('page_fragments')
+    if fragments is None:
+        return caller()
+    return fragments.render(name, caller)
+
+def export_response(export, name):
+    """Stream ``export(date_from, date_to, fundraiser_no)`` as CSV or NDJSON (?format=)"""
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'message': 'format must be csv or ndjson'}), 400
+    stream = export(
+        date_from=request.args.get('date_from') or None,
+        date_to=request.args.get('date_to') or None,
+        fundraiser_no=request.args.get('fundraiser_no', type=int),
+    )
+    body = ExportStream(stream, fmt)
+    filename = f"{name}-{datetime.now():%Y%m%d-%H%M%S}.{fmt}"
+    return Response(body, mimetype=EXPORT_FORMATS[fmt], headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'Cache-Control': 'no-store',
+        'X-Accel-Buffering': 'no',
+    })
 
 @app.route('/')
 def index():
-    stats = db.get_dashboard_stats()
-    recent_transactions = db.get_recent_transactions()
-    top_fundraisers = db.get_top_fundraisers()
-    return render_template('index.html', stats=stats, recent_transactions=recent_transactions, top_fundraisers=top_fundraisers)
+    data = db.gather(
+        stats=(db.get_dashboard_stats,),
+        recent_transactions=(db.get_recent_transactions,),
+        top_fundraisers=(db.get_top_fundraisers,),
+    )
+    return render_template('index.html', live_seq=live_feed.seq, **data)
 
 @app.route('/administrators')
 def administrators():
@@ -73,8 +228,8 @@ def add_admin_phone(admin_id):
 
 @app.route('/donors')
 def donors():
-    donors_list = db.get_all_donors()
-    return render_template('donors.html', donors=donors_list)
+    page = db.get_donors_page(**page_args())
+    return render_template('donors.html', page=page)
 
 @app.route('/donors/add', methods=['GET', 'POST'])
 def add_donor():
@@ -120,26 +275,63 @@ def delete_donor(donor_id):
 
 @app.route('/donors/<int:donor_id>')
 def donor_details(donor_id):
-    donor = db.get_donor(donor_id)
-    transactions = db.get_donor_transactions(donor_id)
-    visits = db.get_donor_visits(donor_id)
-    analytics = db.get_donor_interest_analytics(donor_id)
-    # Get all active fundraisers for the donor to explore
-    available_fundraisers = db.fetch_all(
-        """SELECT f.fundraiser_no, f.title, f.description, f.goal_amount, f.raised_amount, 
-                  f.deadline, f.status, 
-                  ROUND((f.raised_amount / f.goal_amount * 100), 2) as progress
-           FROM Fundraiser f
-           WHERE f.status = 'Active'
-           ORDER BY f.deadline ASC"""
+    version = page_version(f'donor:{donor_id}', 'fundraisers')
+    cached = not_modified(version)
+    if cached:
+        return cached
+    fragments = page_fragments(version, {
+        'transactions': (f'donor:{donor_id}',),
+        'visits': (f'donor:{donor_id}',),
+        'analytics': (f'donor:{donor_id}',),
+        'available_fundraisers': ('fundraisers',),
+    }, donor_id)
+    data = db.gather(
+        donor=(db.get_donor, donor_id),
+        **fragments.missing(
+            transactions=(db.get_donor_transactions, donor_id),
+            visits=(db.get_donor_visits, donor_id),
+            analytics=(db.get_donor_interest_analytics, donor_id),
+            # All active fundraisers for the donor to explore
+            available_fundraisers=(db.get_active_fundraisers,),
+        ),
     )
-    return render_template('donor_details.html', donor=donor, transactions=transactions, 
-                         visits=visits, analytics=analytics, available_fundraisers=available_fundraisers)
+    return versioned(render_template('donor_details.html', **data), version)
 
 @app.route('/fundraisers')
 def fundraisers():
-    fundraisers_list = db.get_all_fundraisers()
-    return render_template('fundraisers.html', fundraisers=fundraisers_list)
+    filters = {
+        'status': request.args.get('status') or None,
+        'admin_id': request.args.get('admin_id', type=int),
+    }
+    page = db.get_fundraisers_page(**filters, **page_args())
+    return render_template('fundraisers.html', page=page, filters=filters)
+
+@app.route('/search')
+def search():
+    """Full-text search over fundraisers (with status, administrator and
+    deadline facets) or donors; ``?format=json`` returns the results as JSON"""
+    q = ' '.join(request.args.get('q', '').split())
+    kind = 'donors' if request.args.get('type') == 'donors' else 'fundraisers'
+    filters = {
+        'status': request.args.get('status') or None,
+        'admin_id': request.args.get('admin_id', type=int),
+        'deadline': request.args.get('deadline') or None,
+    }
+    limit = request.args.get('limit', type=int)
+    if kind == 'donors':
+        found = db.search_donors(q, limit=limit)
+    else:
+        found = db.search_fundraisers(q, **filters, limit=limit)
+    if request.args.get('format') == 'json':
+        return jsonify({'type': kind, **found})
+    return render_template('search.html', found=found, kind=kind, filters=filters)
+
+@app.route('/search/suggest')
+def search_suggest():
+    """Typeahead for the navbar search box: fundraiser titles and donor names
+    matching a partly typed query"""
+    q = ' '.join(request.args.get('q', '').split()).lower()
+    return jsonify(db.suggest(q, limit=max(1, min(request.args.get('limit', 8, type=int), 20))))
 
 @app.route('/fundraisers/add', methods=['GET', 'POST'])
 def add_fundraiser():
@@ -197,95 +389,274 @@ def fundraiser_details(fundraiser_no):
     # Get donor_id from session or query parameter for visit tracking
     donor_id = request.args.get('donor_id', type=int)
     
-    # Record visit if donor_id is provided
+    # Record visit if donor_id is provided (buffered; written in the next batch)
     if donor_id:
-        db.record_fundraiser_visit(donor_id, fundraiser_no, 5)  # Default 5 min duration
+        visit_queue.submit(donor_id, fundraiser_no, 5)  # Default 5 min duration
     
-    fundraiser = db.get_fundraiser(fundraiser_no)
-    summary = db.get_fundraiser_summary(fundraiser_no)
-    transactions = db.get_fundraiser_transactions(fundraiser_no)
-    payrolls = db.get_fundraiser_payrolls(fundraiser_no)
-    visits = db.get_fundraiser_visits(fundraiser_no)
-    return render_template('fundraiser_details.html', fundraiser=fundraiser, summary=summary, transactions=transactions, payrolls=payrolls, visits=visits)
+    version = page_version(f'fundraiser:{fundraiser_no}', 'rollups', extra=(session.get('donor_id'),))
+    cached = not_modified(version)
+    if cached:
+        return cached
+    fragments = page_fragments(version, {
+        'transactions': (f'fundraiser:{fundraiser_no}',),
+        'payrolls': (f'fundraiser:{fundraiser_no}',),
+        'visits': (f'fundraiser:{fundraiser_no}',),
+    })
+    data = db.gather(
+        fundraiser=(db.get_fundraiser, fundraiser_no),
+        summary=(db.get_fundraiser_summary, fundraiser_no),
+        trend=(db.get_fundraiser_trend, fundraiser_no, *trend_range()),
+        **fragments.missing(
+            transactions=(db.get_fundraiser_transactions, fundraiser_no),
+            payrolls=(db.get_fundraiser_payrolls, fundraiser_no),
+            visits=(db.get_fundraiser_visits, fundraiser_no),
+        ),
+    )
+    return versioned(render_template('fundraiser_details.html', trend_days=trend_days, live_seq=live_feed.seq,
+                                     **data), version)
 
 @app.route('/transactions')
 def transactions():
-    transactions_list = db.get_all_transactions()
-    return render_template('transactions.html', transactions=transactions_list)
+    filters = {
+        'date_from': request.args.get('date_from') or None,
+        'date_to': request.args.get('date_to') or None,
+        'fundraiser_no': request.args.get('fundraiser_no', type=int),
+        'donor_id': request.args.get('donor_id', type=int),
+        'payment_mode': request.args.get('payment_mode') or None,
+    }
+    page = db.get_transactions_page(**filters, **page_args())
+    return render_template('transactions.html', page=page, filters=filters)
 
 @app.route('/transactions/add', methods=['GET', 'POST'])
 def add_transaction():
+    """Record a donation.
+
+    The form carries an ``idempotency_key`` (API clients may send an
+    ``Idempotency-Key`` header instead), so a resubmitted or retried POST
+    returns the original donation instead of creating a second one.
+    """
     if request.method == 'POST':
         donor_id = request.form.get('donor_id')
         fundraiser_no = request.form.get('fundraiser_no')
         amount = request.form.get('amount')
         payment_mode = request.form.get('payment_mode')
+        idempotency_key = request.headers.get('Idempotency-Key') or request.form.get('idempotency_key') or None
         
-        result = db.process_donation(donor_id, fundraiser_no, amount, payment_mode)
+        if idempotency_key and len(idempotency_key) > 64:
+            result = {'success': False, 'message': 'Idempotency key must be at most 64 characters'}
+        else:
+            result = db.process_donation(donor_id, fundraiser_no, amount, payment_mode,
+                                         idempotency_key=idempotency_key)
         if result['success']:
             if 'data' in result:
                 data = result['data']
                 flash(f'Donation processed successfully! Platform fee: ₹{data.get("Platform_Fee_1_Percent", 0):.2f} | Admin receives: ₹{data.get("Admin_Receives_Via_Payroll", 0):.2f}', 'success')
             else:
                 flash('Donation processed successfully!', 'success')
+            if result.get('replayed'):
+                flash('This donation had already been submitted; no duplicate was created.', 'info')
             return redirect(url_for('transactions'))
         else:
             flash(f'Error: {result["message"]}', 'danger')
     
     donors_list = db.get_all_donors()
-    fundraisers_list = db.get_all_fundraisers()
-    return render_template('add_transaction.html', donors=donors_list, fundraisers=fundraisers_list)
+    fundraisers_list = db.get_fundraiser_options()
+    return render_template('add_transaction.html', donors=donors_list, fundraisers=fundraisers_list,
+                           idempotency_key=uuid.uuid4().hex)
+
+@app.route('/transactions/import', methods=['POST'])
+def import_transactions():
+    """Bulk-import donations from the request body.
+
+    The body is CSV (text/csv), NDJSON (application/x-ndjson) or a JSON
+    array (application/json); ``?format=`` overrides the content type.
+    Invalid rows are skipped and listed in the report.
+    """
+    formats = {'text/csv': 'csv', 'application/x-ndjson': 'ndjson', 'application/json': 'json'}
+    fmt = request.args.get('format') or formats.get(request.mimetype)
+    if fmt not in donation_import.FORMATS:
+        return jsonify({'success': False, 'message': 'Send CSV, NDJSON or a JSON array, or pass ?format='}), 400
+    report = donation_import.import_file(db, request.stream, fmt, chunk_size=import_chunk_size)
+    return jsonify({'success': 'aborted' not in report, **report}), 200 if 'aborted' not in report else 400
+
+@app.route('/transactions/export')
+def export_transactions():
+    return export_response(db.export_transactions, 'transactions')
 
 @app.route('/payroll')
 def payroll():
-    payroll_list = db.get_all_payroll()
-    return render_template('payroll.html', payroll=payroll_list)
+    filters = {
+        'date_from': request.args.get('date_from') or None,
+        'date_to': request.args.get('date_to') or None,
+        'fundraiser_no': request.args.get('fundraiser_no', type=int),
+        'admin_id': request.args.get('admin_id', type=int),
+    }
+    page = db.get_payroll_page(**filters, **page_args())
+    return render_template('payroll.html', page=page, filters=filters)
 
 @app.route('/administrators/<int:admin_id>/earnings')
 def admin_earnings(admin_id):
-    admin = db.get_administrator(admin_id)
-    earnings = db.get_administrator_earnings(admin_id)
-    payrolls = db.fetch_all(
-        "SELECT p.*, f.title as fundraiser_title FROM Payroll p JOIN Fundraiser f ON p.fundraiser_no = f.fundraiser_no WHERE p.Admin_id = %s ORDER BY p.payout_date DESC",
-        (admin_id,)
+    data = db.gather(
+        admin=(db.get_administrator, admin_id),
+        earnings=(db.get_administrator_earnings, admin_id),
+        payrolls=(db.get_administrator_payrolls, admin_id),
     )
-    return render_template('admin_earnings.html', admin=admin, earnings=earnings, payrolls=payrolls)
+    return render_template('admin_earnings.html', **data)
+
+@app.route('/payroll/export')
+def export_payroll():
+    return export_response(db.export_payroll, 'payroll')
 
 @app.route('/visits')
 def visits():
-    visits_list = db.get_all_visits()
-    return render_template('visits.html', visits=visits_list)
+    filters = {
+        'date_from': request.args.get('date_from') or None,
+        'date_to': request.args.get('date_to') or None,
+        'fundraiser_no': request.args.get('fundraiser_no', type=int),
+        'donor_id': request.args.get('donor_id', type=int),
+    }
+    page = db.get_visits_page(**filters, **page_args())
+    return render_template('visits.html', page=page, filters=filters)
+
+@app.route('/visits/export')
+def export_visits():
+    return export_response(db.export_visits, 'visits')
 
 @app.route('/record_visit', methods=['POST'])
 def record_visit():
-    """API endpoint to record visits via AJAX"""
+    """API endpoint to record visits via AJAX / sendBeacon.
+
+    The visit is queued and written in the next batch, so this returns 202
+    without waiting on MySQL, or 503 if the queue is full.
+    """
     donor_id = request.form.get('donor_id', type=int)
     fundraiser_no = request.form.get('fundraiser_no', type=int)
     duration = request.form.get('duration', type=int, default=5)
     
     if donor_id and fundraiser_no:
-        result = db.record_fundraiser_visit(donor_id, fundraiser_no, duration)
-        if result['success']:
-            return jsonify({'success': True, 'data': result.get('data', {})})
-        else:
-            return jsonify({'success': False, 'message': result.get('message', 'Failed to record visit')})
+        if duration < 0:
+            return jsonify({'success': False, 'message': 'Visit duration cannot be negative'}), 400
+        if visit_queue.submit(donor_id, fundraiser_no, duration):
+            return jsonify({'success': True, 'queued': True}), 202
+        response = jsonify({'success': False, 'message': 'Visit queue is full, retry later'})
+        response.headers['Retry-After'] = '1'
+        return response, 503
     return jsonify({'success': False, 'message': 'Missing parameters'})
 
+@app.route('/pool_stats')
+def pool_stats():
+    """Connection pool usage for this worker process"""
+    return jsonify(db.pool_stats())
+
+def live_response(fundraiser_no=None):
+    """Server-Sent Events stream of live progress, resuming after ``?since=``
+    or the browser's Last-Event-ID"""
+    body = live_feed.stream(fundraiser_no, request.args.get('since', type=int),
+                            request.headers.get('Last-Event-ID', type=int))
+    if body is None:
+        return Response('Too many live streams, retry later\n', status=503, mimetype='text/plain',
+                        headers={'Retry-After': '5'})
+    return Response(body, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-store',
+        'X-Accel-Buffering': 'no',
+    })
+
+@app.route('/live')
+def live():
+    return live_response()
+
+@app.route('/live/fundraisers/<int:fundraiser_no>')
+def live_fundraiser(fundraiser_no):
+    return live_response(fundraiser_no)
+
+@app.route('/live_stats')
+def live_stats():
+    return jsonify(live_feed.stats())
+
+@app.route('/page_cache_stats')
+def page_cache_stats():
+    """Page versions served, 304s and fragment cache hits for this worker process"""
+    return jsonify(page_cache.stats())
+
+@app.route('/visit_queue_stats')
+def visit_queue_stats():
+    """Visit ingestion queue depth and flush latency for this worker process"""
+    return jsonify(visit_queue.stats())
+
+@app.route('/cache_stats')
+def cache_stats():
+    """Query result cache hit ratio and size for this worker process"""
+    return jsonify(db.cache_stats())
+
+@app.route('/metrics')
+def metrics():
+    """Query latency histograms and pool/cache counters for this worker process, in Prometheus text format"""
+    return Response(db.metrics_text(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/slow_queries')
+def slow_queries():
+    """Most recent slow-query log entries (with EXPLAIN plans) for this worker process"""
+    return jsonify(db.slow_queries())
+
+@app.route('/debug/perf')
+def debug_perf():
+    """Per-route p50/p95/p99 with their DB/render/Python split, and the recorded span trees"""
+    routes = profiler.route_stats()
+    profiles = profiler.profiles()
+    if request.args.get('format') == 'json':
+        return jsonify({'routes': routes, 'profiles': profiles})
+    return render_template('debug_perf.html', routes=routes, profiles=profiles, profiler=profiler)
+
+@app.route('/debug/perf/<profile_id>.<fmt>')
+def debug_perf_profile(profile_id, fmt):
+    """One span tree as Chrome trace JSON (.json) or folded stacks for flamegraphs (.folded)"""
+    trace = profiler.get(profile_id)
+    if trace is None or fmt not in ('json', 'folded'):
+        abort(404)
+    if fmt == 'json':
+        return jsonify(trace.chrome_trace())
+    return Response(trace.folded(), mimetype='text/plain')
+
 @app.route('/reports')
 def reports():
-    top_donors = db.get_top_donors()
-    fundraiser_progress = db.get_fundraiser_progress()
-    platform_stats = db.get_platform_statistics()
-    high_interest_donors = db.get_high_interest_donors_view()
-    return render_template('reports.html', top_donors=top_donors, fundraiser_progress=fundraiser_progress, 
-                         platform_stats=platform_stats, high_interest_donors=high_interest_donors)
+    period = request.args.get('period', 'all')
+    if period not in leaderboard_periods:
+        period = 'all'
+    version = page_version('stats', 'rollups', 'leaderboards', 'transactions', 'fundraisers', 'visits',
+                           extra=(period,))
+    cached = not_modified(version)
+    if cached:
+        return cached
+    # The trends cover the last TREND_DAYS days: their fragments vary with the date
+    fragments = page_fragments(version, {
+        'platform_stats': ('stats',),
+        'trend': ('rollups',),
+        'payment_modes': ('rollups',),
+        'top_donors': ('leaderboards', 'transactions'),
+        'top_fundraisers': ('leaderboards', 'transactions'),
+        'fundraiser_progress': ('fundraisers',),
+        'high_interest_donors': ('visits',),
+    }, period, datetime.now().date().isoformat())
+    data = db.gather(**fragments.missing(
+        top_donors=(db.get_leaderboard, 'donor', period),
+        top_fundraisers=(db.get_leaderboard, 'fundraiser', period),
+        fundraiser_progress=(db.get_fundraiser_progress,),
+        platform_stats=(db.get_platform_statistics,),
+        high_interest_donors=(db.get_high_interest_donors_view,),
+        trend=(db.get_platform_trend, *trend_range()),
+        payment_modes=(db.get_payment_mode_trend, *trend_range()),
+    ))
+    return versioned(render_template('reports.html', period=period, trend_days=trend_days,
+                                     leaderboard_periods=leaderboard_periods.items(), **data), version)
 
 @app.route('/fundraisers/<int:fundraiser_no>/audit')
 def fundraiser_audit(fundraiser_no):
-    fundraiser = db.get_fundraiser(fundraiser_no)
-    audit_trail = db.view_audit_trail(fundraiser_no)
-    visit_history = db.view_visit_history(fundraiser_no)
-    return render_template('fundraiser_audit.html', fundraiser=fundraiser, audit_trail=audit_trail, visit_history=visit_history)
+    data = db.gather(
+        fundraiser=(db.get_fundraiser, fundraiser_no),
+        audit_trail=(db.view_audit_trail, fundraiser_no),
+        visit_history=(db.view_visit_history, fundraiser_no),
+    )
+    return render_template('fundraiser_audit.html', **data)
 
 @app.route('/transactions/<int:transaction_id>/details')
 def transaction_details(transaction_id):
@@ -294,15 +665,369 @@ def transaction_details(transaction_id):
 
 @app.route('/analytics/views')
 def analytics_views():
-    active_fundraisers = db.get_active_fundraisers_view()
-    transaction_summary = db.get_transaction_summary_view()
-    donor_engagement = db.get_donor_engagement_view()
-    admin_dashboard = db.get_administrator_dashboard_view()
-    return render_template('analytics_views.html', 
-                         active_fundraisers=active_fundraisers,
-                         transaction_summary=transaction_summary,
-                         donor_engagement=donor_engagement,
-                         admin_dashboard=admin_dashboard)
+    data = db.gather(
+        active_fundraisers=(db.get_active_fundraisers_view,),
+        transaction_summary=(db.get_transaction_summary_view,),
+        donor_engagement=(db.get_donor_engagement_view,),
+        admin_dashboard=(db.get_administrator_dashboard_view,),
+    )
+    return render_template('analytics_views.html', **data)
+
+@app.cli.command('reconcile-counters')
+def reconcile_counters():
+    """Rebuild the PlatformCounters row from the base tables"""
+    result = db.reconcile_platform_counters()
+    if result['success']:
+        print('Platform counters reconciled.')
+    else:
+        print(f'Error: {result["message"]}')
+
+@app.cli.command('refresh-summaries')
+def refresh_summaries():
+    """Rebuild the reporting summary tables from the live views"""
+    result = db.refresh_summary_tables()
+    if result['success']:
+        print('Summary tables refreshed.')
+    else:
+        print(f'Error: {result["message"]}')
+        raise SystemExit(1)
+
+@app.cli.command('import-donations')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(donation_import.FORMATS),
+              help='Input format (default: from the file extension)')
+@click.option('--chunk-size', default=import_chunk_size, show_default=True, help='Rows per transaction')
+def import_donations(path, fmt, chunk_size):
+    """Bulk-import donations (e.g. offline/cheque backfills) from a CSV, NDJSON or JSON file"""
+    fmt = fmt or {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson', '.json': 'json'}.get(
+        os.path.splitext(path)[1].lower(), 'csv')
+    with open(path, encoding='utf-8-sig', newline='') as stream:
+        report = donation_import.import_file(db, stream, fmt, chunk_size=chunk_size, max_errors=100000)
+    for error in report['errors']:
+        print(f"row {error['row']}: {error['message']}")
+    print(f"{report['imported']} of {report['rows']} rows imported in {report['chunks']} chunks "
+          f"({report['failed']} failed, {report['elapsed_seconds']}s)")
+    if 'aborted' in report:
+        print(f"Import stopped: {report['aborted']}")
+    if report['failed'] or 'aborted' in report:
+        raise SystemExit(1)
+
+@app.cli.command('refresh-leaderboards')
+@click.option('--rebuild', is_flag=True, help='First rebuild the hourly donor buckets of the last 30 days from Transactions')
+def refresh_leaderboards(rebuild):
+    """Re-rank the 24h/7d/30d leaderboards now"""
+    result = db.refresh_leaderboards(rebuild=rebuild)
+    if not result['success']:
+        print(f'Error: {result["message"]}')
+        raise SystemExit(1)
+    for board, entries in result['entries'].items():
+        print(f"{board}: {entries} ranked")
+
+@app.cli.command('backfill-rollups')
+@click.option('--since', help='First day to rebuild (YYYY-MM-DD)  [default: the oldest donation or visit]')
+@click.option('--until', help='Last day to rebuild (YYYY-MM-DD)  [default: today]')
+def backfill_rollups(since, until):
+    """Rebuild the hourly donation and visit rollups from Transactions and Visits"""
+    since = since or db.first_activity_date()
+    until = until or datetime.now().date().isoformat()
+    if since is None:
+        print('Error: Database connection failed')
+        raise SystemExit(1)
+    for day, result in db.rebuild_hourly_stats(since, until):
+        if not result['success']:
+            print(f'Error: {day}: {result["message"]}')
+            raise SystemExit(1)
+        print(f"{day}: rebuilt")
+
+@app.cli.command('sweep-idempotency-keys')
+@click.option('--older-than-hours', default=idempotency_ttl_hours, show_default=True,
+              help='Delete keys created more than this many hours ago')
+def sweep_idempotency_keys(older_than_hours):
+    """Delete expired donation idempotency keys"""
+    result = db.sweep_idempotency_keys(older_than_hours)
+    if result['success']:
+        print(f"{result['deleted']} idempotency keys deleted.")
+    else:
+        print(f'Error: {result["message"]}')
+        raise SystemExit(1)
+
+@app.cli.command('sweep-fundraiser-events')
+@click.option('--keep', default=fundraiser_events_keep, show_default=True,
+              help='Newest events to keep on each node')
+def sweep_fundraiser_events(keep):
+    """Trim the FundraiserEvents live-progress outbox"""
+    result = db.sweep_fundraiser_events(keep)
+    if result['success']:
+        print(f"{result['deleted']} fundraiser events deleted.")
+    else:
+        print(f'Error: {result["message"]}')
+        raise SystemExit(1)
+
+@app.cli.command('check-summaries')
+def check_summaries():
+    """Compare the reporting summary tables against the live views"""
+    result = db.check_summary_tables()
+    if not result['success']:
+        print(f'Error: {result["message"]}')
+        raise SystemExit(1)
+    drift = False
+    for view in result['views']:
+        print(f"{view['view']}: {view['rows']} rows, {len(view['mismatches'])} mismatches")
+        for mismatch in view['mismatches']:
+            print(f"  {mismatch}")
+        drift = drift or bool(view['mismatches'])
+    if drift:
+        print('Run `flask --app app refresh-summaries` to rebuild.')
+        raise SystemExit(1)
+
+@app.cli.command('check-donation-concurrency')
+@click.argument('fundraiser_no', type=int)
+@click.option('--donations', default=200, show_default=True, help='Donations to fire')
+@click.option('--concurrency', default=10, show_default=True, help='Donations in flight at once')
+@click.option('--amount', default='10.00', show_default=True, help='Amount of each donation')
+@click.option('--donor-id', 'donor_ids', type=int, multiple=True, help='Donors to rotate through (default: all)')
+def check_donation_concurrency(fundraiser_no, donations, concurrency, amount, donor_ids):
+    """Fire parallel donations at one fundraiser, then verify its totals.
+
+    Writes real donations: run it against a test database. Fails on any
+    deadlock or lock timeout and on any total that does not add up.
+    Donations rejected because the goal was reached are expected.
+    """
+    donor_ids = donor_ids or [donor['donor_id'] for donor in db.get_all_donors()]
+    if not donor_ids:
+        print('Error: no donors to donate with')
+        raise SystemExit(1)
+
+    def donate(i):
+        return db.process_donation(donor_ids[i % len(donor_ids)], fundraiser_no, amount,
+                                   'Concurrency Check', retries=1)
+
+    start = datetime.now()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(donate, range(donations)))
+    elapsed = (datetime.now() - start).total_seconds()
+
+    accepted = sum(result['success'] for result in results)
+    lock_errors = [result for result in results if result.get('retryable')]
+    rejected = {}
+    for result in results:
+        if not result['success'] and not result.get('retryable'):
+            rejected[result['message']] = rejected.get(result['message'], 0) + 1
+    print(f"{accepted} of {donations} donations accepted in {elapsed:.2f}s "
+          f"({donations / elapsed if elapsed else 0:.0f}/s at concurrency {concurrency})")
+    for message, count in rejected.items():
+        print(f"  {count} rejected: {message}")
+    for result in lock_errors:
+        print(f"  lock error: {result['message']}")
+
+    check = db.check_donation_totals(fundraiser_no)
+    if not check['success']:
+        print(f'Error: {check["message"]}')
+        raise SystemExit(1)
+    fundraiser = check['fundraiser']
+    print(f"Fundraiser {fundraiser_no}: raised {fundraiser['raised_amount']} of {fundraiser['goal_amount']} "
+          f"({fundraiser['status']}), {fundraiser['transactions']} transactions")
+    for problem in check['problems']:
+        print(f"  MISMATCH {problem['check']}: {problem['actual']} (expected {problem['expected']})")
+    if lock_errors or check['problems']:
+        raise SystemExit(1)
+
+@app.cli.command('migrate-indexes')
+@click.option('--keep-redundant', is_flag=True, help='Do not drop indexes that duplicate a UNIQUE key')
+def migrate_indexes(keep_redundant):
+    """Add the composite/covering index pack to an existing database (online, re-runnable)"""
+    report = query_plans.migrate_indexes(db, drop_redundant=not keep_redundant)
+    if not report:
+        print('Indexes up to date.')
+    for change in report:
+        print(f"{change['change']}: {'ok' if change['success'] else 'Error: ' + change['message']}")
+        if not change['success']:
+            raise SystemExit(1)
+
+@app.cli.command('check-query-plans')
+@click.option('--verbose', is_flag=True, help='Print every plan, not just the failing ones')
+def check_query_plans(verbose):
+    """EXPLAIN the app's queries and fail on any full table scan or filesort.
+
+    Run it against a seeded benchmark database: on near-empty tables the
+    optimizer scans everything.
+    """
+    report = query_plans.check_plans(db)
+    failed = [entry for entry in report if entry['problems']]
+    for entry in report:
+        if not entry['problems'] and not verbose:
+            continue
+        print(f"{'FAIL' if entry['problems'] else 'ok'}   {entry['name']}")
+        for problem in entry['problems']:
+            print(f"       {problem}")
+        for step in (step for step in entry['plan'] if 'error' not in step):
+            print(f"       {step.get('table')}: type={step.get('type')} key={step.get('key')} "
+                  f"rows={step.get('rows')} extra={step.get('Extra')}")
+    print(f"{len(report)} plans checked, {len(failed)} failing.")
+    if failed:
+        raise SystemExit(1)
+
+@app.cli.command('check-replicas')
+def check_replicas():
+    """Check every read replica's health and replication lag now"""
+    if not db.replicas:
+        print('No replicas configured (DB_REPLICA_HOSTS)')
+        return
+    replicas = db.check_replicas()
+    for replica in replicas:
+        state = 'healthy' if replica['healthy'] else f"unhealthy: {replica['error']}"
+        lag = '-' if replica['lag_seconds'] is None else f"{replica['lag_seconds']}s"
+        print(f"{replica['replica']:<30} lag {lag:>6}  {state}")
+    if not any(replica['healthy'] for replica in replicas):
+        print('Error: no healthy replica; reads go to the primary')
+        raise SystemExit(1)
+
+@app.cli.command('check-shards')
+def check_shards():
+    """Check every shard node's settings, fundraisers and reference data against the directory"""
+    if not db.shards:
+        print('No shard nodes configured (DB_SHARD_HOSTS)')
+        return
+    result = db.check_shards()
+    for node in result['nodes']:
+        counts = (f"{node['fundraisers']} fundraisers, {node['donors']} donors, "
+                  f"{node['administrators']} administrators" if 'fundraisers' in node else '')
+        print(f"node {node['node']} {node['name']:<30} {counts}")
+        for problem in node['problems']:
+            print(f"  {problem}")
+    if not result['ok']:
+        raise SystemExit(1)
+
+@app.cli.command('reshard')
+@click.option('--init-node', type=int, help='Empty a new shard node and copy the reference data to it')
+@click.option('--sync-node', type=int, help="Copy node 0's donors and administrators to a shard node")
+@click.option('--move', type=int, multiple=True, help='Fundraiser to move (repeatable; with --to)')
+@click.option('--to', 'target', type=int, help='Node to move the --move fundraisers to')
+@click.option('--rebalance', is_flag=True, help='Move fundraisers until every node holds about as many')
+@click.option('--cleanup', is_flag=True, help='Delete fundraisers left behind by interrupted moves')
+@click.option('--dry-run', is_flag=True, help='Print the moves without making them')
+def reshard(init_node, sync_node, move, target, rebalance, cleanup, dry_run):
+    """Prepare shard nodes and move fundraisers between them"""
+    if not db.shards:
+        print('Error: no shard nodes configured (DB_SHARD_HOSTS)')
+        raise SystemExit(1)
+    if move and target is None:
+        print('Error: --move needs --to')
+        raise SystemExit(1)
+    
+    def check(result, done):
+        if not result['success']:
+            print(f'Error: {result["message"]}')
+            raise SystemExit(1)
+        print(done)
+    
+    if init_node is not None:
+        if dry_run:
+            print(f"would initialize node {init_node}")
+        else:
+            check(db.init_shard_node(init_node), f"node {init_node}: initialized")
+    moves = [(fundraiser_no, db.shards.home(fundraiser_no, fresh=True), target) for fundraiser_no in move]
+    if rebalance:
+        moves += db.plan_rebalance()
+    targets = {node for _, _, node in moves if node}
+    if sync_node is not None:
+        targets.add(sync_node)
+    for node in sorted(targets):
+        if dry_run:
+            print(f"would copy the reference data to node {node}")
+        else:
+            check(db.sync_reference_data(node), f"node {node}: reference data copied")
+    
+    # Each node's totals are recomputed once, after all its moves
+    since = {}
+    failed = False
+    for fundraiser_no, source, node in moves:
+        if dry_run:
+            print(f"would move fundraiser {fundraiser_no}: node {source} -> node {node}")
+            continue
+        result = db.move_fundraiser(fundraiser_no, node)
+        if not result['success']:
+            print(f'Error: fundraiser {fundraiser_no}: {result["message"]}')
+            failed = True
+            break
+        print(f"fundraiser {fundraiser_no}: node {source} -> node {node}, "
+              f"{sum(result['rows'].values())} rows")
+        for changed in (source, node):
+            days = [day for day in (since.get(changed), result['first_day']) if day]
+            since[changed] = min(days) if days else None
+    if cleanup:
+        for node in range(len(db.shards)):
+            if dry_run:
+                print(f"would drop node {node}'s orphaned fundraisers")
+                continue
+            result = db.drop_orphans(node)
+            check(result, f"node {node}: {len(result.get('fundraisers', []))} orphaned fundraisers dropped")
+            since.setdefault(node, None)
+    for node, first_day in sorted(since.items()):
+        check(db.reconcile_shard(node, first_day), f"node {node}: totals reconciled")
+    if failed:
+        raise SystemExit(1)
+
+@app.cli.command('seed-benchmark')
+@click.option('--donors', default=100000, show_default=True)
+@click.option('--fundraisers', default=10000, show_default=True)
+@click.option('--visits', default=5000000, show_default=True)
+@click.option('--transactions', default=1000000, show_default=True)
+@click.option('--batch-size', default=5000, show_default=True, help='Rows per INSERT / transaction')
+@click.option('--seed', 'random_seed', default=42, show_default=True, help='Random seed')
+def seed_benchmark(donors, fundraisers, visits, transactions, batch_size, random_seed):
+    """Generate a large data set for benchmarks (writes real rows: use a benchmark database)"""
+    result = benchmark.seed(db, donors=donors, fundraisers=fundraisers, visits=visits,
+                            transactions=transactions, batch_size=batch_size, seed=random_seed)
+    print(json.dumps(result))
+
+@app.cli.command('benchmark')
+@click.argument('scenarios', nargs=-1, type=click.Choice(benchmark.SCENARIOS))
+@click.option('--concurrency', default=10, show_default=True, help='Concurrent clients')
+@click.option('--duration', default=30, show_default=True, help='Measured seconds per scenario')
+@click.option('--warmup', default=5, show_default=True, help='Unmeasured seconds before each scenario')
+@click.option('--url', help='Base URL of a running server (default: serve the app in-process)')
+@click.option('--output', type=click.Path(dir_okay=False), help='Write the JSON report to this file')
+@click.option('--seed', 'random_seed', default=42, show_default=True, help='Random seed')
+def run_benchmark(scenarios, concurrency, duration, warmup, url, output, random_seed):
+    """Run load scenarios (default: all) and report throughput and latency percentiles as JSON.
+
+    donation_burst writes real donations: run it against a benchmark database.
+    """
+    workload = benchmark.Workload(db)
+    client_factory = (lambda: benchmark.HTTPClient(url)) if url else (lambda: benchmark.AppClient(app))
+    results = []
+    for name in scenarios or benchmark.SCENARIOS:
+        result = benchmark.run_scenario(name, client_factory, workload, concurrency=concurrency,
+                                        duration=duration, warmup=warmup, seed=random_seed)
+        latency = result['latency_ms']
+        click.echo(f"{name}: {result['throughput_rps']} req/s, p50 {latency['p50']} ms, p95 {latency['p95']} ms, "
+                   f"p99 {latency['p99']} ms, {result['errors']} errors of {result['requests']}", err=True)
+        results.append(result)
+    report = {
+        'revision': benchmark.git_revision(),
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'target': url or 'in-process',
+        'results': results,
+    }
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if output:
+        with open(output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+@app.cli.command('benchmark-compare')
+@click.argument('baseline', type=click.File())
+@click.argument('current', type=click.File())
+def benchmark_compare(baseline, current):
+    """Show the change between two benchmark reports, scenario by scenario"""
+    for change in benchmark.compare(json.load(baseline), json.load(current)):
+        print(change['scenario'])
+        for metric in ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms', 'errors'):
+            old, new, delta = change[metric]
+            unit = '' if metric == 'errors' else '%'
+            print(f"  {metric:15} {old:>10} -> {new:>10}  ({'n/a' if delta is None else f'{delta:+}{unit}'})")
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,111 @@
+"""ASGI entry point: ``uvicorn asgi:app`` (requires starlette, a2wsgi, python-multipart).
+
+The hot JSON endpoints and the live progress streams are served natively
+on the event loop, so one process can hold thousands of them open at
+once; every other route and template is the Flask app from app.py, run on
+a bounded thread pool.
+"""
+import os
+from contextlib import asynccontextmanager
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+from app import app as flask_app, db, live_feed, visit_queue
+from async_database import AsyncDatabase
+
+adb = AsyncDatabase(db)
+
+
+def form_int(form, name, default=None):
+    """``request.form.get(name, type=int)`` for Starlette forms"""
+    try:
+        return int(form[name])
+    except (KeyError, TypeError, ValueError):
+        return default
+
+
+async def record_visit(request):
+    """Async /record_visit: same contract as the Flask route, never blocks the loop"""
+    form = await request.form()
+    donor_id = form_int(form, 'donor_id')
+    fundraiser_no = form_int(form, 'fundraiser_no')
+    duration = form_int(form, 'duration', 5)
+
+    if donor_id and fundraiser_no:
+        if duration < 0:
+            return JSONResponse({'success': False, 'message': 'Visit duration cannot be negative'}, status_code=400)
+        if visit_queue.submit(donor_id, fundraiser_no, duration, block=False):
+            return JSONResponse({'success': True, 'queued': True}, status_code=202)
+        return JSONResponse({'success': False, 'message': 'Visit queue is full, retry later'},
+                            status_code=503, headers={'Retry-After': '1'})
+    return JSONResponse({'success': False, 'message': 'Missing parameters'})
+
+
+async def live(request):
+    """Async /live and /live/fundraisers/{no}: same streams as the Flask
+    routes, each one an idle coroutine instead of a blocked thread"""
+    fundraiser_no = request.path_params.get('fundraiser_no')
+    body = live_feed.astream(fundraiser_no, form_int(request.query_params, 'since'),
+                             form_int(request.headers, 'last-event-id'))
+    if body is None:
+        return PlainTextResponse('Too many live streams, retry later\n', status_code=503,
+                                 headers={'Retry-After': '5'})
+    return StreamingResponse(body, media_type='text/event-stream', headers={
+        'Cache-Control': 'no-store',
+        'X-Accel-Buffering': 'no',
+    })
+
+
+async def live_stats(request):
+    return JSONResponse(live_feed.stats())
+
+
+async def pool_stats(request):
+    """Sync pool usage (Flask routes) plus the async pool under ``async``"""
+    return JSONResponse({**db.pool_stats(), 'async': adb.pool_stats()})
+
+
+async def visit_queue_stats(request):
+    return JSONResponse(visit_queue.stats())
+
+
+async def cache_stats(request):
+    return JSONResponse(db.cache_stats())
+
+
+async def metrics(request):
+    """/metrics with the async pool's gauges; queries from both pools share one registry"""
+    pool = adb.pool_stats()
+    return PlainTextResponse(db.metrics_text([
+        ('db_async_pool_open', 'gauge', 'Open async pool connections', pool['open']),
+        ('db_async_pool_in_use', 'gauge', 'Checked-out async pool connections', pool['in_use']),
+    ]), media_type='text/plain; version=0.0.4')
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await adb.connect()
+    try:
+        yield
+    finally:
+        await adb.close()
+
+
+app = Starlette(
+    routes=[
+        Route('/record_visit', record_visit, methods=['POST']),
+        Route('/live', live),
+        Route('/live/fundraisers/{fundraiser_no:int}', live),
+        Route('/live_stats', live_stats),
+        Route('/pool_stats', pool_stats),
+        Route('/visit_queue_stats', visit_queue_stats),
+        Route('/cache_stats', cache_stats),
+        Route('/metrics', metrics),
+        Mount('/', app=WSGIMiddleware(flask_app, workers=int(os.getenv('ASGI_WSGI_THREADS', 10)))),
+    ],
+    lifespan=lifespan,
+)
+app.state.db = adb
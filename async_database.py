@@ -0,0 +1,262 @@
+import asyncio
+import os
+import time
+
+from database import Database, DUPLICATE_KEY_ERRNO, RETRYABLE_ERRNOS
+
+
+class AsyncDatabase:
+    """asyncio counterpart of ``Database`` (requires the ``aiomysql`` package).
+
+    The query primitives (``fetch_all``, ``fetch_one``, ``execute_query``,
+    ``call_procedure``, ``fetch_procedure_one``/``_all``) and the hot write
+    paths (``process_donation``, ``record_fundraiser_visit``) run on an
+    aiomysql connection pool without blocking the event loop, and return
+    the same shapes as their ``Database`` counterparts. Every other
+    ``Database`` method is available as a coroutine too: it runs on a worker
+    thread against the wrapped ``Database``, so the cache is shared. Call
+    ``connect()`` once inside the running loop before use. The aiomysql
+    pool is node 0's: writes for fundraisers on other shard nodes go
+    through ``Database`` on a worker thread.
+    """
+
+    def __init__(self, db=None):
+        self.db = db or Database()
+        self.pool_size = int(os.getenv('ASYNC_DB_POOL_SIZE', 20))
+        self.timeout = float(os.getenv('DB_POOL_TIMEOUT', 10))
+        self.pool = None
+
+    def __getattr__(self, name):
+        if name == 'db':
+            raise AttributeError(name)
+        method = getattr(self.db, name)
+        if not callable(method):
+            return method
+
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(method, *args, **kwargs)
+        call.__name__ = name
+        call.__doc__ = method.__doc__
+        return call
+
+    async def connect(self):
+        import aiomysql
+        if self.pool is None:
+            self.pool = await aiomysql.create_pool(
+                minsize=0,
+                maxsize=self.pool_size,
+                pool_recycle=int(float(os.getenv('DB_POOL_MAX_LIFETIME', 1800))),
+                host=self.db.host,
+                user=self.db.user,
+                password=self.db.password,
+                db=self.db.database,
+                autocommit=False,
+            )
+
+    async def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            await self.pool.wait_closed()
+            self.pool = None
+
+    def pool_stats(self):
+        if self.pool is None:
+            return {'pool_size': self.pool_size, 'open': 0, 'idle': 0, 'in_use': 0}
+        return {
+            'pool_size': self.pool.maxsize,
+            'open': self.pool.size,
+            'idle': self.pool.freesize,
+            'in_use': self.pool.size - self.pool.freesize,
+        }
+
+    async def get_connection(self):
+        """Check out a pooled connection; hand it back with release_connection()"""
+        started = time.perf_counter()
+        try:
+            connection = await asyncio.wait_for(self.pool.acquire(), self.timeout)
+            self.db.metrics.observe_acquire(time.perf_counter() - started)
+            return connection
+        except asyncio.TimeoutError:
+            print(f"Error connecting to MySQL: timed out after {self.timeout}s waiting for a connection")
+        except Exception as e:
+            print(f"Error connecting to MySQL: {e}")
+        self.db.metrics.observe_acquire(time.perf_counter() - started, failed=True)
+        return None
+
+    async def release_connection(self, connection):
+        # aiomysql closes connections returned mid-transaction; roll back
+        # first so they stay pooled
+        if not connection.closed and connection.get_transaction_status():
+            try:
+                await connection.rollback()
+            except Exception:
+                connection.close()
+        self.pool.release(connection)
+
+    async def _run(self, connection, query, params, dictionary=True, kind='query', statement=None):
+        """Execute ``query`` and return the rows of every result set.
+
+        Recorded in the shared ``Database.metrics`` under ``statement``
+        (default: ``query``), like the ``Database`` primitives.
+        """
+        import aiomysql
+        metrics = self.db.metrics
+        call = metrics.start(kind, statement or query, params=params)
+        cursor = await connection.cursor(aiomysql.DictCursor if dictionary else aiomysql.Cursor)
+        try:
+            await cursor.execute(query, params or ())
+            result_sets = []
+            while True:
+                if cursor.description:
+                    result_sets.append(await cursor.fetchall())
+                if not await cursor.nextset():
+                    break
+            call.rows = len(result_sets[-1]) if result_sets else max(cursor.rowcount, 0)
+            return result_sets
+        except Exception as e:
+            call.errno = e.args[0] if e.args and isinstance(e.args[0], int) else 'unknown'
+            raise
+        finally:
+            await cursor.close()
+            if metrics.finish(call):
+                plan = await self._explain(connection, query, params) if metrics.should_explain(call) else None
+                metrics.log_slow(call, plan)
+    
+    async def _explain(self, connection, query, params):
+        import aiomysql
+        try:
+            cursor = await connection.cursor(aiomysql.DictCursor)
+            try:
+                await cursor.execute('EXPLAIN ' + query, params or ())
+                return list(await cursor.fetchall())
+            finally:
+                await cursor.close()
+        except Exception as e:
+            return [{'error': str(e)}]
+
+    @staticmethod
+    def _procedure_sql(procedure_name, params):
+        # One round trip, unlike aiomysql's callproc() which SETs each argument
+        return f"CALL {procedure_name}({', '.join(['%s'] * len(params or ()))})"
+
+    async def execute_query(self, query, params=None):
+        connection = await self.get_connection()
+        if connection is None:
+            return {'success': False, 'message': 'Database connection failed'}
+
+        try:
+            await self._run(connection, query, params, kind='execute')
+            await connection.commit()
+            return {'success': True}
+        except Exception as e:
+            return {'success': False, 'message': str(e)}
+        finally:
+            await self.release_connection(connection)
+
+    async def call_procedure(self, procedure_name, params=None):
+        """Run a write procedure and return the last row of its final result set"""
+        connection = await self.get_connection()
+        if connection is None:
+            return {'success': False, 'message': 'Database connection failed'}
+
+        try:
+            result_sets = await self._run(connection, self._procedure_sql(procedure_name, params), params,
+                                          kind='procedure', statement=procedure_name)
+            await connection.commit()
+            rows = result_sets[-1] if result_sets else []
+            if rows:
+                return {'success': True, 'data': rows[-1]}
+            return {'success': True}
+        except Exception as e:
+            errno = e.args[0] if e.args and isinstance(e.args[0], int) else None
+            return {'success': False, 'message': str(e), 'errno': errno, 'retryable': errno in RETRYABLE_ERRNOS}
+        finally:
+            await self.release_connection(connection)
+
+    async def fetch_procedure_all(self, procedure_name, params=None):
+        """Run a read-only procedure and return all rows of its final result set"""
+        connection = await self.get_connection()
+        if connection is None:
+            return []
+
+        try:
+            result_sets = await self._run(connection, self._procedure_sql(procedure_name, params), params,
+                                          kind='procedure', statement=procedure_name)
+            return list(result_sets[-1]) if result_sets else []
+        except Exception as e:
+            print(f"Error calling {procedure_name}: {e}")
+            return []
+        finally:
+            await self.release_connection(connection)
+
+    async def fetch_procedure_one(self, procedure_name, params=None):
+        """Run a read-only procedure and return the first row of its final result set"""
+        rows = await self.fetch_procedure_all(procedure_name, params)
+        return rows[0] if rows else None
+
+    async def fetch_all(self, query, params=None):
+        connection = await self.get_connection()
+        if connection is None:
+            return []
+
+        try:
+            result_sets = await self._run(connection, query, params)
+            return list(result_sets[0]) if result_sets else []
+        except Exception as e:
+            print(f"Error fetching data: {e}")
+            return []
+        finally:
+            await self.release_connection(connection)
+
+    async def fetch_one(self, query, params=None):
+        rows = await self.fetch_all(query, params)
+        return rows[0] if rows else None
+
+    async def _elsewhere(self, fundraiser_no):
+        """True if ``fundraiser_no`` lives on a shard node other than node 0"""
+        if not self.db.shards:
+            return False
+        return await asyncio.to_thread(self.db.shards.home, fundraiser_no) != 0
+
+    async def process_donation(self, donor_id, fundraiser_no, amount, payment_mode, retries=3, idempotency_key=None):
+        """Async ProcessDonation; retries, replays and invalidates like Database.process_donation"""
+        if await self._elsewhere(fundraiser_no):
+            return await asyncio.to_thread(self.db.process_donation, donor_id, fundraiser_no, amount, payment_mode,
+                                           retries, idempotency_key)
+        if idempotency_key:
+            replayed = await self.replay_donation(idempotency_key, donor_id, fundraiser_no, amount, payment_mode)
+            if replayed is not None:
+                return replayed
+        for attempt in range(retries):
+            if idempotency_key:
+                result = await self.call_procedure('ProcessDonationOnce',
+                                                   (idempotency_key, donor_id, fundraiser_no, amount, payment_mode))
+            else:
+                result = await self.call_procedure('ProcessDonation', (donor_id, fundraiser_no, amount, payment_mode))
+            if idempotency_key and result.get('errno') == DUPLICATE_KEY_ERRNO:
+                return await self.replay_donation(idempotency_key, donor_id, fundraiser_no, amount, payment_mode) or result
+            if result['success'] or not result.get('retryable'):
+                break
+        if result['success']:
+            self.db.invalidate('fundraisers', f'fundraiser:{fundraiser_no}', 'donors', f'donor:{donor_id}', 'admins',
+                               'transactions', 'payroll', 'visits', 'stats')
+        return result
+
+    async def replay_donation(self, idempotency_key, donor_id, fundraiser_no, amount, payment_mode):
+        """Async Database.replay_donation"""
+        row = await self.fetch_one(
+            "SELECT donor_id, fundraiser_no, amount, payment_mode, result "
+            "FROM DonationIdempotencyKeys WHERE idempotency_key = %s",
+            (idempotency_key,)
+        )
+        return self.db.stored_donation_result(row, donor_id, fundraiser_no, amount, payment_mode)
+
+    async def record_fundraiser_visit(self, donor_id, fundraiser_no, duration):
+        """Async RecordFundraiserVisit"""
+        if await self._elsewhere(fundraiser_no):
+            return await asyncio.to_thread(self.db.record_fundraiser_visit, donor_id, fundraiser_no, duration)
+        result = await self.call_procedure('RecordFundraiserVisit', (donor_id, fundraiser_no, duration))
+        if result['success']:
+            self.db.invalidate('visits', f'donor:{donor_id}', f'fundraiser:{fundraiser_no}',
+                               'fundraisers', 'stats')
+        return result
@@ -0,0 +1,330 @@
+import http.client
+import random
+import subprocess
+import threading
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from urllib.parse import urlencode, urlsplit
+
+import donation_import
+from request_profiling import percentile
+
+PAYMENT_MODES = ('UPI', 'Credit Card', 'Debit Card', 'Net Banking', 'Wallet')
+SCENARIOS = ('dashboard', 'fundraiser_detail', 'donation_burst', 'reports')
+
+
+def _rows(db, query, params=()):
+    connection = db.get_connection()
+    if connection is None:
+        raise RuntimeError('Database connection failed')
+    try:
+        cursor = connection.cursor()
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        cursor.close()
+        return rows
+    finally:
+        db.release_connection(connection)
+
+
+def _insert_rows(db, sql, row_sql, rows):
+    """One multi-row INSERT in its own transaction (the insert triggers still fire per row)"""
+    connection = db.get_connection()
+    if connection is None:
+        raise RuntimeError('Database connection failed')
+    try:
+        cursor = connection.cursor()
+        cursor.execute(sql + ', '.join([row_sql] * len(rows)), [value for row in rows for value in row])
+        connection.commit()
+        cursor.close()
+    finally:
+        db.release_connection(connection)
+
+
+def _popularity(count, skew=0.8):
+    """Cumulative weights of a Zipf-like popularity curve over ``count`` items"""
+    total, cumulative = 0.0, []
+    for rank in range(1, count + 1):
+        total += 1 / rank ** skew
+        cumulative.append(total)
+    return cumulative
+
+
+def seed(db, donors=100000, fundraisers=10000, visits=5000000, transactions=1000000,
+         batch_size=5000, seed=42, progress=print):
+    """Generate a benchmark data set through the same paths the app writes with.
+
+    Administrators, donors and fundraisers go in as multi-row INSERTs, so
+    their triggers keep the counters and summary tables current. Visits go
+    through ``Database.insert_visits_batch``, the visit-queue flush, and
+    donations through the bulk import (``Database.import_donation_chunk``
+    and ApplyBulkDonations). Fundraiser popularity is skewed, so a few
+    campaigns get most of the traffic. Every row is tagged with a run id, so
+    seeding again adds a second data set instead of colliding with the first.
+    Returns the run id and the row counts.
+    """
+    rng = random.Random(seed)
+    run = uuid.uuid4().hex[:8]
+    admins = max(1, fundraisers // 50)
+    started = time.monotonic()
+
+    def batches(total):
+        for first in range(0, total, batch_size):
+            yield range(first, min(first + batch_size, total))
+
+    for batch in batches(admins):
+        _insert_rows(db, "INSERT INTO Administrator (name, email) VALUES ", "(%s, %s)",
+                     [(f"Bench Admin {i}", f"bench-{run}-admin{i}@example.com") for i in batch])
+    admin_ids = [row[0] for row in _rows(db, "SELECT Admin_id FROM Administrator WHERE email LIKE %s",
+                                         (f"bench-{run}-%",))]
+    progress(f"{len(admin_ids)} administrators")
+
+    for batch in batches(donors):
+        _insert_rows(db, "INSERT INTO Donor (dname, demail, dphone) VALUES ", "(%s, %s, %s)",
+                     [(f"Bench Donor {i}", f"bench-{run}-donor{i}@example.com", f"9{i:09d}") for i in batch])
+    donor_ids = [row[0] for row in _rows(db, "SELECT donor_id FROM Donor WHERE demail LIKE %s",
+                                         (f"bench-{run}-%",))]
+    progress(f"{len(donor_ids)} donors")
+
+    today = date.today()
+    for batch in batches(fundraisers):
+        _insert_rows(
+            db,
+            "INSERT INTO Fundraiser (Admin_id, bank_details, title, description, goal_amount, deadline, "
+            "status, fundraiser_owner_name) VALUES ",
+            "(%s, %s, %s, %s, %s, %s, %s, %s)",
+            [(rng.choice(admin_ids), f"BENCH-{run}", f"Bench Fundraiser {i}",
+              f"Benchmark campaign {i} for load testing", rng.randrange(500000, 5000000, 1000),
+              today + timedelta(days=rng.randint(30, 365)),
+              'Active' if rng.random() < 0.9 else 'Planned', f"Bench Owner {i}") for i in batch]
+        )
+    fundraiser_rows = _rows(db, "SELECT fundraiser_no, status FROM Fundraiser WHERE bank_details = %s",
+                            (f"BENCH-{run}",))
+    fundraiser_nos = [row[0] for row in fundraiser_rows]
+    active_nos = [row[0] for row in fundraiser_rows if row[1] == 'Active']
+    progress(f"{len(fundraiser_nos)} fundraisers")
+
+    weights = _popularity(len(fundraiser_nos))
+    inserted = 0
+    for number, batch in enumerate(batches(visits), start=1):
+        chosen = rng.choices(fundraiser_nos, cum_weights=weights, k=len(batch))
+        result = db.insert_visits_batch([
+            (rng.choice(donor_ids), fundraiser_no, rng.randint(1, 30), 'View', rng.randint(0, 365 * 86400))
+            for fundraiser_no in chosen
+        ])
+        if not result['success']:
+            raise RuntimeError(f"Visit batch failed: {result['message']}")
+        inserted += result['inserted']
+        if number % 100 == 0:
+            progress(f"{inserted} visits")
+    progress(f"{inserted} visits")
+
+    active_weights = _popularity(len(active_nos))
+    now = datetime.now()
+
+    def donations():
+        for row in range(1, transactions + 1):
+            yield row, {
+                'donor_id': rng.choice(donor_ids),
+                'fundraiser_no': rng.choices(active_nos, cum_weights=active_weights)[0],
+                'amount': str(Decimal(rng.randint(100, 5000))),
+                'payment_mode': rng.choice(PAYMENT_MODES),
+                'transaction_date': (now - timedelta(seconds=rng.randint(60, 365 * 86400))).isoformat(' ', 'seconds'),
+            }
+
+    report = donation_import.import_donations(db, donations(), chunk_size=batch_size)
+    progress(f"{report['imported']} transactions ({report['failed']} rejected)")
+    return {
+        'run': run,
+        'administrators': len(admin_ids),
+        'donors': len(donor_ids),
+        'fundraisers': len(fundraiser_nos),
+        'visits': inserted,
+        'transactions': report['imported'],
+        'elapsed_seconds': round(time.monotonic() - started, 1),
+    }
+
+
+class HTTPClient:
+    """One keep-alive connection to a running server (one per worker thread)"""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.connection = connection_class(parts.netloc, timeout=60)
+        self.prefix = parts.path.rstrip('/')
+
+    def request(self, method, path, form=None):
+        body = urlencode(form) if form is not None else None
+        headers = {'Content-Type': 'application/x-www-form-urlencoded'} if form is not None else {}
+        try:
+            self.connection.request(method, self.prefix + path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            response.read()
+            return response.status
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            return 0
+
+
+class AppClient:
+    """Requests served in-process by the Flask app, for runs without a server"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, form=None):
+        return self.client.open(path, method=method, data=form).status_code
+
+
+class Workload:
+    """Ids the scenarios draw from, read once from the database"""
+
+    def __init__(self, db):
+        self.donor_ids = [row[0] for row in _rows(db, "SELECT donor_id FROM Donor")]
+        fundraisers = _rows(db, "SELECT fundraiser_no, goal_amount - raised_amount FROM Fundraiser "
+                                "WHERE status = 'Active' ORDER BY fundraiser_no")
+        self.fundraiser_nos = [row[0] for row in fundraisers]
+        self.admin_ids = [row[0] for row in _rows(db, "SELECT Admin_id FROM Administrator")]
+        if not self.donor_ids or not self.fundraiser_nos or not self.admin_ids:
+            raise RuntimeError('Benchmarks need donors, administrators and active fundraisers; run seed-benchmark first')
+        self.weights = _popularity(len(self.fundraiser_nos))
+        # The donation burst hits the campaign with the most room left
+        self.hot_fundraiser = max(fundraisers, key=lambda row: row[1])[0]
+
+    def fundraiser(self, rng):
+        return rng.choices(self.fundraiser_nos, cum_weights=self.weights)[0]
+
+
+def dashboard(client, rng, workload):
+    yield 'GET /', client.request('GET', '/'), 200
+
+
+def fundraiser_detail(client, rng, workload):
+    """A donor opens a fundraiser page, then its page sends visit beacons"""
+    fundraiser_no = workload.fundraiser(rng)
+    donor_id = rng.choice(workload.donor_ids)
+    yield ('GET /fundraisers/<no>', client.request('GET', f'/fundraisers/{fundraiser_no}?donor_id={donor_id}'), 200)
+    for _ in range(3):
+        yield ('POST /record_visit', client.request('POST', '/record_visit', {
+            'donor_id': donor_id, 'fundraiser_no': fundraiser_no, 'duration': rng.randint(1, 30),
+        }), 202)
+
+
+def donation_burst(client, rng, workload):
+    """Concurrent donations to one campaign (row-lock contention on the fundraiser)"""
+    yield ('POST /transactions/add', client.request('POST', '/transactions/add', {
+        'donor_id': rng.choice(workload.donor_ids),
+        'fundraiser_no': workload.hot_fundraiser,
+        'amount': rng.randint(100, 1000),
+        'payment_mode': rng.choice(PAYMENT_MODES),
+        'idempotency_key': uuid.uuid4().hex,
+    }), 302)
+
+
+def reports(client, rng, workload):
+    yield 'GET /reports', client.request('GET', '/reports'), 200
+    yield 'GET /analytics/views', client.request('GET', '/analytics/views'), 200
+    admin_id = rng.choice(workload.admin_ids)
+    yield ('GET /administrators/<id>/earnings',
+           client.request('GET', f'/administrators/{admin_id}/earnings'), 200)
+
+
+def _summary(samples, seconds):
+    latencies = sorted(sample[0] for sample in samples)
+    errors = sum(1 for sample in samples if not sample[1])
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'throughput_rps': round(len(samples) / seconds, 2) if seconds else 0,
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0,
+            'p50': round(percentile(latencies, 0.50) * 1000, 2),
+            'p90': round(percentile(latencies, 0.90) * 1000, 2),
+            'p95': round(percentile(latencies, 0.95) * 1000, 2),
+            'p99': round(percentile(latencies, 0.99) * 1000, 2),
+            'max': round(latencies[-1] * 1000, 2) if latencies else 0,
+        },
+    }
+
+
+def run_scenario(name, client_factory, workload, concurrency=10, duration=30, warmup=5, seed=42):
+    """Run scenario ``name`` on ``concurrency`` threads for ``warmup`` + ``duration`` seconds.
+
+    Requests finished during the warmup are not counted. A request counts
+    as an error unless it got the status a successful request gets (e.g.
+    302 for a donation, 202 for a beacon). Returns throughput and latency
+    percentiles overall and per request type.
+    """
+    if name not in SCENARIOS:
+        raise ValueError(f"Unknown scenario '{name}' (expected one of {', '.join(SCENARIOS)})")
+    scenario = globals()[name]
+    samples = {}
+    lock = threading.Lock()
+    start = time.perf_counter()
+    measure_from = start + warmup
+    stop_at = measure_from + duration
+
+    def worker(number):
+        rng = random.Random(seed * 1000 + number)
+        client = client_factory()
+        local = {}
+        while time.perf_counter() < stop_at:
+            steps = scenario(client, rng, workload)
+            while True:
+                began = time.perf_counter()
+                try:
+                    request_name, status, expected = next(steps)
+                except StopIteration:
+                    break
+                finished = time.perf_counter()
+                if began >= measure_from and finished <= stop_at:
+                    local.setdefault(request_name, []).append((finished - began, status == expected))
+        with lock:
+            for request_name, values in local.items():
+                samples.setdefault(request_name, []).extend(values)
+
+    threads = [threading.Thread(target=worker, args=(number,)) for number in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    result = {'scenario': name, 'concurrency': concurrency, 'duration_seconds': duration,
+              **_summary([sample for values in samples.values() for sample in values], duration)}
+    result['by_request'] = {request_name: _summary(values, duration)
+                            for request_name, values in sorted(samples.items())}
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, current):
+    """Per-scenario changes between two benchmark reports, in percent (negative latency is better)"""
+    def change(old, new):
+        return round((new - old) / old * 100, 1) if old else None
+
+    before = {result['scenario']: result for result in baseline['results']}
+    changes = []
+    for result in current['results']:
+        old = before.get(result['scenario'])
+        if old is None:
+            continue
+        changes.append({
+            'scenario': result['scenario'],
+            'throughput_rps': (old['throughput_rps'], result['throughput_rps'],
+                               change(old['throughput_rps'], result['throughput_rps'])),
+            **{f'{key}_ms': (old['latency_ms'][key], result['latency_ms'][key],
+                             change(old['latency_ms'][key], result['latency_ms'][key]))
+               for key in ('p50', 'p95', 'p99')},
+            'errors': (old['errors'], result['errors'], result['errors'] - old['errors']),
+        })
+    return changes
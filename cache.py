@@ -0,0 +1,258 @@
+import functools
+import inspect
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+MISS = object()
+
+
+class CacheBackend:
+    """Interface for result caches used by ``Database``.
+
+    Values are stored with a TTL and a set of tags; ``invalidate(tags)``
+    drops every entry carrying any of the tags. ``snapshot(tags)`` returns
+    an opaque token taken before the underlying read, and ``set`` must
+    ignore the value if any of those tags was invalidated in the meantime,
+    so a read racing a write can never re-populate stale data.
+    """
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def snapshot(self, tags):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl, tags, token):
+        raise NotImplementedError
+
+    def invalidate(self, tags):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self):
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    """Per-process LRU cache bounded by entry count and pickled size"""
+
+    def __init__(self, max_entries=5000, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (payload, expires_at, tags)
+        self._tag_keys = {}             # tag -> {key}
+        self._tag_versions = {}         # tag -> invalidation count
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    def _remove(self, key):
+        payload, _, tags = self._entries.pop(key)
+        self._bytes -= len(payload)
+        for tag in tags:
+            keys = self._tag_keys.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_keys[tag]
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return MISS
+            if entry[1] < time.monotonic():
+                self._remove(key)
+                self._expirations += 1
+                self._misses += 1
+                return MISS
+            self._entries.move_to_end(key)
+            self._hits += 1
+            payload = entry[0]
+        # Unpickling hands every caller its own copy of the rows
+        return pickle.loads(payload)
+
+    def snapshot(self, tags):
+        with self._lock:
+            return tuple(self._tag_versions.get(tag, 0) for tag in tags)
+
+    def set(self, key, value, ttl, tags, token):
+        payload = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            if token != tuple(self._tag_versions.get(tag, 0) for tag in tags):
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (payload, time.monotonic() + ttl, tuple(tags))
+            self._bytes += len(payload)
+            for tag in tags:
+                self._tag_keys.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def invalidate(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._tag_versions[tag] = self._tag_versions.get(tag, 0) + 1
+                for key in list(self._tag_keys.get(tag, ())):
+                    self._remove(key)
+                    self._invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tag_keys.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'backend': 'memory',
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': round(self._hits / lookups, 4) if lookups else 0,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'invalidations': self._invalidations,
+            }
+
+
+class RedisCache(CacheBackend):
+    """Cache shared by all workers, backed by Redis (requires the ``redis`` package).
+
+    Eviction is left to Redis (configure ``maxmemory-policy allkeys-lru``);
+    each tag keeps a set of its keys and a version counter for invalidation.
+    """
+
+    def __init__(self, url, prefix='cfcache:'):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    def get(self, key):
+        payload = self.client.get(self.prefix + key)
+        with self._lock:
+            if payload is None:
+                self._misses += 1
+                return MISS
+            self._hits += 1
+        return pickle.loads(payload)
+
+    def snapshot(self, tags):
+        if not tags:
+            return ()
+        versions = self.client.mget([f"{self.prefix}tagver:{tag}" for tag in tags])
+        return tuple(int(version or 0) for version in versions)
+
+    def set(self, key, value, ttl, tags, token):
+        if self.snapshot(tags) != token:
+            return
+        pipe = self.client.pipeline()
+        pipe.set(self.prefix + key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), ex=max(1, int(ttl)))
+        for tag in tags:
+            pipe.sadd(f"{self.prefix}tag:{tag}", key)
+            pipe.expire(f"{self.prefix}tag:{tag}", max(1, int(ttl)) * 2)
+        pipe.execute()
+
+    def invalidate(self, tags):
+        for tag in tags:
+            tag_key = f"{self.prefix}tag:{tag}"
+            pipe = self.client.pipeline()
+            pipe.incr(f"{self.prefix}tagver:{tag}")
+            pipe.smembers(tag_key)
+            pipe.delete(tag_key)
+            _, keys, _ = pipe.execute()
+            if keys:
+                self.client.delete(*[self.prefix + key.decode() for key in keys])
+                with self._lock:
+                    self._invalidations += len(keys)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + '*'):
+            self.client.delete(key)
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'backend': 'redis',
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': round(self._hits / lookups, 4) if lookups else 0,
+                'invalidations': self._invalidations,
+            }
+
+
+def _bind(method, args, kwargs):
+    bound = inspect.signature(method).bind(*args, **kwargs)
+    bound.apply_defaults()
+    arguments = dict(bound.arguments)
+    arguments.pop('self', None)
+    return arguments
+
+
+def cached(ttl, tags=()):
+    """Cache a ``Database`` read method in ``self.cache``.
+
+    ``tags`` are format strings over the method's arguments, e.g.
+    ``'fundraiser:{fundraiser_no}'``. Results of calls that hit a database
+    error are not cached. While ``self.reading_own_writes()`` the cached
+    value is skipped: another session may have filled it from a replica
+    that had not applied this session's write yet.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            cache = self.cache
+            if cache is None:
+                return method(self, *args, **kwargs)
+            arguments = _bind(method, (self,) + args, kwargs)
+            key = method.__name__ + ':' + repr(sorted(arguments.items()))
+            if not self.reading_own_writes():
+                value = cache.get(key)
+                if value is not MISS:
+                    return value
+            resolved = [tag.format(**arguments) for tag in tags]
+            token = cache.snapshot(resolved)
+            errors = self.error_count()
+            value = method(self, *args, **kwargs)
+            if self.error_count() == errors:
+                cache.set(key, value, ttl, resolved, token)
+            return value
+        return wrapper
+    return decorator
+
+
+def invalidates(*tags):
+    """Invalidate ``tags`` (formatted over the arguments) after a successful write"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            result = method(self, *args, **kwargs)
+            if self.cache is not None and (not isinstance(result, dict) or result.get('success', True)):
+                arguments = _bind(method, (self,) + args, kwargs)
+                self.cache.invalidate([tag.format(**arguments) for tag in tags])
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,190 @@
+import os
+import threading
+import time
+
+import mysql.connector
+from mysql.connector import Error
+
+
+class PoolTimeout(Error):
+    """Raised when no connection could be checked out within the pool timeout"""
+
+
+class ConnectionPool:
+    """Thread-safe pool of reusable MySQL connections.
+
+    Connections are created lazily up to ``pool_size``. On checkout a
+    connection is recycled once it is older than ``max_lifetime`` seconds and
+    pinged (with reconnect) once it has been idle longer than
+    ``health_check_interval`` seconds. The pool remembers the pid it was
+    created in, so a forked worker (e.g. Gunicorn with ``--preload``) starts
+    with a fresh pool instead of sharing the parent's sockets.
+    """
+
+    def __init__(self, pool_size=10, max_lifetime=1800, timeout=10,
+                 health_check_interval=30, **connect_args):
+        self.pool_size = pool_size
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.connect_args = connect_args
+        self._lock = threading.Condition()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._idle = []            # [(connection, created_at, last_used)]
+        self._created_at = {}      # id(connection) -> created_at
+        self._size = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._recycled = 0
+        self._reconnects = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def _check_pid(self):
+        # Connections inherited over fork() share sockets with the parent;
+        # drop them without closing so the parent's sessions stay intact.
+        if self._pid != os.getpid():
+            self._reset()
+
+    def _connect(self):
+        return mysql.connector.connect(**self.connect_args)
+
+    def _discard(self, connection):
+        if self._created_at.pop(id(connection), None) is not None:
+            self._size -= 1
+        try:
+            connection.close()
+        except Error:
+            pass
+
+    def acquire(self):
+        """Check out a healthy connection, waiting up to ``timeout`` seconds"""
+        start = time.monotonic()
+        with self._lock:
+            self._check_pid()
+            self._waiting += 1
+            try:
+                while not self._idle and self._size >= self.pool_size:
+                    remaining = self.timeout - (time.monotonic() - start)
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(msg=f"Timed out after {self.timeout}s waiting for a database connection")
+                    self._lock.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+            entry = self._idle.pop() if self._idle else None
+            if entry is None:
+                # Reserve the slot before connecting outside the lock
+                self._size += 1
+            self._in_use += 1
+            waited = time.monotonic() - start
+            self._checkouts += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+
+        try:
+            if entry is None:
+                connection = self._connect()
+                with self._lock:
+                    self._created_at[id(connection)] = time.monotonic()
+                return connection
+            return self._prepare(*entry)
+        except Error:
+            with self._lock:
+                if entry is not None:
+                    self._created_at.pop(id(entry[0]), None)
+                self._size -= 1
+                self._in_use -= 1
+                self._lock.notify()
+            raise
+
+    def _prepare(self, connection, created_at, last_used):
+        now = time.monotonic()
+        if self.max_lifetime and now - created_at > self.max_lifetime:
+            with self._lock:
+                self._recycled += 1
+                self._created_at.pop(id(connection), None)
+            try:
+                connection.close()
+            except Error:
+                pass
+            connection = self._connect()
+            with self._lock:
+                self._created_at[id(connection)] = time.monotonic()
+        elif now - last_used > self.health_check_interval:
+            try:
+                connection.ping(reconnect=False)
+            except Error:
+                with self._lock:
+                    self._reconnects += 1
+                connection.reconnect(attempts=2, delay=0)
+        return connection
+
+    def release(self, connection):
+        """Return a connection to the pool, rolling back any open transaction"""
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            self._in_use -= 1
+
+        healthy = True
+        try:
+            if connection.unread_result:
+                connection.consume_results()
+            if connection.in_transaction:
+                connection.rollback()
+        except Error:
+            healthy = False
+
+        with self._lock:
+            created_at = self._created_at.get(id(connection))
+            if not healthy or created_at is None:
+                self._discard(connection)
+            else:
+                self._idle.append((connection, created_at, time.monotonic()))
+            self._lock.notify()
+
+    def discard(self, connection):
+        """Close a checked-out connection instead of returning it (e.g. one
+        abandoned mid-result, which would otherwise have to be drained)"""
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            self._in_use -= 1
+            self._discard(connection)
+            self._lock.notify()
+
+    def owns(self, connection):
+        """True if ``connection`` was opened by this pool"""
+        with self._lock:
+            return id(connection) in self._created_at
+
+    def close(self):
+        """Close every idle connection"""
+        with self._lock:
+            while self._idle:
+                connection = self._idle.pop()[0]
+                self._discard(connection)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pool_size': self.pool_size,
+                'open': self._size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'waiting': self._waiting,
+                'checkouts': self._checkouts,
+                'timeouts': self._timeouts,
+                'recycled': self._recycled,
+                'reconnects': self._reconnects,
+                'total_wait_seconds': round(self._total_wait, 6),
+                'avg_wait_seconds': round(self._total_wait / self._checkouts, 6) if self._checkouts else 0,
+                'max_wait_seconds': round(self._max_wait, 6),
+            }
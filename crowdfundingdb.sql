@@ -15,6 +15,22 @@ USE CrowdfundingDB;
 -- ==============================
 -- 1. DROP EXISTING TABLES (For Clean Setup)
 -- ==============================
+DROP TABLE IF EXISTS FundraiserEvents;
+DROP TABLE IF EXISTS FundraiserShards;
+DROP TABLE IF EXISTS PaymentModeHourlyStats;
+DROP TABLE IF EXISTS FundraiserHourlyStats;
+DROP TABLE IF EXISTS LeaderboardRefresh;
+DROP TABLE IF EXISTS Leaderboards;
+DROP TABLE IF EXISTS LeaderboardBuckets;
+DROP TABLE IF EXISTS DonationIdempotencyKeys;
+DROP TABLE IF EXISTS PlatformCounterShards;
+DROP TABLE IF EXISTS AdministratorCounterShards;
+DROP TABLE IF EXISTS PlatformCounters;
+DROP TABLE IF EXISTS AdministratorStats;
+DROP TABLE IF EXISTS DonorStats;
+DROP TABLE IF EXISTS FundraiserDonationStats;
+DROP TABLE IF EXISTS FundraiserVisitStats;
+DROP TABLE IF EXISTS DonorFundraiserEngagement;
 DROP TABLE IF EXISTS Visits;
 DROP TABLE IF EXISTS Payroll;
 DROP TABLE IF EXISTS Transactions;
@@ -36,8 +52,7 @@ CREATE TABLE Administrator (
     name VARCHAR(100) NOT NULL,
     email VARCHAR(100) UNIQUE NOT NULL,
     total_earnings DECIMAL(12,2) DEFAULT 0,  -- Changed from total_commission
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    INDEX idx_admin_email (email)
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
 -- Administrator phone numbers (multi-valued attribute)
@@ -57,7 +72,10 @@ CREATE TABLE Donor (
     dphone VARCHAR(20),
     total_donated DECIMAL(12,2) DEFAULT 0,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    INDEX idx_donor_email (demail)
+    -- Top donors (ORDER BY total_donated DESC LIMIT n) read the index backwards
+    INDEX idx_donor_total_donated (total_donated),
+    -- Search and typeahead: MATCH(dname, demail) AGAINST (... IN BOOLEAN MODE)
+    FULLTEXT INDEX ft_donor_search (dname, demail)
 );
 
 -- Fundraiser table
@@ -76,8 +94,14 @@ CREATE TABLE Fundraiser (
     created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (Admin_id) REFERENCES Administrator(Admin_id)
         ON DELETE SET NULL ON UPDATE CASCADE,
-    INDEX idx_fundraiser_status (status),
-    INDEX idx_fundraiser_deadline (deadline)
+    INDEX idx_fundraiser_status (status, fundraiser_no),
+    -- Active list and vw_active_fundraisers: WHERE status = ? ORDER BY deadline
+    INDEX idx_fundraiser_status_deadline (status, deadline),
+    INDEX idx_fundraiser_deadline (deadline),
+    -- Top fundraisers: ORDER BY raised_amount DESC LIMIT n
+    INDEX idx_fundraiser_raised (raised_amount),
+    -- Search, typeahead and search facets: MATCH(title, description, fundraiser_owner_name)
+    FULLTEXT INDEX ft_fundraiser_search (title, description, fundraiser_owner_name)
 );
 
 -- ==============================
@@ -98,9 +122,15 @@ CREATE TABLE Transactions (
         ON DELETE RESTRICT ON UPDATE CASCADE,
     FOREIGN KEY (fundraiser_no) REFERENCES Fundraiser(fundraiser_no)
         ON DELETE RESTRICT ON UPDATE CASCADE,
-    INDEX idx_trans_date (transaction_date),
-    INDEX idx_trans_donor (donor_id),
-    INDEX idx_trans_fundraiser (fundraiser_no)
+    -- Composite indexes match the keyset pagination order
+    -- (transaction_date, Transaction_id) under each optional filter
+    INDEX idx_trans_date (transaction_date, Transaction_id),
+    INDEX idx_trans_donor (donor_id, transaction_date, Transaction_id),
+    INDEX idx_trans_fundraiser (fundraiser_no, transaction_date, Transaction_id),
+    INDEX idx_trans_mode_date (payment_mode, transaction_date, Transaction_id),
+    -- Covers the per (donor, fundraiser) SUM/EXISTS of GetDonorInterestAnalytics
+    -- and vw_high_interest_donors without touching the rows
+    INDEX idx_trans_donor_fundraiser (donor_id, fundraiser_no, amount)
 );
 
 -- ==============================
@@ -123,8 +153,9 @@ CREATE TABLE Payroll (
         ON DELETE SET NULL ON UPDATE CASCADE,
     FOREIGN KEY (Transaction_id) REFERENCES Transactions(Transaction_id)
         ON DELETE SET NULL ON UPDATE CASCADE,
-    INDEX idx_payroll_admin (Admin_id),
-    INDEX idx_payroll_date (payout_date)
+    INDEX idx_payroll_admin (Admin_id, payout_date, Payroll_id),
+    INDEX idx_payroll_fundraiser (fundraiser_no, payout_date, Payroll_id),
+    INDEX idx_payroll_date (payout_date, Payroll_id)
 );
 
 -- Visits table (AUTO-TRACKED with interest level management)
@@ -140,9 +171,278 @@ CREATE TABLE Visits (
         ON DELETE CASCADE ON UPDATE CASCADE,
     FOREIGN KEY (fundraiser_no) REFERENCES Fundraiser(fundraiser_no)
         ON DELETE CASCADE ON UPDATE CASCADE,
-    INDEX idx_visit_donor (donor_id),
-    INDEX idx_visit_fundraiser (fundraiser_no),
-    INDEX idx_visit_date (visit_date)
+    INDEX idx_visit_donor (donor_id, visit_date, visit_id),
+    INDEX idx_visit_fundraiser (fundraiser_no, visit_date, visit_id),
+    INDEX idx_visit_date (visit_date, visit_id)
+);
+
+-- ==============================
+-- DonorFundraiserEngagement: one row per (donor, fundraiser) pair with the
+-- running visit count and current interest level. Upserted by the visit
+-- insert trigger, so interest tracking is O(1) per visit and Visits stays
+-- append-only.
+-- ==============================
+CREATE TABLE DonorFundraiserEngagement (
+    donor_id INT NOT NULL,
+    fundraiser_no INT NOT NULL,
+    visit_count INT NOT NULL DEFAULT 0,
+    total_duration INT NOT NULL DEFAULT 0,
+    first_visit TIMESTAMP NULL,
+    last_visit TIMESTAMP NULL,
+    interest_level VARCHAR(50) NOT NULL DEFAULT 'Low',
+    PRIMARY KEY (donor_id, fundraiser_no),
+    FOREIGN KEY (donor_id) REFERENCES Donor(donor_id)
+        ON DELETE CASCADE ON UPDATE CASCADE,
+    FOREIGN KEY (fundraiser_no) REFERENCES Fundraiser(fundraiser_no)
+        ON DELETE CASCADE ON UPDATE CASCADE,
+    INDEX idx_engagement_fundraiser (fundraiser_no),
+    INDEX idx_engagement_visits (visit_count)
+);
+
+-- ==============================
+-- FundraiserVisitStats: per-fundraiser visit and distinct-visitor counts,
+-- kept next to (not on) the Fundraiser row so visit traffic does not
+-- contend with donations for the Fundraiser row lock. A visitor is new
+-- exactly when the visit creates its DonorFundraiserEngagement row, so the
+-- distinct count is exact without scanning Visits.
+-- ==============================
+CREATE TABLE FundraiserVisitStats (
+    fundraiser_no INT PRIMARY KEY,
+    total_visits INT NOT NULL DEFAULT 0,
+    unique_visitors INT NOT NULL DEFAULT 0,
+    FOREIGN KEY (fundraiser_no) REFERENCES Fundraiser(fundraiser_no)
+        ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+-- ==============================
+-- Summary tables behind the reporting views: one pre-aggregated row per
+-- fundraiser / donor / administrator, maintained by the triggers below so
+-- vw_active_fundraisers, vw_donor_engagement and vw_administrator_dashboard
+-- can be read with 1:1 key joins instead of joining Visits, Transactions
+-- and Payroll together. Rebuild with CALL RefreshSummaryTables().
+-- ==============================
+CREATE TABLE FundraiserDonationStats (
+    fundraiser_no INT PRIMARY KEY,
+    total_transactions INT NOT NULL DEFAULT 0,
+    total_gross DECIMAL(14,2) NOT NULL DEFAULT 0,
+    total_platform_fee DECIMAL(14,2) NOT NULL DEFAULT 0,
+    total_net DECIMAL(14,2) NOT NULL DEFAULT 0,
+    FOREIGN KEY (fundraiser_no) REFERENCES Fundraiser(fundraiser_no)
+        ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+CREATE TABLE DonorStats (
+    donor_id INT PRIMARY KEY,
+    fundraisers_visited INT NOT NULL DEFAULT 0,
+    total_visits INT NOT NULL DEFAULT 0,
+    highest_interest_level VARCHAR(50) NULL,
+    total_donations INT NOT NULL DEFAULT 0,
+    total_amount_donated DECIMAL(14,2) NOT NULL DEFAULT 0,
+    FOREIGN KEY (donor_id) REFERENCES Donor(donor_id)
+        ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+CREATE TABLE AdministratorStats (
+    Admin_id INT PRIMARY KEY,
+    total_fundraisers INT NOT NULL DEFAULT 0,
+    active_fundraisers INT NOT NULL DEFAULT 0,
+    total_funds_managed DECIMAL(16,2) NOT NULL DEFAULT 0,
+    total_transactions INT NOT NULL DEFAULT 0,
+    total_payouts INT NOT NULL DEFAULT 0,
+    total_platform_fees DECIMAL(16,2) NOT NULL DEFAULT 0,
+    FOREIGN KEY (Admin_id) REFERENCES Administrator(Admin_id)
+        ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+-- ==============================
+-- PlatformCounters: single-row running totals for the dashboard and
+-- GetPlatformStatistics. Maintained by the triggers below; rebuild with
+-- CALL ReconcilePlatformCounters() if it ever drifts.
+-- ==============================
+CREATE TABLE PlatformCounters (
+    id TINYINT PRIMARY KEY DEFAULT 1,
+    total_administrators INT NOT NULL DEFAULT 0,
+    total_donors INT NOT NULL DEFAULT 0,
+    total_fundraisers INT NOT NULL DEFAULT 0,
+    active_fundraisers INT NOT NULL DEFAULT 0,
+    completed_fundraisers INT NOT NULL DEFAULT 0,
+    total_goal DECIMAL(16,2) NOT NULL DEFAULT 0,
+    total_raised DECIMAL(16,2) NOT NULL DEFAULT 0,
+    total_transactions INT NOT NULL DEFAULT 0,
+    total_gross DECIMAL(16,2) NOT NULL DEFAULT 0,
+    total_platform_fee DECIMAL(16,2) NOT NULL DEFAULT 0,
+    total_net DECIMAL(16,2) NOT NULL DEFAULT 0,
+    total_admin_earnings DECIMAL(16,2) NOT NULL DEFAULT 0,
+    total_visits BIGINT NOT NULL DEFAULT 0,
+    unique_visitors INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    CONSTRAINT chk_platform_counters_single_row CHECK (id = 1)
+);
+
+-- ==============================
+-- Counter shards: the running totals every donation adds to (platform
+-- totals, an administrator's earnings and stats) are split across 16 rows,
+-- one picked per connection by CounterShard(), so concurrent donations add
+-- to different rows instead of queueing on one. The true total is the base
+-- row (PlatformCounters, Administrator + AdministratorStats) plus the sum of
+-- its shards; vw_platform_counters and vw_administrator_counters fold them
+-- on read and FoldCounterShards() moves them into the base rows.
+-- ==============================
+CREATE TABLE PlatformCounterShards (
+    shard_no TINYINT UNSIGNED PRIMARY KEY,
+    total_raised DECIMAL(16,2) NOT NULL DEFAULT 0,
+    total_transactions INT NOT NULL DEFAULT 0,
+    total_gross DECIMAL(16,2) NOT NULL DEFAULT 0,
+    total_platform_fee DECIMAL(16,2) NOT NULL DEFAULT 0,
+    total_net DECIMAL(16,2) NOT NULL DEFAULT 0,
+    total_admin_earnings DECIMAL(16,2) NOT NULL DEFAULT 0,
+    total_visits BIGINT NOT NULL DEFAULT 0,
+    unique_visitors INT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE AdministratorCounterShards (
+    Admin_id INT NOT NULL,
+    shard_no TINYINT UNSIGNED NOT NULL,
+    total_earnings DECIMAL(14,2) NOT NULL DEFAULT 0,
+    total_funds_managed DECIMAL(16,2) NOT NULL DEFAULT 0,
+    total_transactions INT NOT NULL DEFAULT 0,
+    total_payouts INT NOT NULL DEFAULT 0,
+    total_platform_fees DECIMAL(16,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (Admin_id, shard_no),
+    FOREIGN KEY (Admin_id) REFERENCES Administrator(Admin_id)
+        ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+-- ==============================
+-- DonationIdempotencyKeys: one row per client-supplied idempotency key,
+-- written in the same transaction as its donation together with the
+-- result ProcessDonationOnce() returned, so a retry with the same key gets
+-- that result back instead of donating twice. No foreign keys: the row is
+-- claimed before the donation locks the donor and fundraiser (see
+-- trg_before_transaction_insert), and must not share-lock them first.
+-- Old keys are removed by `flask sweep-idempotency-keys`.
+-- ==============================
+CREATE TABLE DonationIdempotencyKeys (
+    idempotency_key VARCHAR(64) PRIMARY KEY,
+    donor_id INT NOT NULL,
+    fundraiser_no INT NOT NULL,
+    amount DECIMAL(12,2) NOT NULL,
+    payment_mode VARCHAR(50) NOT NULL,
+    Transaction_id INT NULL,
+    result JSON NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_idempotency_created (created_at)
+);
+
+-- ==============================
+-- FundraiserEvents: change feed (outbox) for live progress. The donation
+-- and visit triggers and ApplyBulkDonations() append a row in the same
+-- transaction as the write, so an event exists exactly when its change
+-- committed. live_feed.LiveFeed reads new rows by event_id and pushes the
+-- fundraiser's progress to Server-Sent Events subscribers. Append-only
+-- with no secondary index and no foreign key, to add as little as
+-- possible to each write; `flask sweep-fundraiser-events` trims old rows
+-- by event_id.
+-- kind: 'donation' (ref_id = Transaction_id, NULL for a bulk-import
+-- chunk) or 'visit'
+-- ==============================
+CREATE TABLE FundraiserEvents (
+    event_id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    fundraiser_no INT NOT NULL,
+    kind VARCHAR(20) NOT NULL,
+    ref_id INT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- ==============================
+-- Leaderboards. LeaderboardBuckets holds what each donor gave (gross) per
+-- hour, added to by the transaction trigger and ApplyBulkDonations(), so a
+-- windowed total reads only the window's buckets, never Transactions;
+-- fundraiser boards sum the net column of FundraiserHourlyStats (below) the
+-- same way. Database.refresh_leaderboard()
+-- ranks a window's top entries into Leaderboards, keyed by rank, so the top
+-- N is an N-row primary-key range; LeaderboardRefresh records when each
+-- board was last ranked. All-time boards read the indexed running totals
+-- (Donor.total_donated, Fundraiser.raised_amount) instead.
+-- ==============================
+CREATE TABLE LeaderboardBuckets (
+    board ENUM('donor', 'fundraiser') NOT NULL,
+    bucket DATETIME NOT NULL,  -- start of the hour
+    entity_id INT NOT NULL,    -- donor_id or fundraiser_no
+    amount DECIMAL(14,2) NOT NULL DEFAULT 0,
+    donations INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (board, bucket, entity_id)
+);
+
+CREATE TABLE Leaderboards (
+    board ENUM('donor', 'fundraiser') NOT NULL,
+    period VARCHAR(10) NOT NULL,  -- '24h', '7d', '30d'
+    rank_no SMALLINT UNSIGNED NOT NULL,
+    entity_id INT NOT NULL,
+    amount DECIMAL(14,2) NOT NULL,
+    donations INT NOT NULL,
+    PRIMARY KEY (board, period, rank_no)
+);
+
+CREATE TABLE LeaderboardRefresh (
+    board ENUM('donor', 'fundraiser') NOT NULL,
+    period VARCHAR(10) NOT NULL,
+    refreshed_at TIMESTAMP NULL,
+    PRIMARY KEY (board, period)
+);
+
+-- ==============================
+-- Hourly rollups for trend charts. The transaction and visit insert
+-- triggers (and ApplyBulkDonations()) add each donation and visit to its
+-- hour's row, so a date range reads at most one row per hour instead of
+-- aggregating Transactions and Visits; days are summed from the hours.
+-- Administrator series sum their fundraisers' rows. new_visitors counts
+-- donors whose first visit to the fundraiser fell in that hour (per-hour
+-- distinct counts would not add up across a range). Rebuild a date range
+-- with `flask backfill-rollups`.
+-- ==============================
+CREATE TABLE FundraiserHourlyStats (
+    bucket DATETIME NOT NULL,  -- start of the hour
+    fundraiser_no INT NOT NULL,
+    transactions INT NOT NULL DEFAULT 0,
+    gross DECIMAL(14,2) NOT NULL DEFAULT 0,
+    platform_fee DECIMAL(14,2) NOT NULL DEFAULT 0,
+    net DECIMAL(14,2) NOT NULL DEFAULT 0,
+    visits INT NOT NULL DEFAULT 0,
+    new_visitors INT NOT NULL DEFAULT 0,
+    -- Bucket first: platform series and leaderboard windows are one range
+    PRIMARY KEY (bucket, fundraiser_no),
+    INDEX idx_fundraiser_hourly (fundraiser_no, bucket)
+);
+
+-- Split across the counter shards (see above): every donation paid with
+-- the same mode in the same hour would otherwise queue on one row
+CREATE TABLE PaymentModeHourlyStats (
+    bucket DATETIME NOT NULL,
+    payment_mode VARCHAR(50) NOT NULL,
+    shard_no TINYINT UNSIGNED NOT NULL,
+    transactions INT NOT NULL DEFAULT 0,
+    gross DECIMAL(14,2) NOT NULL DEFAULT 0,
+    platform_fee DECIMAL(14,2) NOT NULL DEFAULT 0,
+    net DECIMAL(14,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket, payment_mode, shard_no)
+);
+
+-- ==============================
+-- Shard directory (read on node 0 only). With DB_SHARD_HOSTS set, each
+-- fundraiser and all its rows live on one MySQL node; a fundraiser with
+-- no row here lives on node 0, so an unsharded database leaves it empty.
+-- Rows are written by Database.add_fundraiser() and `flask reshard`.
+-- Donors and administrators are copied to every node. Moved rows are
+-- copied and deleted under @shard_move = 1, which makes the triggers
+-- below skip their validation and bookkeeping; ReconcileRunningTotals()
+-- and the other rebuild procedures then recompute each node's totals.
+-- ==============================
+CREATE TABLE FundraiserShards (
+    fundraiser_no INT PRIMARY KEY,
+    shard_no TINYINT UNSIGNED NOT NULL,
+    moved_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX idx_fundraiser_shards_node (shard_no)
 );
 
 -- ==============================
@@ -174,6 +474,39 @@ VALUES
 (1, 'ICICI-4321', 'Green Planet Drive', 'Tree plantation and environment awareness project across 10 villages.', 50000, '2026-01-10', 'Planned', 'Mir', 50000),
 (3, 'AXIS-9999', 'Education for All', 'Providing books and supplies to underprivileged children.', 100000, '2025-12-31', 'Active', 'Arjun', 100000);
 
+-- Seed the counters row from the sample data (triggers are created below)
+INSERT INTO PlatformCounters (id, total_administrators, total_donors, total_fundraisers,
+                              active_fundraisers, completed_fundraisers, total_goal, total_raised)
+SELECT 1,
+       (SELECT COUNT(*) FROM Administrator),
+       (SELECT COUNT(*) FROM Donor),
+       COUNT(*),
+       COALESCE(SUM(status = 'Active'), 0),
+       COALESCE(SUM(status = 'Goal Reached'), 0),
+       COALESCE(SUM(goal_amount), 0),
+       COALESCE(SUM(raised_amount), 0)
+FROM Fundraiser;
+
+-- Seed the per-donor and per-administrator summary rows
+INSERT INTO DonorStats (donor_id) SELECT donor_id FROM Donor;
+
+INSERT INTO AdministratorStats (Admin_id, total_fundraisers, active_fundraisers, total_funds_managed)
+SELECT a.Admin_id, COUNT(f.fundraiser_no), COALESCE(SUM(f.status = 'Active'), 0), COALESCE(SUM(f.raised_amount), 0)
+FROM Administrator a
+LEFT JOIN Fundraiser f ON f.Admin_id = a.Admin_id
+GROUP BY a.Admin_id;
+
+-- Pre-create every counter shard row, so donations only ever UPDATE them
+INSERT INTO PlatformCounterShards (shard_no) VALUES
+(0), (1), (2), (3), (4), (5), (6), (7), (8), (9), (10), (11), (12), (13), (14), (15);
+
+INSERT INTO AdministratorCounterShards (Admin_id, shard_no)
+SELECT a.Admin_id, s.shard_no FROM Administrator a CROSS JOIN PlatformCounterShards s;
+
+INSERT INTO LeaderboardRefresh (board, period) VALUES
+('donor', '24h'), ('donor', '7d'), ('donor', '30d'),
+('fundraiser', '24h'), ('fundraiser', '7d'), ('fundraiser', '30d');
+
 -- ==============================
 -- 4. CORRECTED UTILITY FUNCTIONS
 -- ==============================
@@ -196,6 +529,14 @@ BEGIN
     RETURN amount - CalculatePlatformFee(amount);
 END //
 
+-- Start of the hour a timestamp falls in (leaderboard and rollup bucket key)
+CREATE FUNCTION HourStart(p_time DATETIME)
+RETURNS DATETIME
+DETERMINISTIC
+BEGIN
+    RETURN DATE_FORMAT(p_time, '%Y-%m-%d %H:00:00');
+END //
+
 -- Get remaining amount for fundraiser
 CREATE FUNCTION GetRemainingAmount(p_fundraiser_no INT)
 RETURNS DECIMAL(12,2)
@@ -221,16 +562,16 @@ BEGIN
     RETURN (raised >= goal);
 END //
 
--- Get visit count for donor-fundraiser pair
+-- Get visit count for donor-fundraiser pair (primary-key lookup)
 CREATE FUNCTION GetVisitCount(p_donor_id INT, p_fundraiser_no INT)
 RETURNS INT
 READS SQL DATA
 BEGIN
-    DECLARE visit_count INT;
-    SELECT COUNT(*) INTO visit_count 
-    FROM Visits 
+    DECLARE v_visit_count INT;
+    SELECT visit_count INTO v_visit_count 
+    FROM DonorFundraiserEngagement 
     WHERE donor_id = p_donor_id AND fundraiser_no = p_fundraiser_no;
-    RETURN COALESCE(visit_count, 0);
+    RETURN COALESCE(v_visit_count, 0);
 END //
 
 -- Determine interest level based on visit count
@@ -250,6 +591,26 @@ BEGIN
     END IF;
 END //
 
+-- Rank of an interest level (0 for NULL/unknown), so levels compare in
+-- order rather than alphabetically
+CREATE FUNCTION InterestLevelRank(p_level VARCHAR(50))
+RETURNS INT
+DETERMINISTIC
+BEGIN
+    RETURN FIELD(p_level, 'Low', 'Medium', 'High', 'Very High');
+END //
+
+-- Counter shard (0-15, one per seeded *CounterShards row) used by this
+-- connection. A transaction always adds to the same shard, and concurrent
+-- connections spread across all 16.
+CREATE FUNCTION CounterShard()
+RETURNS TINYINT UNSIGNED
+NOT DETERMINISTIC
+NO SQL
+BEGIN
+    RETURN CONNECTION_ID() % 16;
+END //
+
 DELIMITER ;
 
 -- ==============================
@@ -258,58 +619,92 @@ DELIMITER ;
 
 DELIMITER //
 
--- TRIGGER 1: Calculate platform fee before transaction insert
+-- TRIGGER 1: Calculate platform fee and reserve the donation before insert
+--
+-- Lock order for every donation path: Donor -> Fundraiser -> counter shards
+-- (PlatformCounterShards before AdministratorCounterShards) -> base counter
+-- rows. This trigger takes the Donor and Fundraiser row locks with its own
+-- UPDATEs before the INSERT's foreign-key checks take shared locks on the
+-- same rows, so two donations can never each hold a shared lock that the
+-- other needs to upgrade (the classic parent-row deadlock). The goal check
+-- is a single conditional UPDATE: there is no window between reading the
+-- remaining amount and applying the donation.
 CREATE TRIGGER trg_before_transaction_insert
 BEFORE INSERT ON Transactions
 FOR EACH ROW
 BEGIN
-    DECLARE current_raised DECIMAL(12,2);
-    DECLARE goal DECIMAL(12,2);
     DECLARE v_status VARCHAR(50);
     
-    -- Get fundraiser details
-    SELECT raised_amount, goal_amount, status 
-    INTO current_raised, goal, v_status 
-    FROM Fundraiser 
-    WHERE fundraiser_no = NEW.fundraiser_no;
-    
-    -- Check if fundraiser is active
-    IF v_status != 'Active' THEN
-        SIGNAL SQLSTATE '45000' 
-        SET MESSAGE_TEXT = 'Error: Fundraiser is not active. Cannot accept donations.';
-    END IF;
-    
     -- Calculate and set platform fee (1%) and net amount (99%)
-    SET NEW.platform_fee = CalculatePlatformFee(NEW.amount);
-    SET NEW.net_amount = CalculateNetAmount(NEW.amount);
+    IF COALESCE(@shard_move, 0) = 0 THEN
+        SET NEW.platform_fee = CalculatePlatformFee(NEW.amount);
+        SET NEW.net_amount = CalculateNetAmount(NEW.amount);
+    END IF;
     
-    -- Check if donation would exceed goal
-    IF (current_raised + NEW.net_amount) > goal THEN
-        SIGNAL SQLSTATE '45000' 
-        SET MESSAGE_TEXT = 'Error: Donation exceeds the remaining goal amount!';
+    -- The bulk importer locks donors and fundraisers in the same order,
+    -- validates status and remaining goal per chunk (cumulatively, which a
+    -- per-row check cannot do in a multi-row INSERT) and applies the totals
+    -- in ApplyBulkDonations(); shard moves copy rows already counted
+    IF COALESCE(@bulk_donation_import, 0) = 0 AND COALESCE(@shard_move, 0) = 0 THEN
+        IF NEW.amount <= 0 THEN
+            SIGNAL SQLSTATE '45000' 
+            SET MESSAGE_TEXT = 'Error: Amount must be greater than 0';
+        END IF;
+        
+        -- Update donor's total donated (gross amount)
+        UPDATE Donor 
+        SET total_donated = total_donated + NEW.amount 
+        WHERE donor_id = NEW.donor_id;
+        
+        IF ROW_COUNT() = 0 THEN
+            SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Error: Donor does not exist';
+        END IF;
+        
+        -- Apply the net amount (99%) only if the fundraiser is active and it
+        -- fits the remaining goal; single-table assignments run left to
+        -- right, so remaining_amount sees the new raised_amount
+        UPDATE Fundraiser 
+        SET raised_amount = raised_amount + NEW.net_amount,
+            remaining_amount = goal_amount - raised_amount
+        WHERE fundraiser_no = NEW.fundraiser_no 
+        AND status = 'Active' 
+        AND raised_amount + NEW.net_amount <= goal_amount;
+        
+        IF ROW_COUNT() = 0 THEN
+            SELECT status INTO v_status 
+            FROM Fundraiser 
+            WHERE fundraiser_no = NEW.fundraiser_no;
+            
+            IF v_status IS NULL THEN
+                SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Error: Fundraiser does not exist';
+            ELSEIF v_status != 'Active' THEN
+                SIGNAL SQLSTATE '45000' 
+                SET MESSAGE_TEXT = 'Error: Fundraiser is not active. Cannot accept donations.';
+            ELSE
+                SIGNAL SQLSTATE '45000' 
+                SET MESSAGE_TEXT = 'Error: Donation exceeds the remaining goal amount!';
+            END IF;
+        END IF;
     END IF;
 END //
 
--- TRIGGER 2: After transaction, update amounts and create payroll
--- Admin receives net_amount (99%) via payroll
+-- TRIGGER 2: After transaction, create payroll and update the totals
+-- Admin receives net_amount (99%) via payroll. Shared running totals go to
+-- this connection's counter shards. Bulk imports skip this and apply the
+-- same changes once per chunk in ApplyBulkDonations().
 CREATE TRIGGER trg_after_transaction_insert
 AFTER INSERT ON Transactions
 FOR EACH ROW
-BEGIN
+trg_body: BEGIN
     DECLARE v_admin_id INT;
+    DECLARE v_shard TINYINT UNSIGNED DEFAULT CounterShard();
     
-    -- Update fundraiser raised amount with net amount (99%)
-    UPDATE Fundraiser 
-    SET raised_amount = raised_amount + NEW.net_amount,
-        remaining_amount = goal_amount - (raised_amount + NEW.net_amount)
-    WHERE fundraiser_no = NEW.fundraiser_no;
-    
-    -- Update donor's total donated (gross amount)
-    UPDATE Donor 
-    SET total_donated = total_donated + NEW.amount 
-    WHERE donor_id = NEW.donor_id;
+    -- A shard move copies the payout and totals along with the donation
+    IF COALESCE(@bulk_donation_import, 0) = 1 OR COALESCE(@shard_move, 0) = 1 THEN
+        LEAVE trg_body;
+    END IF;
     
-    -- Get admin_id for the fundraiser
+    -- Get admin_id for the fundraiser (row already locked by trigger 1)
     SELECT Admin_id INTO v_admin_id 
     FROM Fundraiser 
     WHERE fundraiser_no = NEW.fundraiser_no;
@@ -318,10 +713,59 @@ BEGIN
     INSERT INTO Payroll (Admin_id, fundraiser_no, Transaction_id, admin_earnings, platform_fee_deducted)
     VALUES (v_admin_id, NEW.fundraiser_no, NEW.Transaction_id, NEW.net_amount, NEW.platform_fee);
     
-    -- Update administrator's total earnings (NOT commission)
-    UPDATE Administrator 
-    SET total_earnings = total_earnings + NEW.net_amount 
-    WHERE Admin_id = v_admin_id;
+    -- Update platform-wide running totals
+    UPDATE PlatformCounterShards 
+    SET total_transactions = total_transactions + 1,
+        total_gross = total_gross + NEW.amount,
+        total_platform_fee = total_platform_fee + NEW.platform_fee,
+        total_net = total_net + NEW.net_amount
+    WHERE shard_no = v_shard;
+    
+    -- Update administrator's total earnings (NOT commission) and summary
+    UPDATE AdministratorCounterShards 
+    SET total_earnings = total_earnings + NEW.net_amount,
+        total_transactions = total_transactions + 1,
+        total_platform_fees = total_platform_fees + NEW.platform_fee 
+    WHERE Admin_id = v_admin_id AND shard_no = v_shard;
+    
+    -- Update the reporting summaries (serialized by the Fundraiser row lock)
+    INSERT INTO FundraiserDonationStats (fundraiser_no, total_transactions, total_gross, total_platform_fee, total_net)
+    VALUES (NEW.fundraiser_no, 1, NEW.amount, NEW.platform_fee, NEW.net_amount)
+    ON DUPLICATE KEY UPDATE 
+        total_transactions = total_transactions + 1,
+        total_gross = total_gross + NEW.amount,
+        total_platform_fee = total_platform_fee + NEW.platform_fee,
+        total_net = total_net + NEW.net_amount;
+    
+    INSERT INTO FundraiserEvents (fundraiser_no, kind, ref_id)
+    VALUES (NEW.fundraiser_no, 'donation', NEW.Transaction_id);
+    
+    UPDATE DonorStats 
+    SET total_donations = total_donations + 1,
+        total_amount_donated = total_amount_donated + NEW.amount 
+    WHERE donor_id = NEW.donor_id;
+    
+    -- Hourly leaderboard bucket and rollups (serialized by the Donor and
+    -- Fundraiser row locks; the payment mode row by its shard)
+    INSERT INTO LeaderboardBuckets (board, bucket, entity_id, amount, donations)
+    VALUES ('donor', HourStart(NEW.transaction_date), NEW.donor_id, NEW.amount, 1)
+    ON DUPLICATE KEY UPDATE amount = amount + NEW.amount, donations = donations + 1;
+    
+    INSERT INTO FundraiserHourlyStats (bucket, fundraiser_no, transactions, gross, platform_fee, net)
+    VALUES (HourStart(NEW.transaction_date), NEW.fundraiser_no, 1, NEW.amount, NEW.platform_fee, NEW.net_amount)
+    ON DUPLICATE KEY UPDATE 
+        transactions = transactions + 1,
+        gross = gross + NEW.amount,
+        platform_fee = platform_fee + NEW.platform_fee,
+        net = net + NEW.net_amount;
+    
+    INSERT INTO PaymentModeHourlyStats (bucket, payment_mode, shard_no, transactions, gross, platform_fee, net)
+    VALUES (HourStart(NEW.transaction_date), NEW.payment_mode, v_shard, 1, NEW.amount, NEW.platform_fee, NEW.net_amount)
+    ON DUPLICATE KEY UPDATE 
+        transactions = transactions + 1,
+        gross = gross + NEW.amount,
+        platform_fee = platform_fee + NEW.platform_fee,
+        net = net + NEW.net_amount;
 END //
 
 -- TRIGGER 3: PREVENT transaction deletion (IMMUTABLE)
@@ -329,8 +773,11 @@ CREATE TRIGGER trg_before_transaction_delete
 BEFORE DELETE ON Transactions
 FOR EACH ROW
 BEGIN
-    SIGNAL SQLSTATE '45000' 
-    SET MESSAGE_TEXT = 'SECURITY: Transactions cannot be deleted. They are permanent financial audit records.';
+    -- Except by a shard move, which has committed a copy on the new node
+    IF COALESCE(@shard_move, 0) = 0 THEN
+        SIGNAL SQLSTATE '45000' 
+        SET MESSAGE_TEXT = 'SECURITY: Transactions cannot be deleted. They are permanent financial audit records.';
+    END IF;
 END //
 
 -- TRIGGER 4: PREVENT transaction updates (IMMUTABLE)
@@ -342,15 +789,71 @@ BEGIN
     SET MESSAGE_TEXT = 'SECURITY: Transactions cannot be modified. They are permanent financial audit records.';
 END //
 
--- TRIGGER 5: Auto-close fundraiser when goal is reached
+-- TRIGGER 5: Keep counters in step with fundraiser updates
+-- (the status change itself is made by trg_before_fundraiser_update)
 CREATE TRIGGER trg_check_goal_reached
 AFTER UPDATE ON Fundraiser
 FOR EACH ROW
 BEGIN
-    IF NEW.raised_amount >= NEW.goal_amount AND OLD.raised_amount < OLD.goal_amount THEN
-        UPDATE Fundraiser 
-        SET status = 'Goal Reached' 
+    DECLARE v_transactions INT;
+    DECLARE v_platform_fee DECIMAL(14,2);
+    DECLARE v_shard TINYINT UNSIGNED DEFAULT CounterShard();
+    
+    -- raised_amount moves with every donation: add the change to this
+    -- connection's counter shards rather than the shared rows
+    IF NEW.raised_amount <> OLD.raised_amount THEN
+        UPDATE PlatformCounterShards 
+        SET total_raised = total_raised + (NEW.raised_amount - OLD.raised_amount)
+        WHERE shard_no = v_shard;
+        
+        IF OLD.Admin_id <=> NEW.Admin_id THEN
+            UPDATE AdministratorCounterShards 
+            SET total_funds_managed = total_funds_managed + (NEW.raised_amount - OLD.raised_amount)
+            WHERE Admin_id = NEW.Admin_id AND shard_no = v_shard;
+        END IF;
+    END IF;
+    
+    -- Goal and status changes are rare and go to the base rows
+    IF NEW.goal_amount <> OLD.goal_amount OR NOT (NEW.status <=> OLD.status) THEN
+        UPDATE PlatformCounters 
+        SET total_goal = total_goal + (NEW.goal_amount - OLD.goal_amount),
+            active_fundraisers = active_fundraisers 
+                + (NEW.status = 'Active') - (OLD.status = 'Active'),
+            completed_fundraisers = completed_fundraisers 
+                + (NEW.status = 'Goal Reached') - (OLD.status = 'Goal Reached')
+        WHERE id = 1;
+    END IF;
+    
+    -- Keep the owning administrator's summary in step; if the fundraiser
+    -- changed hands, move its whole contribution to the new owner
+    IF OLD.Admin_id <=> NEW.Admin_id THEN
+        IF NOT (NEW.status <=> OLD.status) THEN
+            UPDATE AdministratorStats 
+            SET active_fundraisers = active_fundraisers 
+                    + (NEW.status = 'Active') - (OLD.status = 'Active')
+            WHERE Admin_id = NEW.Admin_id;
+        END IF;
+    ELSE
+        SELECT COALESCE(MAX(total_transactions), 0), COALESCE(MAX(total_platform_fee), 0) 
+        INTO v_transactions, v_platform_fee 
+        FROM FundraiserDonationStats 
         WHERE fundraiser_no = NEW.fundraiser_no;
+        
+        UPDATE AdministratorStats 
+        SET total_fundraisers = total_fundraisers - 1,
+            active_fundraisers = active_fundraisers - (OLD.status = 'Active'),
+            total_funds_managed = total_funds_managed - OLD.raised_amount,
+            total_transactions = total_transactions - v_transactions,
+            total_platform_fees = total_platform_fees - v_platform_fee
+        WHERE Admin_id = OLD.Admin_id;
+        
+        UPDATE AdministratorStats 
+        SET total_fundraisers = total_fundraisers + 1,
+            active_fundraisers = active_fundraisers + (NEW.status = 'Active'),
+            total_funds_managed = total_funds_managed + NEW.raised_amount,
+            total_transactions = total_transactions + v_transactions,
+            total_platform_fees = total_platform_fees + v_platform_fee
+        WHERE Admin_id = NEW.Admin_id;
     END IF;
 END //
 
@@ -358,7 +861,12 @@ END //
 CREATE TRIGGER trg_before_fundraiser_insert
 BEFORE INSERT ON Fundraiser
 FOR EACH ROW
-BEGIN
+trg_body: BEGIN
+    -- A shard move copies the row as it is, already counted on its old node
+    IF COALESCE(@shard_move, 0) = 1 THEN
+        LEAVE trg_body;
+    END IF;
+    
     SET NEW.remaining_amount = NEW.goal_amount;
     SET NEW.raised_amount = 0;
     
@@ -373,6 +881,19 @@ BEGIN
         SIGNAL SQLSTATE '45000' 
         SET MESSAGE_TEXT = 'Error: Deadline must be in the future';
     END IF;
+    
+    -- Count the new fundraiser in the platform totals
+    UPDATE PlatformCounters 
+    SET total_fundraisers = total_fundraisers + 1,
+        active_fundraisers = active_fundraisers + (NEW.status = 'Active'),
+        completed_fundraisers = completed_fundraisers + (NEW.status = 'Goal Reached'),
+        total_goal = total_goal + NEW.goal_amount
+    WHERE id = 1;
+    
+    UPDATE AdministratorStats 
+    SET total_fundraisers = total_fundraisers + 1,
+        active_fundraisers = active_fundraisers + (NEW.status = 'Active')
+    WHERE Admin_id = NEW.Admin_id;
 END //
 
 -- TRIGGER 7: Prevent manual deletion of Visits (audit trail)
@@ -380,24 +901,20 @@ CREATE TRIGGER trg_before_visit_delete
 BEFORE DELETE ON Visits
 FOR EACH ROW
 BEGIN
-    SIGNAL SQLSTATE '45000' 
-    SET MESSAGE_TEXT = 'SECURITY: Visits cannot be deleted. They are audit records for tracking donor engagement.';
+    IF COALESCE(@shard_move, 0) = 0 THEN
+        SIGNAL SQLSTATE '45000' 
+        SET MESSAGE_TEXT = 'SECURITY: Visits cannot be deleted. They are audit records for tracking donor engagement.';
+    END IF;
 END //
 
--- TRIGGER 8: Prevent manual updates to critical Visit fields (audit trail)
+-- TRIGGER 8: PREVENT updates to Visits (append-only audit trail)
+-- Current interest levels live in DonorFundraiserEngagement
 CREATE TRIGGER trg_before_visit_update
 BEFORE UPDATE ON Visits
 FOR EACH ROW
 BEGIN
-    -- Allow interest level updates only (automatic system updates)
-    IF NEW.donor_id != OLD.donor_id OR 
-       NEW.fundraiser_no != OLD.fundraiser_no OR 
-       NEW.visit_date != OLD.visit_date OR 
-       NEW.duration != OLD.duration OR
-       NEW.visit_type != OLD.visit_type THEN
-        SIGNAL SQLSTATE '45000' 
-        SET MESSAGE_TEXT = 'SECURITY: Visit records cannot be modified except interest_level (automatic update).';
-    END IF;
+    SIGNAL SQLSTATE '45000' 
+    SET MESSAGE_TEXT = 'SECURITY: Visit records cannot be modified. They are append-only audit records.';
 END //
 
 -- TRIGGER 9: PREVENT manual insertion into Payroll (system-managed)
@@ -410,6 +927,17 @@ BEGIN
         SIGNAL SQLSTATE '45000' 
         SET MESSAGE_TEXT = 'SECURITY: Payroll entries are automatically created by the system.';
     END IF;
+    
+    -- Bulk imports count their payouts once per chunk; shard moves not at all
+    IF COALESCE(@bulk_donation_import, 0) = 0 AND COALESCE(@shard_move, 0) = 0 THEN
+        UPDATE PlatformCounterShards 
+        SET total_admin_earnings = total_admin_earnings + NEW.admin_earnings 
+        WHERE shard_no = CounterShard();
+        
+        UPDATE AdministratorCounterShards 
+        SET total_payouts = total_payouts + 1 
+        WHERE Admin_id = NEW.Admin_id AND shard_no = CounterShard();
+    END IF;
 END //
 
 -- TRIGGER 10: PREVENT manual deletion of Payroll (audit trail)
@@ -417,8 +945,10 @@ CREATE TRIGGER trg_before_payroll_delete
 BEFORE DELETE ON Payroll
 FOR EACH ROW
 BEGIN
-    SIGNAL SQLSTATE '45000' 
-    SET MESSAGE_TEXT = 'SECURITY: Payroll records cannot be deleted. They are financial audit records.';
+    IF COALESCE(@shard_move, 0) = 0 THEN
+        SIGNAL SQLSTATE '45000' 
+        SET MESSAGE_TEXT = 'SECURITY: Payroll records cannot be deleted. They are financial audit records.';
+    END IF;
 END //
 
 -- TRIGGER 11: PREVENT updates to Payroll (audit trail)
@@ -430,15 +960,173 @@ BEGIN
     SET MESSAGE_TEXT = 'SECURITY: Payroll records cannot be modified. They are financial audit records.';
 END //
 
--- TRIGGER 12: Validate visit duration
+-- TRIGGER 12: Validate visit duration and track engagement
 CREATE TRIGGER trg_before_visit_insert
 BEFORE INSERT ON Visits
 FOR EACH ROW
-BEGIN
+trg_body: BEGIN
+    DECLARE v_visit_date TIMESTAMP;
+    DECLARE v_new_visitor INT;
+    DECLARE v_locked INT;
+    
+    -- A shard move copies the engagement and summary rows itself
+    IF COALESCE(@shard_move, 0) = 1 THEN
+        LEAVE trg_body;
+    END IF;
+    
     IF NEW.duration < 0 THEN
         SIGNAL SQLSTATE '45000' 
         SET MESSAGE_TEXT = 'Error: Visit duration cannot be negative.';
     END IF;
+    
+    -- Share-lock the donor and fundraiser first, in the donation lock order
+    -- (see trigger 1), instead of at the INSERT's foreign-key checks after
+    -- the engagement and summary rows below. Otherwise a visit could hold
+    -- FundraiserVisitStats while waiting for a fundraiser that a donation
+    -- has locked and is about to record its own visit for.
+    SELECT 1 INTO v_locked FROM Donor WHERE donor_id = NEW.donor_id FOR SHARE;
+    SELECT 1 INTO v_locked FROM Fundraiser WHERE fundraiser_no = NEW.fundraiser_no FOR SHARE;
+    
+    SET v_visit_date = COALESCE(NEW.visit_date, CURRENT_TIMESTAMP);
+    
+    -- Atomically bump the pair's visit count; the row lock on the
+    -- engagement row serializes concurrent visits for the same pair only
+    INSERT INTO DonorFundraiserEngagement 
+        (donor_id, fundraiser_no, visit_count, total_duration, first_visit, last_visit, interest_level)
+    VALUES (NEW.donor_id, NEW.fundraiser_no, 1, NEW.duration, v_visit_date, v_visit_date, DetermineInterestLevel(1))
+    ON DUPLICATE KEY UPDATE 
+        visit_count = visit_count + 1,
+        total_duration = total_duration + NEW.duration,
+        last_visit = GREATEST(last_visit, v_visit_date),
+        interest_level = DetermineInterestLevel(visit_count);
+    
+    -- ROW_COUNT() is 1 when the pair's row was inserted (first visit)
+    SET v_new_visitor = (ROW_COUNT() = 1);
+    
+    INSERT INTO FundraiserVisitStats (fundraiser_no, total_visits, unique_visitors)
+    VALUES (NEW.fundraiser_no, 1, v_new_visitor)
+    ON DUPLICATE KEY UPDATE 
+        total_visits = total_visits + 1,
+        unique_visitors = unique_visitors + v_new_visitor;
+    
+    INSERT INTO FundraiserHourlyStats (bucket, fundraiser_no, visits, new_visitors)
+    VALUES (HourStart(v_visit_date), NEW.fundraiser_no, 1, v_new_visitor)
+    ON DUPLICATE KEY UPDATE 
+        visits = visits + 1,
+        new_visitors = new_visitors + v_new_visitor;
+    
+    INSERT INTO FundraiserEvents (fundraiser_no, kind) VALUES (NEW.fundraiser_no, 'visit');
+    
+    -- Stamp the visit with the interest level reached at this visit
+    SET NEW.interest_level = (
+        SELECT interest_level FROM DonorFundraiserEngagement 
+        WHERE donor_id = NEW.donor_id AND fundraiser_no = NEW.fundraiser_no
+    );
+    
+    UPDATE DonorStats 
+    SET total_visits = total_visits + 1,
+        fundraisers_visited = fundraisers_visited + v_new_visitor,
+        highest_interest_level = IF(InterestLevelRank(NEW.interest_level) > InterestLevelRank(highest_interest_level),
+                                    NEW.interest_level, highest_interest_level)
+    WHERE donor_id = NEW.donor_id;
+    
+    -- Count the visit; a donor's first visit anywhere is a new unique visitor
+    UPDATE PlatformCounterShards 
+    SET total_visits = total_visits + 1,
+        unique_visitors = unique_visitors 
+            + NOT EXISTS (SELECT 1 FROM Visits WHERE donor_id = NEW.donor_id)
+    WHERE shard_no = CounterShard();
+END //
+
+-- TRIGGERS 13-17: Keep PlatformCounters and the summary tables in step
+-- with row counts
+CREATE TRIGGER trg_after_fundraiser_delete
+AFTER DELETE ON Fundraiser
+FOR EACH ROW
+trg_body: BEGIN
+    IF COALESCE(@shard_move, 0) = 1 THEN
+        LEAVE trg_body;
+    END IF;
+    
+    UPDATE PlatformCounters 
+    SET total_fundraisers = total_fundraisers - 1,
+        active_fundraisers = active_fundraisers - (OLD.status = 'Active'),
+        completed_fundraisers = completed_fundraisers - (OLD.status = 'Goal Reached'),
+        total_goal = total_goal - OLD.goal_amount,
+        total_raised = total_raised - OLD.raised_amount
+    WHERE id = 1;
+    
+    UPDATE AdministratorStats 
+    SET total_fundraisers = total_fundraisers - 1,
+        active_fundraisers = active_fundraisers - (OLD.status = 'Active'),
+        total_funds_managed = total_funds_managed - OLD.raised_amount
+    WHERE Admin_id = OLD.Admin_id;
+END //
+
+CREATE TRIGGER trg_after_donor_insert
+AFTER INSERT ON Donor
+FOR EACH ROW
+BEGIN
+    UPDATE PlatformCounters SET total_donors = total_donors + 1 WHERE id = 1;
+    INSERT INTO DonorStats (donor_id) VALUES (NEW.donor_id);
+END //
+
+CREATE TRIGGER trg_after_donor_delete
+AFTER DELETE ON Donor
+FOR EACH ROW
+BEGIN
+    UPDATE PlatformCounters SET total_donors = total_donors - 1 WHERE id = 1;
+END //
+
+CREATE TRIGGER trg_after_administrator_insert
+AFTER INSERT ON Administrator
+FOR EACH ROW
+BEGIN
+    UPDATE PlatformCounters SET total_administrators = total_administrators + 1 WHERE id = 1;
+    INSERT INTO AdministratorStats (Admin_id) VALUES (NEW.Admin_id);
+    INSERT INTO AdministratorCounterShards (Admin_id, shard_no) 
+    SELECT NEW.Admin_id, shard_no FROM PlatformCounterShards;
+END //
+
+CREATE TRIGGER trg_after_administrator_delete
+AFTER DELETE ON Administrator
+FOR EACH ROW
+BEGIN
+    UPDATE PlatformCounters SET total_administrators = total_administrators - 1 WHERE id = 1;
+END //
+
+-- TRIGGER 18: Take a hard-deleted fundraiser's visits out of its visitors'
+-- summaries (the Visits/engagement rows go by FK cascade, which does not
+-- fire triggers)
+CREATE TRIGGER trg_before_fundraiser_delete
+BEFORE DELETE ON Fundraiser
+FOR EACH ROW
+trg_body: BEGIN
+    IF COALESCE(@shard_move, 0) = 1 THEN
+        LEAVE trg_body;
+    END IF;
+    
+    UPDATE DonorStats ds
+    JOIN DonorFundraiserEngagement e 
+        ON e.donor_id = ds.donor_id AND e.fundraiser_no = OLD.fundraiser_no
+    SET ds.fundraisers_visited = ds.fundraisers_visited - 1,
+        ds.total_visits = ds.total_visits - e.visit_count,
+        ds.highest_interest_level = (
+            SELECT ELT(MAX(InterestLevelRank(e2.interest_level)), 'Low', 'Medium', 'High', 'Very High')
+            FROM DonorFundraiserEngagement e2 
+            WHERE e2.donor_id = ds.donor_id AND e2.fundraiser_no <> OLD.fundraiser_no
+        );
+END //
+
+-- TRIGGER 19: Close the fundraiser in the same UPDATE that reaches its goal
+-- (a trigger cannot UPDATE its own table, so trg_check_goal_reached cannot)
+CREATE TRIGGER trg_before_fundraiser_update
+BEFORE UPDATE ON Fundraiser
+FOR EACH ROW
+BEGIN
+    IF NEW.raised_amount >= NEW.goal_amount AND OLD.raised_amount < OLD.goal_amount THEN
+        SET NEW.status = 'Goal Reached';
+    END IF;
 END //
 
 DELIMITER ;
@@ -446,6 +1134,63 @@ DELIMITER ;
 -- ==============================
 -- 12. CORRECTED VIEWS FOR REPORTING
 -- ==============================
+-- vw_active_fundraisers, vw_donor_engagement and vw_administrator_dashboard
+-- aggregate the base tables live and are the reference definitions for the
+-- *Stats summary tables (RefreshSummaryTables() rebuilds from them). Each
+-- child table is aggregated in its own derived table before joining, so
+-- visits, transactions and payouts never multiply each other. The app
+-- reads the summary tables instead.
+
+-- Platform totals: the PlatformCounters row plus its counter shards
+CREATE OR REPLACE VIEW vw_platform_counters AS
+SELECT 
+    pc.total_administrators,
+    pc.total_donors,
+    pc.total_fundraisers,
+    pc.active_fundraisers,
+    pc.completed_fundraisers,
+    pc.total_goal,
+    pc.total_raised + s.total_raised AS total_raised,
+    pc.total_transactions + s.total_transactions AS total_transactions,
+    pc.total_gross + s.total_gross AS total_gross,
+    pc.total_platform_fee + s.total_platform_fee AS total_platform_fee,
+    pc.total_net + s.total_net AS total_net,
+    pc.total_admin_earnings + s.total_admin_earnings AS total_admin_earnings,
+    pc.total_visits + s.total_visits AS total_visits,
+    pc.unique_visitors + s.unique_visitors AS unique_visitors
+FROM PlatformCounters pc
+CROSS JOIN (SELECT COALESCE(SUM(total_raised), 0) AS total_raised,
+                   COALESCE(SUM(total_transactions), 0) AS total_transactions,
+                   COALESCE(SUM(total_gross), 0) AS total_gross,
+                   COALESCE(SUM(total_platform_fee), 0) AS total_platform_fee,
+                   COALESCE(SUM(total_net), 0) AS total_net,
+                   COALESCE(SUM(total_admin_earnings), 0) AS total_admin_earnings,
+                   COALESCE(SUM(total_visits), 0) AS total_visits,
+                   COALESCE(SUM(unique_visitors), 0) AS unique_visitors
+            FROM PlatformCounterShards) s
+WHERE pc.id = 1;
+
+-- Per-administrator totals: Administrator.total_earnings and the
+-- AdministratorStats row plus their counter shards
+CREATE OR REPLACE VIEW vw_administrator_counters AS
+SELECT 
+    a.Admin_id,
+    a.total_earnings + COALESCE(sh.total_earnings, 0) AS total_earnings,
+    s.total_fundraisers,
+    s.active_fundraisers,
+    s.total_funds_managed + COALESCE(sh.total_funds_managed, 0) AS total_funds_managed,
+    s.total_transactions + COALESCE(sh.total_transactions, 0) AS total_transactions,
+    s.total_payouts + COALESCE(sh.total_payouts, 0) AS total_payouts,
+    s.total_platform_fees + COALESCE(sh.total_platform_fees, 0) AS total_platform_fees
+FROM Administrator a
+JOIN AdministratorStats s ON a.Admin_id = s.Admin_id
+LEFT JOIN (SELECT Admin_id,
+                  SUM(total_earnings) AS total_earnings,
+                  SUM(total_funds_managed) AS total_funds_managed,
+                  SUM(total_transactions) AS total_transactions,
+                  SUM(total_payouts) AS total_payouts,
+                  SUM(total_platform_fees) AS total_platform_fees
+           FROM AdministratorCounterShards GROUP BY Admin_id) sh ON a.Admin_id = sh.Admin_id;
 
 CREATE OR REPLACE VIEW vw_active_fundraisers AS
 SELECT 
@@ -462,15 +1207,16 @@ SELECT
     f.status,
     a.name AS admin_name,
     a.email AS admin_email,
-    COUNT(DISTINCT v.visit_id) AS total_visits,
-    COUNT(DISTINCT v.donor_id) AS unique_visitors,
-    COUNT(DISTINCT t.Transaction_id) AS total_transactions
+    COALESCE(v.total_visits, 0) AS total_visits,
+    COALESCE(v.unique_visitors, 0) AS unique_visitors,
+    COALESCE(t.total_transactions, 0) AS total_transactions
 FROM Fundraiser f
 LEFT JOIN Administrator a ON f.Admin_id = a.Admin_id
-LEFT JOIN Visits v ON f.fundraiser_no = v.fundraiser_no
-LEFT JOIN Transactions t ON f.fundraiser_no = t.fundraiser_no
+LEFT JOIN (SELECT fundraiser_no, COUNT(*) AS total_visits, COUNT(DISTINCT donor_id) AS unique_visitors
+           FROM Visits GROUP BY fundraiser_no) v ON f.fundraiser_no = v.fundraiser_no
+LEFT JOIN (SELECT fundraiser_no, COUNT(*) AS total_transactions
+           FROM Transactions GROUP BY fundraiser_no) t ON f.fundraiser_no = t.fundraiser_no
 WHERE f.status = 'Active'
-GROUP BY f.fundraiser_no
 ORDER BY f.deadline ASC;
 
 CREATE OR REPLACE VIEW vw_transaction_summary AS
@@ -500,15 +1246,19 @@ SELECT
     d.demail AS donor_email,
     d.dphone,
     d.total_donated,
-    COUNT(DISTINCT v.fundraiser_no) AS fundraisers_visited,
-    COUNT(v.visit_id) AS total_visits,
-    MAX(v.interest_level) AS highest_interest_level,
-    COUNT(DISTINCT t.Transaction_id) AS total_donations,
-    COALESCE(SUM(t.amount), 0) AS total_amount_donated
+    COALESCE(v.fundraisers_visited, 0) AS fundraisers_visited,
+    COALESCE(v.total_visits, 0) AS total_visits,
+    v.highest_interest_level,
+    COALESCE(t.total_donations, 0) AS total_donations,
+    COALESCE(t.total_amount_donated, 0) AS total_amount_donated
 FROM Donor d
-LEFT JOIN Visits v ON d.donor_id = v.donor_id
-LEFT JOIN Transactions t ON d.donor_id = t.donor_id
-GROUP BY d.donor_id
+LEFT JOIN (SELECT donor_id,
+                  COUNT(DISTINCT fundraiser_no) AS fundraisers_visited,
+                  COUNT(*) AS total_visits,
+                  ELT(MAX(InterestLevelRank(interest_level)), 'Low', 'Medium', 'High', 'Very High') AS highest_interest_level
+           FROM Visits GROUP BY donor_id) v ON d.donor_id = v.donor_id
+LEFT JOIN (SELECT donor_id, COUNT(*) AS total_donations, SUM(amount) AS total_amount_donated
+           FROM Transactions GROUP BY donor_id) t ON d.donor_id = t.donor_id
 ORDER BY d.total_donated DESC;
 
 CREATE OR REPLACE VIEW vw_administrator_dashboard AS
@@ -516,19 +1266,25 @@ SELECT
     a.Admin_id,
     a.name AS admin_name,
     a.email,
-    a.total_earnings AS total_earnings_received,
-    COUNT(DISTINCT f.fundraiser_no) AS total_fundraisers,
-    COUNT(DISTINCT CASE WHEN f.status = 'Active' THEN f.fundraiser_no END) AS active_fundraisers,
-    COALESCE(SUM(f.raised_amount), 0) AS total_funds_managed,
-    COUNT(DISTINCT t.Transaction_id) AS total_transactions,
-    COUNT(DISTINCT p.Payroll_id) AS total_payouts,
-    COALESCE(SUM(t.platform_fee), 0) AS total_platform_fees_from_fundraisers
+    a.total_earnings + COALESCE(e.total_earnings, 0) AS total_earnings_received,
+    COALESCE(f.total_fundraisers, 0) AS total_fundraisers,
+    COALESCE(f.active_fundraisers, 0) AS active_fundraisers,
+    COALESCE(f.total_funds_managed, 0) AS total_funds_managed,
+    COALESCE(t.total_transactions, 0) AS total_transactions,
+    COALESCE(p.total_payouts, 0) AS total_payouts,
+    COALESCE(t.total_platform_fees, 0) AS total_platform_fees_from_fundraisers
 FROM Administrator a
-LEFT JOIN Fundraiser f ON a.Admin_id = f.Admin_id
-LEFT JOIN Transactions t ON f.fundraiser_no = t.fundraiser_no
-LEFT JOIN Payroll p ON a.Admin_id = p.Admin_id
-GROUP BY a.Admin_id
-ORDER BY a.total_earnings DESC;
+LEFT JOIN (SELECT Admin_id, SUM(total_earnings) AS total_earnings
+           FROM AdministratorCounterShards GROUP BY Admin_id) e ON a.Admin_id = e.Admin_id
+LEFT JOIN (SELECT Admin_id, COUNT(*) AS total_fundraisers, SUM(status = 'Active') AS active_fundraisers,
+                  SUM(raised_amount) AS total_funds_managed
+           FROM Fundraiser GROUP BY Admin_id) f ON a.Admin_id = f.Admin_id
+LEFT JOIN (SELECT fr.Admin_id, COUNT(*) AS total_transactions, SUM(tr.platform_fee) AS total_platform_fees
+           FROM Transactions tr JOIN Fundraiser fr ON tr.fundraiser_no = fr.fundraiser_no
+           GROUP BY fr.Admin_id) t ON a.Admin_id = t.Admin_id
+LEFT JOIN (SELECT Admin_id, COUNT(*) AS total_payouts
+           FROM Payroll GROUP BY Admin_id) p ON a.Admin_id = p.Admin_id
+ORDER BY total_earnings_received DESC;
 
 CREATE OR REPLACE VIEW vw_high_interest_donors AS
 SELECT 
@@ -536,23 +1292,21 @@ SELECT
     d.dname AS donor_name,
     f.fundraiser_no,
     f.title AS fundraiser_title,
-    COUNT(v.visit_id) AS visit_count,
-    MAX(v.interest_level) AS interest_level,
-    MAX(v.visit_date) AS last_visit,
+    e.visit_count,
+    e.interest_level,
+    e.last_visit,
     CASE 
         WHEN EXISTS (SELECT 1 FROM Transactions t 
-                     WHERE t.donor_id = d.donor_id 
-                     AND t.fundraiser_no = f.fundraiser_no) 
+                     WHERE t.donor_id = e.donor_id 
+                     AND t.fundraiser_no = e.fundraiser_no) 
         THEN 'DONATED' 
         ELSE 'NOT YET DONATED' 
     END AS donation_status
-FROM Donor d
-JOIN Visits v ON d.donor_id = v.donor_id
-JOIN Fundraiser f ON v.fundraiser_no = f.fundraiser_no
-WHERE v.interest_level IN ('High', 'Very High')
-GROUP BY d.donor_id, f.fundraiser_no
-HAVING visit_count >= 5
-ORDER BY visit_count DESC;
+FROM DonorFundraiserEngagement e
+JOIN Donor d ON e.donor_id = d.donor_id
+JOIN Fundraiser f ON e.fundraiser_no = f.fundraiser_no
+WHERE e.visit_count >= 5
+ORDER BY e.visit_count DESC;
 
 -- ==============================
 -- 13. TEST DATA & DEMONSTRATIONS
@@ -646,7 +1400,7 @@ CORRECT USAGE FLOW:
    -- - Credits ₹4950 to fundraiser
    -- - Creates payroll entry for admin
    -- - Records a visit with type 'Transaction'
-   -- - Updates interest level for all visits
+   -- - Updates the donor's engagement row (visit count, interest level)
    -- - Updates donor's total donated
    -- - Updates admin's total commission
 
@@ -1015,29 +1769,23 @@ BEGIN
         SET MESSAGE_TEXT = 'Error: Fundraiser does not exist';
     END IF;
     
-    -- Get current visit count
-    SET v_visit_count = GetVisitCount(p_donor_id, p_fundraiser_no);
-    
-    -- Determine interest level (including this visit)
-    SET v_interest_level = DetermineInterestLevel(v_visit_count + 1);
+    -- Record the visit (the insert trigger bumps DonorFundraiserEngagement
+    -- and stamps the interest level reached with this visit)
+    INSERT INTO Visits (donor_id, fundraiser_no, duration, visit_type)
+    VALUES (p_donor_id, p_fundraiser_no, p_duration, 'View');
     
-    -- Record the visit with calculated interest level
-    INSERT INTO Visits (donor_id, fundraiser_no, duration, interest_level, visit_type)
-    VALUES (p_donor_id, p_fundraiser_no, p_duration, v_interest_level, 'View');
-    
-    -- Update ALL previous visits from this donor to this fundraiser
-    -- Interest level increases as more visits are recorded
-    UPDATE Visits 
-    SET interest_level = v_interest_level
+    SELECT visit_count, interest_level 
+    INTO v_visit_count, v_interest_level
+    FROM DonorFundraiserEngagement 
     WHERE donor_id = p_donor_id AND fundraiser_no = p_fundraiser_no;
     
     SELECT 
         'Visit recorded successfully!' AS Message,
-        v_visit_count + 1 AS Total_Visits,
+        v_visit_count AS Total_Visits,
         v_interest_level AS Current_Interest_Level,
         CASE 
-            WHEN v_visit_count + 1 >= 5 THEN 'Donor showing strong interest!'
-            WHEN v_visit_count + 1 >= 3 THEN 'Donor showing moderate interest'
+            WHEN v_visit_count >= 5 THEN 'Donor showing strong interest!'
+            WHEN v_visit_count >= 3 THEN 'Donor showing moderate interest'
             ELSE 'New visitor'
         END AS Interest_Status;
 END //
@@ -1053,9 +1801,11 @@ BEGIN
         v.duration, 
         v.interest_level,
         v.visit_type,
-        COUNT(*) OVER (PARTITION BY v.donor_id) AS total_donor_visits
+        e.visit_count AS total_donor_visits
     FROM Visits v
     JOIN Donor d ON v.donor_id = d.donor_id
+    JOIN DonorFundraiserEngagement e 
+        ON e.donor_id = v.donor_id AND e.fundraiser_no = v.fundraiser_no
     WHERE v.fundraiser_no = p_fundraiser_no
     ORDER BY v.visit_date DESC;
 END //
@@ -1070,9 +1820,11 @@ BEGIN
         v.duration,
         v.interest_level,
         v.visit_type,
-        COUNT(*) OVER (PARTITION BY v.fundraiser_no) AS visits_to_fundraiser
+        e.visit_count AS visits_to_fundraiser
     FROM Visits v
     JOIN Fundraiser f ON v.fundraiser_no = f.fundraiser_no
+    JOIN DonorFundraiserEngagement e 
+        ON e.donor_id = v.donor_id AND e.fundraiser_no = v.fundraiser_no
     WHERE v.donor_id = p_donor_id
     ORDER BY v.visit_date DESC;
 END //
@@ -1083,22 +1835,21 @@ BEGIN
     SELECT 
         f.fundraiser_no,
         f.title,
-        COUNT(v.visit_id) AS total_visits,
-        MAX(v.interest_level) AS interest_level,
-        MAX(v.visit_date) AS last_visit,
-        COALESCE(SUM(t.amount), 0) AS total_donated,
+        e.visit_count AS total_visits,
+        e.interest_level,
+        e.last_visit,
+        COALESCE((SELECT SUM(t.amount) FROM Transactions t 
+                  WHERE t.donor_id = e.donor_id AND t.fundraiser_no = e.fundraiser_no), 0) AS total_donated,
         CASE 
-            WHEN COUNT(v.visit_id) >= 10 THEN 'Very High - Ready to donate!'
-            WHEN COUNT(v.visit_id) >= 5 THEN 'High - Strong interest'
-            WHEN COUNT(v.visit_id) >= 3 THEN 'Medium - Growing interest'
+            WHEN e.visit_count >= 10 THEN 'Very High - Ready to donate!'
+            WHEN e.visit_count >= 5 THEN 'High - Strong interest'
+            WHEN e.visit_count >= 3 THEN 'Medium - Growing interest'
             ELSE 'Low - Just exploring'
         END AS engagement_status
-    FROM Fundraiser f
-    LEFT JOIN Visits v ON f.fundraiser_no = v.fundraiser_no AND v.donor_id = p_donor_id
-    LEFT JOIN Transactions t ON f.fundraiser_no = t.fundraiser_no AND t.donor_id = p_donor_id
-    WHERE v.visit_id IS NOT NULL
-    GROUP BY f.fundraiser_no, f.title
-    ORDER BY total_visits DESC;
+    FROM DonorFundraiserEngagement e
+    JOIN Fundraiser f ON e.fundraiser_no = f.fundraiser_no
+    WHERE e.donor_id = p_donor_id
+    ORDER BY e.visit_count DESC;
 END //
 
 DELIMITER ;
@@ -1116,88 +1867,227 @@ CREATE PROCEDURE ProcessDonation(
     IN p_amount DECIMAL(12,2),
     IN p_payment_mode VARCHAR(50)
 )
+BEGIN
+    CALL ProcessDonationOnce(NULL, p_donor_id, p_fundraiser_no, p_amount, p_payment_mode);
+END //
+
+-- ProcessDonation with an optional client idempotency key (NULL for none)
+-- Validation and the goal check happen in trg_before_transaction_insert,
+-- which locks the donor and then the fundraiser before anything else, so
+-- concurrent donations to one fundraiser queue on its row instead of
+-- deadlocking. The key is claimed first in the same transaction: a
+-- concurrent request with the same key waits for this one and then fails
+-- with a duplicate-key error, and the caller reads the stored result.
+-- Errors are re-raised to the caller after the rollback.
+CREATE PROCEDURE ProcessDonationOnce(
+    IN p_idempotency_key VARCHAR(64),
+    IN p_donor_id INT, 
+    IN p_fundraiser_no INT, 
+    IN p_amount DECIMAL(12,2),
+    IN p_payment_mode VARCHAR(50)
+)
 BEGIN
     DECLARE v_platform_fee DECIMAL(12,2);
     DECLARE v_net_amount DECIMAL(12,2);
-    DECLARE v_admin_id INT;
     DECLARE v_visit_count INT;
     DECLARE v_interest_level VARCHAR(50);
-    DECLARE v_fundraiser_status VARCHAR(50);
-    DECLARE v_remaining DECIMAL(12,2);
+    DECLARE v_transaction_id INT;
+    DECLARE v_fee_distribution VARCHAR(200);
     
     DECLARE EXIT HANDLER FOR SQLEXCEPTION
     BEGIN
         ROLLBACK;
-        SELECT 'Error: Transaction failed. Please check all parameters.' AS Error_Message;
+        RESIGNAL;
     END;
     
-    START TRANSACTION;
-    
-    -- Validate donor exists
-    IF NOT EXISTS (SELECT 1 FROM Donor WHERE donor_id = p_donor_id) THEN
-        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Error: Donor does not exist';
-    END IF;
-    
-    -- Validate fundraiser exists and get details
-    SELECT Admin_id, status, remaining_amount 
-    INTO v_admin_id, v_fundraiser_status, v_remaining
-    FROM Fundraiser 
-    WHERE fundraiser_no = p_fundraiser_no;
-    
-    IF v_admin_id IS NULL THEN
-        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Error: Fundraiser does not exist';
-    END IF;
-    
-    -- Check if fundraiser is active
-    IF v_fundraiser_status != 'Active' THEN
-        SIGNAL SQLSTATE '45000' 
-        SET MESSAGE_TEXT = 'Error: Fundraiser is not active. Cannot accept donations.';
-    END IF;
-    
     -- Validate amount
-    IF p_amount <= 0 THEN
+    IF p_amount IS NULL OR p_amount <= 0 THEN
         SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Error: Amount must be greater than 0';
     END IF;
     
     -- Calculate platform fee (1%) and net amount (99%)
     SET v_platform_fee = CalculatePlatformFee(p_amount);
     SET v_net_amount = CalculateNetAmount(p_amount);
+    SET v_fee_distribution = CONCAT('Platform keeps: ₹', v_platform_fee, ' | Admin receives: ₹', v_net_amount);
     
-    -- Check if donation exceeds remaining amount
-    IF v_net_amount > v_remaining THEN
-        SIGNAL SQLSTATE '45000' 
-        SET MESSAGE_TEXT = 'Error: Donation exceeds remaining goal amount';
+    START TRANSACTION;
+    
+    IF p_idempotency_key IS NOT NULL THEN
+        INSERT INTO DonationIdempotencyKeys (idempotency_key, donor_id, fundraiser_no, amount, payment_mode)
+        VALUES (p_idempotency_key, p_donor_id, p_fundraiser_no, p_amount, p_payment_mode);
     END IF;
     
-    -- Insert transaction (triggers will handle the rest)
+    -- Insert transaction (triggers validate, reserve the amount and handle the rest)
     INSERT INTO Transactions (donor_id, fundraiser_no, amount, platform_fee, net_amount, payment_mode)
     VALUES (p_donor_id, p_fundraiser_no, p_amount, v_platform_fee, v_net_amount, p_payment_mode);
     
-    -- Auto-record visit for transaction
-    SET v_visit_count = GetVisitCount(p_donor_id, p_fundraiser_no);
-    SET v_interest_level = DetermineInterestLevel(v_visit_count + 1);
+    SET v_transaction_id = LAST_INSERT_ID();
     
-    INSERT INTO Visits (donor_id, fundraiser_no, duration, interest_level, visit_type)
-    VALUES (p_donor_id, p_fundraiser_no, 20, v_interest_level, 'Transaction');
+    -- Auto-record visit for transaction (trigger updates engagement)
+    INSERT INTO Visits (donor_id, fundraiser_no, duration, visit_type)
+    VALUES (p_donor_id, p_fundraiser_no, 20, 'Transaction');
     
-    -- Update all visit interest levels for this donor-fundraiser pair
-    UPDATE Visits 
-    SET interest_level = v_interest_level
+    SELECT visit_count, interest_level 
+    INTO v_visit_count, v_interest_level
+    FROM DonorFundraiserEngagement 
     WHERE donor_id = p_donor_id AND fundraiser_no = p_fundraiser_no;
     
+    -- Store the result row below for replays of this key
+    IF p_idempotency_key IS NOT NULL THEN
+        UPDATE DonationIdempotencyKeys 
+        SET Transaction_id = v_transaction_id,
+            result = JSON_OBJECT(
+                'Message', 'Donation processed successfully!',
+                'Transaction_id', v_transaction_id,
+                'Gross_Amount', p_amount,
+                'Platform_Fee_1_Percent', v_platform_fee,
+                'Net_To_Fundraiser', v_net_amount,
+                'Admin_Receives_Via_Payroll', v_net_amount,
+                'Fee_Distribution', v_fee_distribution,
+                'Donor_Interest_Level', v_interest_level,
+                'Total_Visits_To_Fundraiser', v_visit_count)
+        WHERE idempotency_key = p_idempotency_key;
+    END IF;
+    
     COMMIT;
     
     -- Return success message with corrected breakdown
     SELECT 
         'Donation processed successfully!' AS Message, 
-        LAST_INSERT_ID() AS Transaction_id,
+        v_transaction_id AS Transaction_id,
         p_amount AS Gross_Amount,
         v_platform_fee AS Platform_Fee_1_Percent,
         v_net_amount AS Net_To_Fundraiser,
         v_net_amount AS Admin_Receives_Via_Payroll,
-        CONCAT('Platform keeps: ₹', v_platform_fee, ' | Admin receives: ₹', v_net_amount) AS Fee_Distribution,
+        v_fee_distribution AS Fee_Distribution,
         v_interest_level AS Donor_Interest_Level,
-        v_visit_count + 1 AS Total_Visits_To_Fundraiser;
+        v_visit_count AS Total_Visits_To_Fundraiser;
+END //
+
+-- Apply the side effects of bulk-imported Transactions 
+-- (Transaction_id p_first_id..p_last_id, every p_step-th id: the node's 
+-- auto_increment_increment) with one set-based statement per table instead 
+-- of per row: Payroll rows, raised/remaining amounts, donor 
+-- and administrator totals, summary tables and platform counters. Called 
+-- by the bulk importer inside its own transaction with 
+-- @bulk_donation_import = 1, after it has validated and locked the 
+-- donors and fundraisers (in that order); does not commit.
+CREATE PROCEDURE ApplyBulkDonations(IN p_first_id INT, IN p_last_id INT, IN p_step INT)
+BEGIN
+    INSERT INTO Payroll (Admin_id, fundraiser_no, Transaction_id, admin_earnings, platform_fee_deducted, payout_date)
+    SELECT f.Admin_id, t.fundraiser_no, t.Transaction_id, t.net_amount, t.platform_fee, t.transaction_date
+    FROM Transactions t
+    JOIN Fundraiser f ON t.fundraiser_no = f.fundraiser_no
+    WHERE t.Transaction_id BETWEEN p_first_id AND p_last_id AND (t.Transaction_id - p_first_id) % p_step = 0
+    ORDER BY t.Transaction_id;
+    
+    -- Single-table UPDATE so remaining_amount sees the new raised_amount;
+    -- the goal-reached trigger fires once per fundraiser
+    UPDATE Fundraiser f
+    SET f.raised_amount = f.raised_amount + (
+            SELECT SUM(t.net_amount) FROM Transactions t 
+            WHERE t.Transaction_id BETWEEN p_first_id AND p_last_id AND (t.Transaction_id - p_first_id) % p_step = 0 
+            AND t.fundraiser_no = f.fundraiser_no),
+        f.remaining_amount = f.goal_amount - f.raised_amount
+    WHERE f.fundraiser_no IN (
+        SELECT fundraiser_no FROM Transactions 
+        WHERE Transaction_id BETWEEN p_first_id AND p_last_id AND (Transaction_id - p_first_id) % p_step = 0);
+    
+    UPDATE Donor d
+    JOIN (SELECT donor_id, COUNT(*) AS n, SUM(amount) AS gross
+          FROM Transactions 
+          WHERE Transaction_id BETWEEN p_first_id AND p_last_id AND (Transaction_id - p_first_id) % p_step = 0 
+          GROUP BY donor_id) t ON d.donor_id = t.donor_id
+    JOIN DonorStats ds ON ds.donor_id = t.donor_id
+    SET d.total_donated = d.total_donated + t.gross,
+        ds.total_donations = ds.total_donations + t.n,
+        ds.total_amount_donated = ds.total_amount_donated + t.gross;
+    
+    UPDATE Administrator a
+    JOIN (SELECT f.Admin_id, COUNT(*) AS n, SUM(t.platform_fee) AS fee, SUM(t.net_amount) AS net
+          FROM Transactions t 
+          JOIN Fundraiser f ON t.fundraiser_no = f.fundraiser_no
+          WHERE t.Transaction_id BETWEEN p_first_id AND p_last_id AND (t.Transaction_id - p_first_id) % p_step = 0 
+          GROUP BY f.Admin_id) t ON a.Admin_id = t.Admin_id
+    JOIN AdministratorStats s ON s.Admin_id = t.Admin_id
+    SET a.total_earnings = a.total_earnings + t.net,
+        s.total_transactions = s.total_transactions + t.n,
+        s.total_payouts = s.total_payouts + t.n,
+        s.total_platform_fees = s.total_platform_fees + t.fee;
+    
+    INSERT INTO FundraiserDonationStats (fundraiser_no, total_transactions, total_gross, total_platform_fee, total_net)
+    SELECT * FROM (
+        SELECT fundraiser_no, COUNT(*) AS n, SUM(amount) AS gross, SUM(platform_fee) AS fee, SUM(net_amount) AS net
+        FROM Transactions 
+        WHERE Transaction_id BETWEEN p_first_id AND p_last_id AND (Transaction_id - p_first_id) % p_step = 0 
+        GROUP BY fundraiser_no
+    ) t
+    ON DUPLICATE KEY UPDATE 
+        total_transactions = total_transactions + t.n,
+        total_gross = total_gross + t.gross,
+        total_platform_fee = total_platform_fee + t.fee,
+        total_net = total_net + t.net;
+    
+    UPDATE PlatformCounters pc
+    CROSS JOIN (SELECT COUNT(*) AS n, SUM(amount) AS gross, SUM(platform_fee) AS fee, SUM(net_amount) AS net
+                FROM Transactions 
+                WHERE Transaction_id BETWEEN p_first_id AND p_last_id AND (Transaction_id - p_first_id) % p_step = 0) t
+    SET pc.total_transactions = pc.total_transactions + t.n,
+        pc.total_gross = pc.total_gross + t.gross,
+        pc.total_platform_fee = pc.total_platform_fee + t.fee,
+        pc.total_net = pc.total_net + t.net,
+        pc.total_admin_earnings = pc.total_admin_earnings + t.net
+    WHERE pc.id = 1;
+    
+    -- Leaderboard buckets; backfilled donations older than the longest
+    -- window (30 days) would never be read
+    INSERT INTO LeaderboardBuckets (board, bucket, entity_id, amount, donations)
+    SELECT * FROM (
+        SELECT 'donor' AS board, HourStart(transaction_date) AS bucket, donor_id AS entity_id,
+               SUM(amount) AS total, COUNT(*) AS n
+        FROM Transactions 
+        WHERE Transaction_id BETWEEN p_first_id AND p_last_id AND (Transaction_id - p_first_id) % p_step = 0 
+        AND transaction_date >= NOW() - INTERVAL 31 DAY
+        GROUP BY HourStart(transaction_date), donor_id
+    ) t
+    ON DUPLICATE KEY UPDATE 
+        amount = amount + t.total,
+        donations = donations + t.n;
+    
+    -- Hourly rollups, for every hour the chunk touches
+    INSERT INTO FundraiserHourlyStats (bucket, fundraiser_no, transactions, gross, platform_fee, net)
+    SELECT * FROM (
+        SELECT HourStart(transaction_date) AS hour_start, fundraiser_no AS fno, COUNT(*) AS n,
+               SUM(amount) AS gross_sum, SUM(platform_fee) AS fee, SUM(net_amount) AS net_sum
+        FROM Transactions 
+        WHERE Transaction_id BETWEEN p_first_id AND p_last_id AND (Transaction_id - p_first_id) % p_step = 0 
+        GROUP BY HourStart(transaction_date), fundraiser_no
+    ) t
+    ON DUPLICATE KEY UPDATE 
+        transactions = transactions + t.n,
+        gross = gross + t.gross_sum,
+        platform_fee = platform_fee + t.fee,
+        net = net + t.net_sum;
+    
+    INSERT INTO PaymentModeHourlyStats (bucket, payment_mode, shard_no, transactions, gross, platform_fee, net)
+    SELECT * FROM (
+        SELECT HourStart(transaction_date) AS hour_start, payment_mode AS pmode, CounterShard() AS shard,
+               COUNT(*) AS n, SUM(amount) AS gross_sum, SUM(platform_fee) AS fee, SUM(net_amount) AS net_sum
+        FROM Transactions 
+        WHERE Transaction_id BETWEEN p_first_id AND p_last_id AND (Transaction_id - p_first_id) % p_step = 0 
+        GROUP BY HourStart(transaction_date), payment_mode
+    ) t
+    ON DUPLICATE KEY UPDATE 
+        transactions = transactions + t.n,
+        gross = gross + t.gross_sum,
+        platform_fee = platform_fee + t.fee,
+        net = net + t.net_sum;
+    
+    -- One change-feed event per fundraiser for the whole chunk
+    INSERT INTO FundraiserEvents (fundraiser_no, kind)
+    SELECT DISTINCT fundraiser_no, 'donation'
+    FROM Transactions 
+    WHERE Transaction_id BETWEEN p_first_id AND p_last_id AND (Transaction_id - p_first_id) % p_step = 0;
 END //
 
 -- View transaction details (READ-ONLY)
@@ -1254,15 +2144,15 @@ BEGIN
         DATEDIFF(f.deadline, CURDATE()) AS days_remaining,
         a.name AS Administrator_Name,
         a.email AS Administrator_Email,
-        COUNT(DISTINCT t.Transaction_id) AS Total_Transactions,
-        COUNT(DISTINCT v.visit_id) AS Total_Visits,
-        COUNT(DISTINCT v.donor_id) AS Unique_Visitors,
+        COUNT(t.Transaction_id) AS Total_Transactions,
+        COALESCE(MAX(vs.total_visits), 0) AS Total_Visits,
+        COALESCE(MAX(vs.unique_visitors), 0) AS Unique_Visitors,
         COALESCE(SUM(t.platform_fee), 0) AS Total_Platform_Fees,
         COALESCE(SUM(t.net_amount), 0) AS Total_Net_Amount
     FROM Fundraiser f
     LEFT JOIN Administrator a ON f.Admin_id = a.Admin_id
     LEFT JOIN Transactions t ON f.fundraiser_no = t.fundraiser_no
-    LEFT JOIN Visits v ON f.fundraiser_no = v.fundraiser_no
+    LEFT JOIN FundraiserVisitStats vs ON f.fundraiser_no = vs.fundraiser_no
     WHERE f.fundraiser_no = p_fundraiser_no
     GROUP BY f.fundraiser_no;
 END //
@@ -1296,7 +2186,7 @@ BEGIN
         a.Admin_id,
         a.name,
         a.email,
-        a.total_earnings AS Total_Earnings_Received,
+        c.total_earnings AS Total_Earnings_Received,
         COUNT(DISTINCT f.fundraiser_no) AS Total_Fundraisers,
         COUNT(DISTINCT CASE WHEN f.status = 'Active' THEN f.fundraiser_no END) AS Active_Fundraisers,
         COALESCE(SUM(f.raised_amount), 0) AS Total_Funds_Managed,
@@ -1308,11 +2198,12 @@ BEGIN
                ') | Platform collects 1% (₹', 
                COALESCE(SUM(t.platform_fee), 0), ')') AS Earnings_Breakdown
     FROM Administrator a
+    JOIN vw_administrator_counters c ON a.Admin_id = c.Admin_id
     LEFT JOIN Fundraiser f ON a.Admin_id = f.Admin_id
     LEFT JOIN Transactions t ON f.fundraiser_no = t.fundraiser_no
     LEFT JOIN Payroll p ON a.Admin_id = p.Admin_id
     WHERE a.Admin_id = p_Admin_id
-    GROUP BY a.Admin_id;
+    GROUP BY a.Admin_id, c.total_earnings;
 END //
 
 CREATE PROCEDURE ViewAuditTrail(IN p_fundraiser_no INT)
@@ -1343,28 +2234,276 @@ BEGIN
     ORDER BY Date_Time DESC;
 END //
 
--- Get overall platform statistics
+-- Get overall platform statistics (PlatformCounters plus its shards)
 CREATE PROCEDURE GetPlatformStatistics()
 BEGIN
     SELECT 
-        (SELECT COUNT(*) FROM Administrator) AS Total_Administrators,
-        (SELECT COUNT(*) FROM Donor) AS Total_Donors,
-        (SELECT COUNT(*) FROM Fundraiser) AS Total_Fundraisers,
-        (SELECT COUNT(*) FROM Fundraiser WHERE status = 'Active') AS Active_Fundraisers,
-        (SELECT COUNT(*) FROM Fundraiser WHERE status = 'Goal Reached') AS Completed_Fundraisers,
-        (SELECT COUNT(*) FROM Transactions) AS Total_Transactions,
-        (SELECT COALESCE(SUM(amount), 0) FROM Transactions) AS Total_Gross_Donations,
-        (SELECT COALESCE(SUM(platform_fee), 0) FROM Transactions) AS Total_Platform_Revenue,
-        (SELECT COALESCE(SUM(net_amount), 0) FROM Transactions) AS Total_To_Fundraisers,
-        (SELECT COALESCE(SUM(admin_earnings), 0) FROM Payroll) AS Total_Admin_Earnings,
-        (SELECT COUNT(*) FROM Visits) AS Total_Visits,
-        (SELECT COUNT(DISTINCT donor_id) FROM Visits) AS Unique_Visitors,
-        CONCAT('Platform earned: ₹', 
-               (SELECT COALESCE(SUM(platform_fee), 0) FROM Transactions),
-               ' (1% of all donations)') AS Platform_Revenue_Note,
-        CONCAT('Admins earned: ₹',
-               (SELECT COALESCE(SUM(admin_earnings), 0) FROM Payroll),
-               ' (99% of all donations)') AS Admin_Revenue_Note;
+        total_administrators AS Total_Administrators,
+        total_donors AS Total_Donors,
+        total_fundraisers AS Total_Fundraisers,
+        active_fundraisers AS Active_Fundraisers,
+        completed_fundraisers AS Completed_Fundraisers,
+        total_transactions AS Total_Transactions,
+        total_gross AS Total_Gross_Donations,
+        total_platform_fee AS Total_Platform_Revenue,
+        total_net AS Total_To_Fundraisers,
+        total_admin_earnings AS Total_Admin_Earnings,
+        total_visits AS Total_Visits,
+        unique_visitors AS Unique_Visitors,
+        CONCAT('Platform earned: ₹', total_platform_fee, ' (1% of all donations)') AS Platform_Revenue_Note,
+        CONCAT('Admins earned: ₹', total_admin_earnings, ' (99% of all donations)') AS Admin_Revenue_Note
+    FROM vw_platform_counters;
+END //
+
+-- Fold the counter shards into their base rows (PlatformCounters,
+-- Administrator.total_earnings, AdministratorStats) and zero them. Reads
+-- add the shards anyway, so this only has to run before the rebuilds
+-- below, which overwrite the base rows. Does not commit.
+CREATE PROCEDURE FoldCounterShards()
+BEGIN
+    DECLARE v_rows INT;
+    
+    -- Lock every shard so no donation adds to one between fold and reset
+    SELECT COUNT(*) INTO v_rows FROM PlatformCounterShards FOR UPDATE;
+    SELECT COUNT(*) INTO v_rows FROM AdministratorCounterShards FOR UPDATE;
+    
+    UPDATE PlatformCounters pc
+    CROSS JOIN (SELECT COALESCE(SUM(total_raised), 0) AS raised,
+                       COALESCE(SUM(total_transactions), 0) AS n,
+                       COALESCE(SUM(total_gross), 0) AS gross,
+                       COALESCE(SUM(total_platform_fee), 0) AS fee,
+                       COALESCE(SUM(total_net), 0) AS net,
+                       COALESCE(SUM(total_admin_earnings), 0) AS earnings,
+                       COALESCE(SUM(total_visits), 0) AS visits,
+                       COALESCE(SUM(unique_visitors), 0) AS uniq
+                FROM PlatformCounterShards) s
+    SET pc.total_raised = pc.total_raised + s.raised,
+        pc.total_transactions = pc.total_transactions + s.n,
+        pc.total_gross = pc.total_gross + s.gross,
+        pc.total_platform_fee = pc.total_platform_fee + s.fee,
+        pc.total_net = pc.total_net + s.net,
+        pc.total_admin_earnings = pc.total_admin_earnings + s.earnings,
+        pc.total_visits = pc.total_visits + s.visits,
+        pc.unique_visitors = pc.unique_visitors + s.uniq
+    WHERE pc.id = 1;
+    
+    UPDATE Administrator a
+    JOIN (SELECT Admin_id, SUM(total_earnings) AS earnings, SUM(total_funds_managed) AS managed,
+                 SUM(total_transactions) AS n, SUM(total_payouts) AS payouts, SUM(total_platform_fees) AS fees
+          FROM AdministratorCounterShards GROUP BY Admin_id) sh ON a.Admin_id = sh.Admin_id
+    JOIN AdministratorStats s ON s.Admin_id = sh.Admin_id
+    SET a.total_earnings = a.total_earnings + sh.earnings,
+        s.total_funds_managed = s.total_funds_managed + sh.managed,
+        s.total_transactions = s.total_transactions + sh.n,
+        s.total_payouts = s.total_payouts + sh.payouts,
+        s.total_platform_fees = s.total_platform_fees + sh.fees;
+    
+    UPDATE PlatformCounterShards 
+    SET total_raised = 0, total_transactions = 0, total_gross = 0, total_platform_fee = 0,
+        total_net = 0, total_admin_earnings = 0, total_visits = 0, unique_visitors = 0;
+    
+    UPDATE AdministratorCounterShards 
+    SET total_earnings = 0, total_funds_managed = 0, total_transactions = 0,
+        total_payouts = 0, total_platform_fees = 0;
+END //
+
+-- Recompute the donor and administrator running totals from this node's
+-- Transactions and Payroll (after a shard move, which copies and deletes
+-- rows without the triggers)
+CREATE PROCEDURE ReconcileRunningTotals()
+BEGIN
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+    
+    START TRANSACTION;
+    CALL FoldCounterShards();
+    
+    UPDATE Donor d
+    LEFT JOIN (SELECT donor_id, SUM(amount) AS gross FROM Transactions GROUP BY donor_id) t
+        ON d.donor_id = t.donor_id
+    SET d.total_donated = COALESCE(t.gross, 0);
+    
+    UPDATE Administrator a
+    LEFT JOIN (SELECT Admin_id, SUM(admin_earnings) AS earnings FROM Payroll GROUP BY Admin_id) p
+        ON a.Admin_id = p.Admin_id
+    SET a.total_earnings = COALESCE(p.earnings, 0);
+    COMMIT;
+    
+    SELECT 'Running totals reconciled' AS Message;
+END //
+
+-- Rebuild PlatformCounters from the base tables (run after bulk loads or
+-- if the counters are suspected to have drifted)
+CREATE PROCEDURE ReconcilePlatformCounters()
+BEGIN
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+    
+    START TRANSACTION;
+    INSERT IGNORE INTO PlatformCounters (id) VALUES (1);
+    CALL FoldCounterShards();
+    
+    UPDATE PlatformCounters pc
+    CROSS JOIN (SELECT COUNT(*) AS n FROM Administrator) a
+    CROSS JOIN (SELECT COUNT(*) AS n FROM Donor) d
+    CROSS JOIN (SELECT COUNT(*) AS n,
+                       COALESCE(SUM(status = 'Active'), 0) AS active,
+                       COALESCE(SUM(status = 'Goal Reached'), 0) AS completed,
+                       COALESCE(SUM(goal_amount), 0) AS goal,
+                       COALESCE(SUM(raised_amount), 0) AS raised
+                FROM Fundraiser) f
+    CROSS JOIN (SELECT COUNT(*) AS n,
+                       COALESCE(SUM(amount), 0) AS gross,
+                       COALESCE(SUM(platform_fee), 0) AS fee,
+                       COALESCE(SUM(net_amount), 0) AS net
+                FROM Transactions) t
+    CROSS JOIN (SELECT COALESCE(SUM(admin_earnings), 0) AS earnings FROM Payroll) p
+    CROSS JOIN (SELECT COUNT(*) AS n, COUNT(DISTINCT donor_id) AS uniq FROM Visits) v
+    SET pc.total_administrators = a.n,
+        pc.total_donors = d.n,
+        pc.total_fundraisers = f.n,
+        pc.active_fundraisers = f.active,
+        pc.completed_fundraisers = f.completed,
+        pc.total_goal = f.goal,
+        pc.total_raised = f.raised,
+        pc.total_transactions = t.n,
+        pc.total_gross = t.gross,
+        pc.total_platform_fee = t.fee,
+        pc.total_net = t.net,
+        pc.total_admin_earnings = p.earnings,
+        pc.total_visits = v.n,
+        pc.unique_visitors = v.uniq
+    WHERE pc.id = 1;
+    COMMIT;
+    
+    SELECT 'Platform counters reconciled' AS Message;
+END //
+
+-- Rebuild the summary tables behind the reporting views from the live
+-- view definitions (run after bulk loads, on a schedule, or whenever
+-- `flask check-summaries` reports drift)
+CREATE PROCEDURE RefreshSummaryTables()
+BEGIN
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+    
+    START TRANSACTION;
+    CALL FoldCounterShards();
+    
+    DELETE FROM FundraiserVisitStats;
+    INSERT INTO FundraiserVisitStats (fundraiser_no, total_visits, unique_visitors)
+    SELECT fundraiser_no, COUNT(*), COUNT(DISTINCT donor_id)
+    FROM Visits GROUP BY fundraiser_no;
+    
+    DELETE FROM FundraiserDonationStats;
+    INSERT INTO FundraiserDonationStats (fundraiser_no, total_transactions, total_gross, total_platform_fee, total_net)
+    SELECT fundraiser_no, COUNT(*), SUM(amount), SUM(platform_fee), SUM(net_amount)
+    FROM Transactions GROUP BY fundraiser_no;
+    
+    DELETE FROM DonorStats;
+    INSERT INTO DonorStats (donor_id, fundraisers_visited, total_visits, highest_interest_level,
+                            total_donations, total_amount_donated)
+    SELECT donor_id, fundraisers_visited, total_visits, highest_interest_level,
+           total_donations, total_amount_donated
+    FROM vw_donor_engagement;
+    
+    DELETE FROM AdministratorStats;
+    INSERT INTO AdministratorStats (Admin_id, total_fundraisers, active_fundraisers, total_funds_managed,
+                                    total_transactions, total_payouts, total_platform_fees)
+    SELECT Admin_id, total_fundraisers, active_fundraisers, total_funds_managed,
+           total_transactions, total_payouts, total_platform_fees_from_fundraisers
+    FROM vw_administrator_dashboard;
+    COMMIT;
+    
+    SELECT 'Summary tables refreshed' AS Message;
+END //
+
+-- Rebuild the leaderboard buckets of the last 30 days from Transactions
+-- (once after upgrading an existing database, or after repairs) and mark
+-- every board for re-ranking on its next read
+CREATE PROCEDURE RebuildLeaderboardBuckets()
+BEGIN
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+    
+    START TRANSACTION;
+    DELETE FROM LeaderboardBuckets;
+    INSERT INTO LeaderboardBuckets (board, bucket, entity_id, amount, donations)
+    SELECT 'donor', HourStart(transaction_date), donor_id, SUM(amount), COUNT(*)
+    FROM Transactions 
+    WHERE transaction_date >= NOW() - INTERVAL 31 DAY
+    GROUP BY HourStart(transaction_date), donor_id;
+    
+    INSERT IGNORE INTO LeaderboardRefresh (board, period) VALUES
+    ('donor', '24h'), ('donor', '7d'), ('donor', '30d'),
+    ('fundraiser', '24h'), ('fundraiser', '7d'), ('fundraiser', '30d');
+    UPDATE LeaderboardRefresh SET refreshed_at = NULL;
+    COMMIT;
+    
+    SELECT 'Leaderboard buckets rebuilt' AS Message;
+END //
+
+-- Rebuild the hourly rollups of [p_from, p_to) from Transactions and Visits
+-- (after upgrading an existing database, or after repairs). Both bounds
+-- are rounded down to the hour; `flask backfill-rollups` runs it a day at
+-- a time. The rebuilt payment mode rows land in shard 0.
+CREATE PROCEDURE RebuildHourlyStats(IN p_from DATETIME, IN p_to DATETIME)
+BEGIN
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+    
+    SET p_from = HourStart(p_from);
+    SET p_to = HourStart(p_to);
+    
+    START TRANSACTION;
+    DELETE FROM FundraiserHourlyStats WHERE bucket >= p_from AND bucket < p_to;
+    DELETE FROM PaymentModeHourlyStats WHERE bucket >= p_from AND bucket < p_to;
+    
+    INSERT INTO FundraiserHourlyStats (bucket, fundraiser_no, transactions, gross, platform_fee, net)
+    SELECT HourStart(transaction_date), fundraiser_no, COUNT(*), SUM(amount), SUM(platform_fee), SUM(net_amount)
+    FROM Transactions 
+    WHERE transaction_date >= p_from AND transaction_date < p_to
+    GROUP BY HourStart(transaction_date), fundraiser_no;
+    
+    -- A visit is a new visitor's when no earlier visit of the pair exists
+    INSERT INTO FundraiserHourlyStats (bucket, fundraiser_no, visits, new_visitors)
+    SELECT * FROM (
+        SELECT HourStart(v.visit_date) AS hour_start, v.fundraiser_no AS fno, COUNT(*) AS n,
+               SUM(NOT EXISTS (SELECT 1 FROM Visits e 
+                               WHERE e.donor_id = v.donor_id AND e.fundraiser_no = v.fundraiser_no 
+                               AND (e.visit_date < v.visit_date 
+                                    OR (e.visit_date = v.visit_date AND e.visit_id < v.visit_id)))) AS first_visits
+        FROM Visits v
+        WHERE v.visit_date >= p_from AND v.visit_date < p_to
+        GROUP BY HourStart(v.visit_date), v.fundraiser_no
+    ) t
+    ON DUPLICATE KEY UPDATE 
+        visits = t.n,
+        new_visitors = t.first_visits;
+    
+    INSERT INTO PaymentModeHourlyStats (bucket, payment_mode, shard_no, transactions, gross, platform_fee, net)
+    SELECT HourStart(transaction_date), payment_mode, 0, COUNT(*), SUM(amount), SUM(platform_fee), SUM(net_amount)
+    FROM Transactions 
+    WHERE transaction_date >= p_from AND transaction_date < p_to
+    GROUP BY HourStart(transaction_date), payment_mode;
+    COMMIT;
+    
+    SELECT p_from AS date_from, p_to AS date_to, 'Hourly rollups rebuilt' AS Message;
 END //
 
 DELIMITER ;
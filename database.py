@@ -1,29 +1,515 @@
-import mysql.connector
 from mysql.connector import Error
+import contextvars
+import json
 import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from dotenv import load_dotenv
+from connection_pool import ConnectionPool
+from replicas import ReplicaSet
+from shards import SHARD_TABLES, ShardMap, routed, merge_sorted, sum_rows, merge_streams
+from cache import MemoryCache, RedisCache, cached, invalidates
+from pagination import encode_cursor, decode_cursor, clamp_page_size, keyset_condition
+from query_metrics import QueryMetrics, caller
 
 load_dotenv()
 
+# MySQL errors worth retrying the whole transaction for: lock wait timeout, deadlock
+RETRYABLE_ERRNOS = (1205, 1213)
+DUPLICATE_KEY_ERRNO = 1062
+
+# Read-your-writes: [primary GTID set, unix time] of the current session's
+# last donation or visit (set per request from the session), and whether
+# reads must go to the primary regardless
+_read_after = contextvars.ContextVar('read_after', default=None)
+_primary_reads = contextvars.ContextVar('primary_reads', default=False)
+
+# Shard node this context's queries are pinned to (None: not pinned, so
+# node 0 serves single-node reads and fetch_all_shards() reads every node)
+_shard = contextvars.ContextVar('shard', default=None)
+
+# Windowed leaderboards: period -> hours of hourly buckets it sums
+LEADERBOARD_PERIODS = {'24h': 24, '7d': 7 * 24, '30d': 30 * 24}
+
+# Trend granularities: name -> rollup bucket expression for one period
+TREND_PERIODS = {'hour': 'bucket', 'day': 'DATE(bucket)'}
+TREND_COLUMNS = ('transactions', 'gross', 'platform_fee', 'net', 'visits', 'new_visitors')
+
+# Search: the FULLTEXT index column lists (MATCH must name them exactly),
+# the most words of a query that are searched for, and the deadline facet's
+# windows, in display order: key -> (label, condition on f.deadline)
+FUNDRAISER_SEARCH_COLUMNS = 'f.title, f.description, f.fundraiser_owner_name'
+DONOR_SEARCH_COLUMNS = 'dname, demail'
+SEARCH_MAX_TERMS = 8
+SEARCH_DEADLINE_WINDOWS = {
+    'overdue': ('Past deadline', "f.deadline < CURDATE()"),
+    '7d': ('Within 7 days', "f.deadline BETWEEN CURDATE() AND CURDATE() + INTERVAL 7 DAY"),
+    '30d': ('Within 30 days', "f.deadline > CURDATE() + INTERVAL 7 DAY AND f.deadline <= CURDATE() + INTERVAL 30 DAY"),
+    'later': ('Later', "f.deadline > CURDATE() + INTERVAL 30 DAY"),
+}
+
+
+def search_expression(text):
+    """A BOOLEAN MODE search string requiring every word of ``text`` as a
+    prefix (``+word*``), so a partly typed last word still matches; None if
+    ``text`` has no words. Operators in ``text`` are dropped rather than
+    interpreted."""
+    terms = re.findall(r'\w+', (text or '').lower())[:SEARCH_MAX_TERMS]
+    return ' '.join(f'+{term}*' for term in terms) or None
+
+# Reads of the reporting views served from the *Stats summary tables:
+# live view -> (key column, query with the same columns as the view)
+SUMMARY_VIEWS = {
+    'vw_active_fundraisers': ('fundraiser_no', """
+        SELECT f.fundraiser_no, f.title, f.description, f.fundraiser_owner_name,
+               f.goal_amount, f.raised_amount, f.remaining_amount,
+               ROUND((f.raised_amount / f.goal_amount) * 100, 2) AS completion_percentage,
+               f.deadline, DATEDIFF(f.deadline, CURDATE()) AS days_remaining, f.status,
+               a.name AS admin_name, a.email AS admin_email,
+               COALESCE(vs.total_visits, 0) AS total_visits,
+               COALESCE(vs.unique_visitors, 0) AS unique_visitors,
+               COALESCE(ds.total_transactions, 0) AS total_transactions
+        FROM Fundraiser f
+        LEFT JOIN Administrator a ON f.Admin_id = a.Admin_id
+        LEFT JOIN FundraiserVisitStats vs ON f.fundraiser_no = vs.fundraiser_no
+        LEFT JOIN FundraiserDonationStats ds ON f.fundraiser_no = ds.fundraiser_no
+        WHERE f.status = 'Active'
+        ORDER BY f.deadline ASC
+    """),
+    'vw_donor_engagement': ('donor_id', """
+        SELECT d.donor_id, d.dname AS donor_name, d.demail AS donor_email, d.dphone, d.total_donated,
+               s.fundraisers_visited, s.total_visits, s.highest_interest_level,
+               s.total_donations, s.total_amount_donated
+        FROM Donor d
+        JOIN DonorStats s ON d.donor_id = s.donor_id
+        ORDER BY d.total_donated DESC
+    """),
+    'vw_administrator_dashboard': ('Admin_id', """
+        SELECT a.Admin_id, a.name AS admin_name, a.email, c.total_earnings AS total_earnings_received,
+               c.total_fundraisers, c.active_fundraisers, c.total_funds_managed,
+               c.total_transactions, c.total_payouts,
+               c.total_platform_fees AS total_platform_fees_from_fundraisers
+        FROM Administrator a
+        JOIN vw_administrator_counters c ON a.Admin_id = c.Admin_id
+        ORDER BY c.total_earnings DESC
+    """),
+}
+
 class Database:
     def __init__(self):
         self.host = os.getenv('DB_HOST', 'localhost')
         self.user = os.getenv('DB_USER', 'root')
         self.password = os.getenv('DB_PASSWORD', 'Khan@2004')
         self.database = os.getenv('DB_NAME', 'CrowdfundingDB')
+        self.pool = ConnectionPool(
+            pool_size=int(os.getenv('DB_POOL_SIZE', 10)),
+            max_lifetime=float(os.getenv('DB_POOL_MAX_LIFETIME', 1800)),
+            timeout=float(os.getenv('DB_POOL_TIMEOUT', 10)),
+            health_check_interval=float(os.getenv('DB_POOL_HEALTH_CHECK_INTERVAL', 30)),
+            host=self.host,
+            user=self.user,
+            password=self.password,
+            database=self.database
+        )
+        # Reads go to these when set (host[:port], comma-separated); same
+        # credentials and schema as the primary
+        self.replicas = ReplicaSet(
+            [host for host in os.getenv('DB_REPLICA_HOSTS', '').split(',') if host.strip()],
+            max_lag=float(os.getenv('DB_REPLICA_MAX_LAG_SECONDS', 5)),
+            check_interval=float(os.getenv('DB_REPLICA_CHECK_INTERVAL', 5)),
+            pool_size=int(os.getenv('DB_REPLICA_POOL_SIZE', self.pool.pool_size)),
+            max_lifetime=self.pool.max_lifetime,
+            timeout=self.pool.timeout,
+            health_check_interval=self.pool.health_check_interval,
+            connection_timeout=int(os.getenv('DB_REPLICA_CONNECT_TIMEOUT', 2)),
+            user=self.user,
+            password=self.password,
+            database=self.database
+        )
+        self.read_your_writes_seconds = float(os.getenv('DB_READ_YOUR_WRITES_SECONDS', 60))
+        # Fundraisers and their rows are split across these and the primary
+        # when set (host[:port], comma-separated, numbered from 1; the
+        # primary is node 0); same credentials and schema as the primary
+        self.shards = ShardMap(
+            self.pool,
+            [host for host in os.getenv('DB_SHARD_HOSTS', '').split(',') if host.strip()],
+            refresh=float(os.getenv('DB_SHARD_MAP_REFRESH', 5)),
+            primary_name=self.host,
+            pool_size=int(os.getenv('DB_SHARD_POOL_SIZE', self.pool.pool_size)),
+            max_lifetime=self.pool.max_lifetime,
+            timeout=self.pool.timeout,
+            health_check_interval=self.pool.health_check_interval,
+            user=self.user,
+            password=self.password,
+            database=self.database
+        )
+        self.cache = self._create_cache()
+        self.metrics = QueryMetrics(
+            slow_query_ms=float(os.getenv('DB_SLOW_QUERY_MS', 500)),
+            explain=bool(int(os.getenv('DB_SLOW_QUERY_EXPLAIN', 1))),
+            explain_interval=float(os.getenv('DB_SLOW_QUERY_EXPLAIN_INTERVAL', 60)),
+            log_path=os.getenv('DB_SLOW_QUERY_LOG') or None,
+        )
+        self._local = threading.local()
+        self.query_threads = int(os.getenv('DB_QUERY_THREADS', self.pool.pool_size))
+        self.parallel_queries = int(os.getenv('DB_PARALLEL_QUERIES', 4))
+        self._executors = {}
+        self._executor_pid = None
+        self._executor_lock = threading.Lock()
+        self.leaderboard_size = int(os.getenv('LEADERBOARD_SIZE', 100))
+        self.leaderboard_refresh = float(os.getenv('LEADERBOARD_REFRESH_SECONDS', 60))
         
-    def get_connection(self):
+    def _create_cache(self):
+        backend = os.getenv('CACHE_BACKEND', 'memory').lower()
+        if backend == 'none':
+            return None
+        if backend == 'redis':
+            return RedisCache(os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0'))
+        return MemoryCache(
+            max_entries=int(os.getenv('CACHE_MAX_ENTRIES', 5000)),
+            max_bytes=int(os.getenv('CACHE_MAX_BYTES', 64 * 1024 * 1024))
+        )
+    
+    def error_count(self):
+        """Database errors seen by the current thread; results read across an error are not cached"""
+        return getattr(self._local, 'errors', 0)
+    
+    def _record_error(self):
+        self._local.errors = self.error_count() + 1
+    
+    def cache_stats(self):
+        if self.cache is None:
+            return {'backend': 'none'}
+        return self.cache.stats()
+    
+    def invalidate(self, *tags):
+        if self.cache is not None:
+            self.cache.invalidate(tags)
+    
+    def invalidate_each(self, tag, query, params=None):
+        """Invalidate ``tag`` formatted over each row ``query`` returns from
+        every shard node, e.g. ``fundraiser:{fundraiser_no}`` for each
+        fundraiser whose page shows a renamed donor"""
+        if self.cache is None:
+            return
+        with self.primary_reads():
+            rows = self.fetch_all_shards(query, params)
+        if rows:
+            self.cache.invalidate([tag.format(**row) for row in rows])
+    
+    def _get_executor(self, name='db-read'):
+        # Worker threads do not survive fork(), so each process builds its own
+        with self._executor_lock:
+            if self._executor_pid != os.getpid():
+                self._executors = {}
+                self._executor_pid = os.getpid()
+            if name not in self._executors:
+                self._executors[name] = ThreadPoolExecutor(max_workers=self.query_threads, thread_name_prefix=name)
+            return self._executors[name]
+    
+    def gather(self, **calls):
+        """Run independent reads concurrently and return their results by name.
+
+        Each keyword maps a name to ``(method, *args)``, e.g.
+        ``db.gather(donor=(db.get_donor, 1), visits=(db.get_donor_visits, 1))``.
+        At most ``DB_PARALLEL_QUERIES`` calls of one gather run at a time,
+        on a shared thread pool; the last one runs on the calling thread.
+        If a call raises, calls not yet started are cancelled, running ones
+        are awaited and the first exception is re-raised. Calls run in a
+        copy of the caller's context, so request profiling follows them, and
+        their database errors count towards the caller's ``error_count``.
+        """
+        if len(calls) < 2 or self.parallel_queries < 2:
+            return {name: call[0](*call[1:]) for name, call in calls.items()}
+        
+        executor = self._get_executor()
+        pending = list(calls.items())
+        inline_name, inline_call = pending.pop()
+        running = {}
+        results = {}
+        error = None
+        
+        def submit_next():
+            while pending and len(running) < self.parallel_queries - 1:
+                name, call = pending.pop(0)
+                running[executor.submit(contextvars.copy_context().run, self._counting_errors, call)] = name
+        
+        submit_next()
         try:
-            connection = mysql.connector.connect(
-                host=self.host,
-                user=self.user,
-                password=self.password,
-                database=self.database
-            )
-            return connection
+            results[inline_name] = inline_call[0](*inline_call[1:])
+        except Exception as e:
+            error = e
+        errors = 0
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name], failed = future.result()
+                    errors += failed
+                except Exception as e:
+                    error = error or e
+            if error is not None:
+                pending.clear()
+            submit_next()
+        if errors:
+            self._local.errors = self.error_count() + errors
+        if error is not None:
+            raise error
+        return results
+    
+    def _counting_errors(self, call):
+        errors = self.error_count()
+        result = call[0](*call[1:])
+        return result, self.error_count() - errors
+    
+    def scatter(self, method, *args, nodes=None):
+        """Run ``method(*args)`` once on each shard node (all, or ``nodes``)
+        concurrently and return the results in node order.
+
+        Each call runs pinned to its node (see ``on_shard``) in a copy of the
+        caller's context, on a thread pool of its own: scatters start inside
+        ``gather`` calls, whose threads must not wait on their own pool.
+        Pass query primitives (``fetch_all``, ``fetch_one``...), not cached
+        methods, whose cache keys do not include the node.
+        """
+        nodes = list(range(len(self.shards)) if nodes is None else nodes)
+        
+        def run(node):
+            with self.on_shard(node):
+                return method(*args)
+        
+        if len(nodes) < 2:
+            return [run(node) for node in nodes]
+        executor = self._get_executor('db-shard')
+        futures = [executor.submit(contextvars.copy_context().run, run, node) for node in nodes[1:]]
+        results = [run(nodes[0])]
+        error = None
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                error = error or e
+        if error is not None:
+            raise error
+        return results
+    
+    def fetch_all_shards(self, query, params=None, key=(), reverse=False, limit=None, procedure=False):
+        """``fetch_all`` (``fetch_procedure_all`` for a ``procedure``) over the
+        fundraiser-keyed tables: on every shard node, with the rows merged on
+        ``key`` (the columns ``query`` orders by, descending for ``reverse``)
+        and cut to ``limit``. Reads one node when unsharded or inside
+        ``on_shard``/``on_home_shard``."""
+        fetch = self.fetch_procedure_all if procedure else self.fetch_all
+        if not self.shards or _shard.get() is not None:
+            return fetch(query, params)
+        return merge_sorted(self.scatter(fetch, query, params), key, reverse, limit)
+    
+    def fetch_one_shards(self, query, params=None, first=(), procedure=False):
+        """One row of totals (``fetch_one``, or ``fetch_procedure_one`` for a
+        ``procedure``) added up over every shard node; ``first`` names the
+        columns counting reference data, which come from node 0 alone"""
+        fetch = self.fetch_procedure_one if procedure else self.fetch_one
+        if not self.shards or _shard.get() is not None:
+            return fetch(query, params)
+        return sum_rows(self.scatter(fetch, query, params), first)
+    
+    def _on_every_node(self, method, *args):
+        """Run a write on every shard node in turn (once when unsharded or
+        pinned); returns node 0's result, or the first failure"""
+        if not self.shards or _shard.get() is not None:
+            return method(*args)
+        result = None
+        for node in range(len(self.shards)):
+            with self.on_shard(node):
+                outcome = method(*args)
+            if isinstance(outcome, dict) and not outcome.get('success', True):
+                if node:
+                    outcome = dict(outcome, message=f"{outcome.get('message')} (node {node})")
+                return outcome
+            result = outcome if result is None else result
+        return result
+    
+    def _per_home_shard(self, method, items, fundraiser_no):
+        """Run ``method(items)`` once per shard node on the items whose fundraiser
+        (``fundraiser_no(item)``) lives there. Returns the results, in node
+        order, as ``(items, result)`` pairs."""
+        groups = {}
+        for item in items:
+            groups.setdefault(self.shards.home(fundraiser_no(item)), []).append(item)
+        results = []
+        for node, group in sorted(groups.items()):
+            with self.on_shard(node):
+                results.append((group, method(group)))
+        return results
+    
+    def _acquire(self, read=False):
+        """Check out a connection to the shard node this context is pinned to,
+        or else a primary connection, or for ``read`` a replica one when a
+        healthy replica has this session's last write (see ``read_after``)"""
+        node = _shard.get()
+        if node:
+            return self.shards.pool(node).acquire()
+        if read and self.replicas and not _primary_reads.get():
+            gtid = None
+            if self.reading_own_writes():
+                gtid = _read_after.get()[0]
+                if not gtid:
+                    # No GTIDs to compare (gtid_mode=OFF): read the primary until the window ends
+                    return self.pool.acquire()
+            connection = self.replicas.acquire(gtid)
+            if connection is not None:
+                return connection
+        return self.pool.acquire()
+    
+    def get_connection(self, read=False):
+        """Check out a pooled connection (``read``: from a replica if one can serve
+        it, else the primary); hand it back with release_connection()"""
+        started = time.perf_counter()
+        try:
+            connection = self._acquire(read)
         except Error as e:
+            self.metrics.observe_acquire(time.perf_counter() - started, failed=True)
             print(f"Error connecting to MySQL: {e}")
+            self._record_error()
             return None
+        self.metrics.observe_acquire(time.perf_counter() - started)
+        return connection
+    
+    def release_connection(self, connection):
+        self._owner(connection).release(connection)
+    
+    def _owner(self, connection):
+        return self.replicas.owner(connection) or self.shards.owner(connection) or self.pool
+    
+    def read_after(self, written):
+        """Route this context's reads so they see the write recorded in ``written``
+        (``last_write()`` of an earlier request of the same session, or None)"""
+        _read_after.set(written)
+    
+    def last_write(self):
+        return _read_after.get()
+    
+    def reading_own_writes(self):
+        """True while this context's reads have to see its last write (replica
+        reads wait for it, cached results are skipped)"""
+        written = _read_after.get()
+        return (bool(self.replicas) and bool(written)
+                and time.time() - written[1] < self.read_your_writes_seconds)
+    
+    def _note_write(self):
+        """Record the primary's position after this context's committed write, so
+        its later reads (and the session's, via ``last_write``) see the write"""
+        # Shard nodes other than the primary have no replicas to wait for
+        if not self.replicas or _shard.get():
+            return
+        with self.primary_reads():
+            row = self.fetch_one("SELECT @@GLOBAL.gtid_executed AS gtid")
+        _read_after.set([(row or {}).get('gtid') or '', time.time()])
+    
+    @contextmanager
+    def primary_reads(self):
+        """Send the reads made in the block to the primary (consistency checks,
+        reads that must see another session's latest write)"""
+        token = _primary_reads.set(True)
+        try:
+            yield
+        finally:
+            _primary_reads.reset(token)
+    
+    @contextmanager
+    def on_shard(self, node):
+        """Send every query made in the block to shard ``node`` (0: the primary,
+        and its replicas for reads)"""
+        token = _shard.set(node)
+        try:
+            yield
+        finally:
+            _shard.reset(token)
+    
+    @contextmanager
+    def on_home_shard(self, fundraiser_no):
+        """Send the block's queries to the node holding ``fundraiser_no``
+        (no-op when unsharded or without a fundraiser)"""
+        if not self.shards or not fundraiser_no:
+            yield
+            return
+        with self.on_shard(self.shards.home(fundraiser_no)):
+            yield
+    
+    def pool_stats(self):
+        stats = self.pool.stats()
+        if self.replicas:
+            stats['replicas'] = self.replicas.stats()
+        if self.shards:
+            stats['shards'] = self.shards.stats()
+        return stats
+    
+    def check_replicas(self):
+        """Check every replica's health and lag now"""
+        return self.replicas.check_all()
+    
+    @contextmanager
+    def _timed(self, connection, kind, statement, params=None, method=None):
+        """Time the statement run in the block and record it in ``self.metrics``;
+        the block sets ``rows`` on the yielded call. A slow one is logged,
+        with the EXPLAIN plan from the same connection."""
+        call = self.metrics.start(kind, statement, method, params)
+        try:
+            yield call
+        except Error as e:
+            call.errno = e.errno or 'unknown'
+            raise
+        finally:
+            if self.metrics.finish(call):
+                plan = self._explain(connection, statement, params) if self.metrics.should_explain(call) else None
+                self.metrics.log_slow(call, plan)
+    
+    def _explain(self, connection, query, params=None):
+        try:
+            cursor = connection.cursor(dictionary=True)
+            cursor.execute('EXPLAIN ' + query, params or ())
+            plan = cursor.fetchall()
+            cursor.close()
+            return plan
+        except Error as e:
+            return [{'error': str(e)}]
+    
+    def metrics_text(self, gauges=()):
+        """Query metrics, pool and cache counters in Prometheus text format (/metrics),
+        plus extra ``(name, type, help, value)`` gauges"""
+        pool = self.pool_stats()
+        gauges = list(gauges) + [
+            ('db_pool_size', 'gauge', 'Maximum pooled connections', pool['pool_size']),
+            ('db_pool_open', 'gauge', 'Open pooled connections', pool['open']),
+            ('db_pool_in_use', 'gauge', 'Checked-out connections', pool['in_use']),
+            ('db_pool_waiting', 'gauge', 'Threads waiting for a connection', pool['waiting']),
+            ('db_pool_checkouts_total', 'counter', 'Connection checkouts', pool['checkouts']),
+            ('db_pool_timeouts_total', 'counter', 'Checkouts that timed out', pool['timeouts']),
+        ]
+        if self.replicas:
+            gauges += [
+                ('db_replicas', 'gauge', 'Configured read replicas', len(pool['replicas'])),
+                ('db_replicas_healthy', 'gauge', 'Read replicas serving reads',
+                 sum(replica['healthy'] for replica in pool['replicas'])),
+                ('db_replica_max_lag_seconds', 'gauge', 'Largest lag seen at the last replica checks',
+                 max((replica['lag_seconds'] or 0) for replica in pool['replicas'])),
+            ]
+        cache = self.cache_stats()
+        if 'hits' in cache:
+            gauges += [
+                ('cache_hits_total', 'counter', 'Result cache hits', cache['hits']),
+                ('cache_misses_total', 'counter', 'Result cache misses', cache['misses']),
+            ]
+        return self.metrics.render(gauges)
+    
+    def slow_queries(self):
+        return self.metrics.slow_queries()
     
     def execute_query(self, query, params=None):
         connection = self.get_connection()
@@ -31,14 +517,17 @@ class Database:
             return {'success': False, 'message': 'Database connection failed'}
         
         try:
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute(query, params or ())
-            connection.commit()
-            cursor.close()
-            connection.close()
+            with self._timed(connection, 'execute', query, params) as call:
+                cursor = connection.cursor(dictionary=True)
+                cursor.execute(query, params or ())
+                connection.commit()
+                call.rows = max(cursor.rowcount, 0)
+                cursor.close()
             return {'success': True}
         except Error as e:
             return {'success': False, 'message': str(e)}
+        finally:
+            self.release_connection(connection)
     
     def execute_procedure(self, procedure_name, params=None):
         connection = self.get_connection()
@@ -46,76 +535,258 @@ class Database:
             return {'success': False, 'message': 'Database connection failed'}
         
         try:
-            cursor = connection.cursor()
-            cursor.callproc(procedure_name, params or ())
-            connection.commit()
-            cursor.close()
-            connection.close()
+            with self._timed(connection, 'procedure', procedure_name):
+                cursor = connection.cursor()
+                cursor.callproc(procedure_name, params or ())
+                connection.commit()
+                cursor.close()
             return {'success': True}
         except Error as e:
             return {'success': False, 'message': str(e)}
+        finally:
+            self.release_connection(connection)
     
-    def fetch_all(self, query, params=None):
+    def call_procedure(self, procedure_name, params=None):
+        """Run a write procedure and return the last row of its final result set"""
         connection = self.get_connection()
+        if connection is None:
+            return {'success': False, 'message': 'Database connection failed'}
+        
+        try:
+            with self._timed(connection, 'procedure', procedure_name) as call:
+                cursor = connection.cursor(dictionary=True)
+                cursor.callproc(procedure_name, params or ())
+                
+                # Fetch the result
+                result = None
+                for result_set in cursor.stored_results():
+                    result = result_set.fetchone()
+                
+                connection.commit()
+                cursor.close()
+                call.rows = int(result is not None)
+            
+            if result:
+                return {'success': True, 'data': result}
+            return {'success': True}
+        except Error as e:
+            return {'success': False, 'message': str(e), 'errno': e.errno,
+                    'retryable': e.errno in RETRYABLE_ERRNOS}
+        finally:
+            self.release_connection(connection)
+    
+    def fetch_procedure_one(self, procedure_name, params=None):
+        """Run a read-only procedure and return the first row of its final result set"""
+        connection = self.get_connection(read=True)
+        if connection is None:
+            return None
+        
+        try:
+            with self._timed(connection, 'procedure', procedure_name) as call:
+                cursor = connection.cursor(dictionary=True)
+                cursor.callproc(procedure_name, params or ())
+                
+                result = None
+                for result_set in cursor.stored_results():
+                    result = result_set.fetchone()
+                
+                cursor.close()
+                call.rows = int(result is not None)
+            return result
+        except Error as e:
+            print(f"Error calling {procedure_name}: {e}")
+            self._record_error()
+            return None
+        finally:
+            self.release_connection(connection)
+    
+    def fetch_procedure_all(self, procedure_name, params=None):
+        """Run a read-only procedure and return all rows of its final result set"""
+        connection = self.get_connection(read=True)
         if connection is None:
             return []
         
         try:
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute(query, params or ())
-            results = cursor.fetchall()
-            cursor.close()
-            connection.close()
+            with self._timed(connection, 'procedure', procedure_name) as call:
+                cursor = connection.cursor(dictionary=True)
+                cursor.callproc(procedure_name, params or ())
+                
+                results = []
+                for result_set in cursor.stored_results():
+                    results = result_set.fetchall()
+                
+                cursor.close()
+                call.rows = len(results)
+            return results
+        except Error as e:
+            print(f"Error calling {procedure_name}: {e}")
+            self._record_error()
+            return []
+        finally:
+            self.release_connection(connection)
+    
+    def fetch_all(self, query, params=None):
+        connection = self.get_connection(read=True)
+        if connection is None:
+            return []
+        
+        try:
+            with self._timed(connection, 'query', query, params) as call:
+                cursor = connection.cursor(dictionary=True)
+                cursor.execute(query, params or ())
+                results = cursor.fetchall()
+                cursor.close()
+                call.rows = len(results)
             return results
         except Error as e:
             print(f"Error fetching data: {e}")
+            self._record_error()
             return []
+        finally:
+            self.release_connection(connection)
     
     def fetch_one(self, query, params=None):
-        connection = self.get_connection()
+        connection = self.get_connection(read=True)
         if connection is None:
             return None
         
         try:
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute(query, params or ())
-            result = cursor.fetchone()
-            cursor.close()
-            connection.close()
+            with self._timed(connection, 'query', query, params) as call:
+                cursor = connection.cursor(dictionary=True)
+                cursor.execute(query, params or ())
+                result = cursor.fetchone()
+                cursor.close()
+                call.rows = int(result is not None)
             return result
         except Error as e:
             print(f"Error fetching data: {e}")
+            self._record_error()
             return None
+        finally:
+            self.release_connection(connection)
     
-    def get_dashboard_stats(self):
-        stats = {}
-        
-        result = self.fetch_one("SELECT COUNT(*) as count FROM Fundraiser")
-        stats['total_fundraisers'] = result.get('count', 0) if result else 0
-        
-        result = self.fetch_one("SELECT COUNT(*) as count FROM Fundraiser WHERE status = 'Active'")
-        stats['active_fundraisers'] = result.get('count', 0) if result else 0
-        
-        result = self.fetch_one("SELECT COUNT(*) as count FROM Donor")
-        stats['total_donors'] = result.get('count', 0) if result else 0
-        
-        result = self.fetch_one("SELECT COALESCE(SUM(raised_amount), 0) as total FROM Fundraiser")
-        stats['total_raised'] = result.get('total', 0) if result else 0
+    def stream_query(self, query, params=None, chunk_size=1000, node=None):
+        """Stream a large result set without loading it into memory.
+
+        Generator over an unbuffered cursor: yields the column names first,
+        then lists of up to ``chunk_size`` row tuples read with fetchmany().
+        The connection is only checked out once iteration starts and is
+        held until the generator finishes; one abandoned part-way (client
+        disconnect) is closed rather than drained back into the pool.
+        ``node`` streams from that shard node.
+        """
+        # The body runs on first next(), so name the calling method (and
+        # take the node it is pinned to) now
+        return self._stream(caller(), query, params, chunk_size, _shard.get() if node is None else node)
+    
+    def stream_shards(self, query, params, chunk_size, key, fundraiser_no=None):
+        """``stream_query`` over the fundraiser-keyed tables: from the home node of
+        ``fundraiser_no`` if given, else from every shard node merged on the
+        ``key`` columns (ascending, the order ``query`` sorts by)"""
+        if not self.shards or _shard.get() is not None:
+            return self.stream_query(query, params, chunk_size)
+        if fundraiser_no:
+            return self.stream_query(query, params, chunk_size, node=self.shards.home(fundraiser_no))
+        method = caller()
+        return merge_streams([self._stream(method, query, params, chunk_size, node)
+                              for node in range(len(self.shards))], key, chunk_size)
+    
+    def _stream(self, method, query, params, chunk_size, node=None):
+        started = time.perf_counter()
+        connection = self.shards.pool(node).acquire() if node else self._acquire(read=True)
+        self.metrics.observe_acquire(time.perf_counter() - started, method=method)
+        finished = False
+        try:
+            with self._timed(connection, 'stream', query, params, method=method) as call:
+                cursor = connection.cursor(buffered=False)
+                cursor.execute(query, params or ())
+                yield cursor.column_names
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    call.rows += len(rows)
+                    yield rows
+                cursor.close()
+            finished = True
+        except Error as e:
+            print(f"Error streaming data: {e}")
+            raise
+        finally:
+            if finished:
+                self.release_connection(connection)
+            else:
+                self._owner(connection).discard(connection)
+    
+    def fetch_page(self, query, keys, filters=None, params=None, cursor=None, direction='next', limit=None,
+                   sharded=False):
+        """Keyset-paginate ``query`` newest-first.
+
+        ``query`` is a SELECT without WHERE/ORDER BY, ``keys`` a list of
+        (column, result_key) pairs forming a unique sort key, and ``filters``
+        extra WHERE fragments with their ``params``. ``direction`` is 'next'
+        (older rows, after ``cursor``) or 'prev' (newer rows, before it).
+        A ``sharded`` query (over the fundraiser-keyed tables) reads a page
+        from every shard node and keeps the first ``limit`` of the merge.
+        """
+        limit = clamp_page_size(limit)
+        columns = [column for column, _ in keys]
+        where = list(filters or [])
+        params = list(params or [])
         
-        result = self.fetch_one("SELECT COUNT(*) as count FROM Transactions")
-        stats['total_transactions'] = result.get('count', 0) if result else 0
+        values = decode_cursor(cursor)
+        if values is not None and len(values) != len(keys):
+            values = None
+        backwards = direction == 'prev' and values is not None
+        if values is not None:
+            condition, expand = keyset_condition(columns, '>' if backwards else '<')
+            where.append(condition)
+            params.extend(expand(values))
         
-        result = self.fetch_one("SELECT COALESCE(SUM(goal_amount), 0) as total FROM Fundraiser")
-        stats['total_goal'] = result.get('total', 0) if result else 0
+        order = 'ASC' if backwards else 'DESC'
+        sql = query
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY " + ", ".join(f"{column} {order}" for column in columns) + " LIMIT %s"
+        params.append(limit + 1)
         
-        result = self.fetch_one("SELECT COALESCE(SUM(platform_fee), 0) as total FROM Transactions")
-        stats['total_platform_fee'] = result.get('total', 0) if result else 0
+        if sharded:
+            rows = self.fetch_all_shards(sql, tuple(params), key=[key for _, key in keys],
+                                         reverse=not backwards, limit=limit + 1)
+        else:
+            rows = self.fetch_all(sql, tuple(params))
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if backwards:
+            rows.reverse()
         
-        result = self.fetch_one("SELECT COUNT(*) as count FROM Visits")
-        stats['total_visits'] = result.get('count', 0) if result else 0
+        def boundary(row):
+            return encode_cursor([row[key] for _, key in keys])
         
+        if backwards:
+            prev_cursor = boundary(rows[0]) if rows and has_more else None
+            next_cursor = boundary(rows[-1]) if rows else None
+        else:
+            prev_cursor = boundary(rows[0]) if rows and values is not None else None
+            next_cursor = boundary(rows[-1]) if rows and has_more else None
+        return {'rows': rows, 'next_cursor': next_cursor, 'prev_cursor': prev_cursor, 'limit': limit}
+    
+    @cached(ttl=10, tags=('stats',))
+    def get_dashboard_stats(self):
+        """Dashboard totals from the trigger-maintained PlatformCounters row and its
+        shards, added up over the shard nodes"""
+        query = """
+        SELECT total_fundraisers, active_fundraisers, total_donors, total_raised,
+               total_transactions, total_goal, total_platform_fee, total_visits
+        FROM vw_platform_counters
+        """
+        stats = self.fetch_one_shards(query, first=('total_donors',))
+        if not stats:
+            return {'total_fundraisers': 0, 'active_fundraisers': 0, 'total_donors': 0, 'total_raised': 0,
+                    'total_transactions': 0, 'total_goal': 0, 'total_platform_fee': 0, 'total_visits': 0}
         return stats
     
+    @cached(ttl=10, tags=('transactions',))
     def get_recent_transactions(self, limit=5):
         query = """
         SELECT t.Transaction_id, d.dname as donor_name, f.title as fundraiser_title, 
@@ -126,8 +797,9 @@ class Database:
         ORDER BY t.transaction_date DESC
         LIMIT %s
         """
-        return self.fetch_all(query, (limit,))
+        return self.fetch_all_shards(query, (limit,), key=('transaction_date',), reverse=True, limit=limit)
     
+    @cached(ttl=30, tags=('fundraisers',))
     def get_top_fundraisers(self, limit=5):
         query = """
         SELECT fundraiser_no, title, goal_amount, raised_amount, remaining_amount, status,
@@ -136,20 +808,306 @@ class Database:
         ORDER BY raised_amount DESC
         LIMIT %s
         """
-        return self.fetch_all(query, (limit,))
+        return self.fetch_all_shards(query, (limit,), key=('raised_amount',), reverse=True, limit=limit)
     
+    @cached(ttl=60, tags=('donors', 'transactions'))
     def get_top_donors(self, limit=10):
+        """Largest donors, read from the trigger-maintained totals on idx_donor_total_donated
+        (node 0's share only when sharded; see ``flask reshard``)"""
         query = """
-        SELECT d.donor_id, d.dname, d.demail, COALESCE(SUM(t.amount), 0) as total_donated,
-               COUNT(t.Transaction_id) as transaction_count
+        SELECT d.donor_id, d.dname, d.demail, d.total_donated,
+               s.total_donations as transaction_count
         FROM Donor d
-        LEFT JOIN Transactions t ON d.donor_id = t.donor_id
-        GROUP BY d.donor_id, d.dname, d.demail
-        ORDER BY total_donated DESC
+        JOIN DonorStats s ON d.donor_id = s.donor_id
+        ORDER BY d.total_donated DESC
         LIMIT %s
         """
         return self.fetch_all(query, (limit,))
     
+    @cached(ttl=30, tags=('leaderboards', 'transactions'))
+    def get_leaderboard(self, board, period='all', limit=10):
+        """Top donors (by gross donated) or fundraisers (by net raised), all time or
+        over the last ``period`` ('24h', '7d', '30d'): rows of id, name, amount, donations.
+
+        All-time boards read the indexed running totals. Windowed ones read the
+        ranked Leaderboards rows, re-ranked first if older than
+        ``LEADERBOARD_REFRESH_SECONDS`` (0: only by ``refresh_leaderboards``).
+        Fundraiser boards merge every shard node's top entries; donor boards
+        only cover node 0's donations.
+        """
+        limit = min(limit, self.leaderboard_size)
+        if period == 'all':
+            if board == 'donor':
+                query = """
+                SELECT d.donor_id AS id, d.dname AS name, d.total_donated AS amount,
+                       s.total_donations AS donations
+                FROM Donor d
+                JOIN DonorStats s ON d.donor_id = s.donor_id
+                ORDER BY d.total_donated DESC
+                LIMIT %s
+                """
+            else:
+                query = """
+                SELECT f.fundraiser_no AS id, f.title AS name, f.raised_amount AS amount,
+                       COALESCE(ds.total_transactions, 0) AS donations
+                FROM Fundraiser f
+                LEFT JOIN FundraiserDonationStats ds ON f.fundraiser_no = ds.fundraiser_no
+                ORDER BY f.raised_amount DESC
+                LIMIT %s
+                """
+                return self.fetch_all_shards(query, (limit,), key=('amount',), reverse=True, limit=limit)
+            return self.fetch_all(query, (limit,))
+        
+        if self.leaderboard_refresh:
+            if board == 'fundraiser' and self.shards and _shard.get() is None:
+                self.scatter(self.refresh_leaderboard, board, period, self.leaderboard_refresh)
+            else:
+                self.refresh_leaderboard(board, period, max_age=self.leaderboard_refresh)
+        if board == 'donor':
+            query = """
+            SELECT l.entity_id AS id, d.dname AS name, l.amount, l.donations
+            FROM Leaderboards l
+            JOIN Donor d ON l.entity_id = d.donor_id
+            WHERE l.board = 'donor' AND l.period = %s
+            ORDER BY l.rank_no
+            LIMIT %s
+            """
+        else:
+            query = """
+            SELECT l.entity_id AS id, f.title AS name, l.amount, l.donations
+            FROM Leaderboards l
+            JOIN Fundraiser f ON l.entity_id = f.fundraiser_no
+            WHERE l.board = 'fundraiser' AND l.period = %s
+            ORDER BY l.rank_no
+            LIMIT %s
+            """
+            return self.fetch_all_shards(query, (period, limit), key=('amount',), reverse=True, limit=limit)
+        return self.fetch_all(query, (period, limit))
+    
+    def refresh_leaderboard(self, board, period, max_age=0):
+        """Re-rank the top ``LEADERBOARD_SIZE`` entries of a windowed board from its
+        hourly buckets, unless it was ranked less than ``max_age`` seconds ago.
+
+        The board's LeaderboardRefresh row is locked first, so concurrent
+        callers wait for one ranking and then find it fresh. The buckets are
+        read without locks, so donations are never blocked by a refresh.
+        """
+        hours = LEADERBOARD_PERIODS[period]
+        connection = self.get_connection()
+        if connection is None:
+            return {'success': False, 'message': 'Database connection failed'}
+        
+        try:
+            with self._timed(connection, 'transaction', 'refresh_leaderboard') as call:
+                cursor = connection.cursor()
+                freshness = ("SELECT refreshed_at >= NOW() - INTERVAL %s SECOND FROM LeaderboardRefresh "
+                             "WHERE board = %s AND period = %s")
+                for lock in ('', ' FOR UPDATE'):
+                    # Plain read first, so readers of a fresh board never queue on the lock
+                    cursor.execute(freshness + lock, (max_age, board, period))
+                    fresh = cursor.fetchone()
+                    if max_age and fresh and fresh[0]:
+                        connection.commit()
+                        cursor.close()
+                        return {'success': True, 'refreshed': False}
+                    if not lock:
+                        # End the snapshot, so the buckets are read as of the lock
+                        connection.commit()
+                
+                # The current hour so far plus the hours before it; fundraisers
+                # rank by the net column of their hourly rollups
+                if board == 'donor':
+                    cursor.execute("""
+                        SELECT entity_id, SUM(amount) AS total, SUM(donations) AS n
+                        FROM LeaderboardBuckets
+                        WHERE board = 'donor' AND bucket >= HourStart(NOW()) - INTERVAL %s HOUR
+                        GROUP BY entity_id
+                        ORDER BY total DESC, entity_id
+                        LIMIT %s
+                    """, (hours - 1, self.leaderboard_size))
+                else:
+                    cursor.execute("""
+                        SELECT fundraiser_no, SUM(net) AS total, SUM(transactions) AS n
+                        FROM FundraiserHourlyStats
+                        WHERE bucket >= HourStart(NOW()) - INTERVAL %s HOUR
+                        GROUP BY fundraiser_no
+                        HAVING n > 0
+                        ORDER BY total DESC, fundraiser_no
+                        LIMIT %s
+                    """, (hours - 1, self.leaderboard_size))
+                ranked = cursor.fetchall()
+                cursor.execute("DELETE FROM Leaderboards WHERE board = %s AND period = %s", (board, period))
+                if ranked:
+                    cursor.execute(
+                        "INSERT INTO Leaderboards (board, period, rank_no, entity_id, amount, donations) VALUES "
+                        + ", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(ranked)),
+                        [value for rank, (entity_id, total, n) in enumerate(ranked, 1)
+                         for value in (board, period, rank, entity_id, total, n)]
+                    )
+                if board == 'donor' and hours == max(LEADERBOARD_PERIODS.values()):
+                    # Expired buckets (bulk imports only add the last 31 days)
+                    cursor.execute(
+                        "DELETE FROM LeaderboardBuckets WHERE board = 'donor' AND bucket < NOW() - INTERVAL 31 DAY"
+                    )
+                cursor.execute(
+                    "INSERT INTO LeaderboardRefresh (board, period, refreshed_at) VALUES (%s, %s, NOW()) "
+                    "ON DUPLICATE KEY UPDATE refreshed_at = NOW()",
+                    (board, period)
+                )
+                connection.commit()
+                cursor.close()
+                call.rows = len(ranked)
+            return {'success': True, 'refreshed': True, 'entries': len(ranked)}
+        except Error as e:
+            self._record_error()
+            return {'success': False, 'message': str(e), 'retryable': e.errno in RETRYABLE_ERRNOS}
+        finally:
+            self.release_connection(connection)
+    
+    def refresh_leaderboards(self, rebuild=False):
+        """Re-rank every windowed board now (for cron when ``LEADERBOARD_REFRESH_SECONDS``
+        is 0); ``rebuild`` first refills the donor buckets of the last 30 days from
+        Transactions (fundraiser boards read the hourly rollups: see ``rebuild_hourly_stats``)"""
+        if rebuild:
+            result = self.call_procedure('RebuildLeaderboardBuckets', ())
+            if not result['success']:
+                return result
+        results = {}
+        for board in ('donor', 'fundraiser'):
+            for period in LEADERBOARD_PERIODS:
+                if board == 'fundraiser':
+                    result = self._on_every_node(self.refresh_leaderboard, board, period)
+                else:
+                    result = self.refresh_leaderboard(board, period)
+                if not result['success']:
+                    return result
+                results[f"{board}:{period}"] = result['entries']
+        self.invalidate('leaderboards')
+        return {'success': True, 'entries': results}
+    
+    def _trend(self, query, params, date_from, date_to, granularity, columns=TREND_COLUMNS):
+        """Run a rollup ``query`` over the inclusive day range and return one row per
+        hour or day, with empty periods zero-filled so the series can be charted"""
+        if isinstance(date_from, str):
+            date_from = date.fromisoformat(date_from)
+        if isinstance(date_to, str):
+            date_to = date.fromisoformat(date_to)
+        query = query.format(period=TREND_PERIODS[granularity])
+        rows = {}
+        for row in self.fetch_all_shards(query, (*params, date_from, date_to)):
+            rows[row['period']] = sum_rows([rows.get(row['period']), row])
+        
+        if granularity == 'hour':
+            step = timedelta(hours=1)
+            period = datetime.combine(date_from, datetime.min.time())
+            end = datetime.combine(date_to + timedelta(days=1), datetime.min.time())
+        else:
+            step = timedelta(days=1)
+            period, end = date_from, date_to + timedelta(days=1)
+        series = []
+        while period < end:
+            series.append(rows.get(period) or dict(period=period, **{column: 0 for column in columns}))
+            period += step
+        return series
+    
+    @cached(ttl=60, tags=('fundraiser:{fundraiser_no}', 'rollups'))
+    @routed
+    def get_fundraiser_trend(self, fundraiser_no, date_from, date_to, granularity='day'):
+        """Donations and visits of one fundraiser per hour or day of [date_from, date_to],
+        from its hourly rollups"""
+        query = """
+        SELECT {period} AS period, SUM(transactions) AS transactions, SUM(gross) AS gross,
+               SUM(platform_fee) AS platform_fee, SUM(net) AS net,
+               SUM(visits) AS visits, SUM(new_visitors) AS new_visitors
+        FROM FundraiserHourlyStats
+        WHERE fundraiser_no = %s AND bucket >= %s AND bucket < %s + INTERVAL 1 DAY
+        GROUP BY period
+        ORDER BY period
+        """
+        return self._trend(query, (fundraiser_no,), date_from, date_to, granularity)
+    
+    @cached(ttl=60, tags=('admin:{admin_id}', 'rollups'))
+    def get_administrator_trend(self, admin_id, date_from, date_to, granularity='day'):
+        """Donations and visits of an administrator's fundraisers per hour or day"""
+        query = """
+        SELECT {period} AS period, SUM(h.transactions) AS transactions, SUM(h.gross) AS gross,
+               SUM(h.platform_fee) AS platform_fee, SUM(h.net) AS net,
+               SUM(h.visits) AS visits, SUM(h.new_visitors) AS new_visitors
+        FROM Fundraiser f
+        JOIN FundraiserHourlyStats h ON h.fundraiser_no = f.fundraiser_no
+        WHERE f.Admin_id = %s AND h.bucket >= %s AND h.bucket < %s + INTERVAL 1 DAY
+        GROUP BY period
+        ORDER BY period
+        """
+        return self._trend(query, (admin_id,), date_from, date_to, granularity)
+    
+    @cached(ttl=60, tags=('rollups',))
+    def get_platform_trend(self, date_from, date_to, granularity='day'):
+        """Platform-wide donations and visits per hour or day (one primary-key range)"""
+        query = """
+        SELECT {period} AS period, SUM(transactions) AS transactions, SUM(gross) AS gross,
+               SUM(platform_fee) AS platform_fee, SUM(net) AS net,
+               SUM(visits) AS visits, SUM(new_visitors) AS new_visitors
+        FROM FundraiserHourlyStats
+        WHERE bucket >= %s AND bucket < %s + INTERVAL 1 DAY
+        GROUP BY period
+        ORDER BY period
+        """
+        return self._trend(query, (), date_from, date_to, granularity)
+    
+    @cached(ttl=60, tags=('rollups',))
+    def get_payment_mode_trend(self, date_from, date_to, granularity='day'):
+        """Donations per hour or day of each payment mode used in the range:
+        ``{payment_mode: rows}``, its counter shards summed"""
+        modes = self.fetch_all_shards(
+            """SELECT DISTINCT payment_mode FROM PaymentModeHourlyStats
+               WHERE bucket >= %s AND bucket < %s + INTERVAL 1 DAY
+               ORDER BY payment_mode""",
+            (date_from, date_to), key=('payment_mode',)
+        )
+        query = """
+        SELECT {period} AS period, SUM(transactions) AS transactions, SUM(gross) AS gross,
+               SUM(platform_fee) AS platform_fee, SUM(net) AS net
+        FROM PaymentModeHourlyStats
+        WHERE payment_mode = %s AND bucket >= %s AND bucket < %s + INTERVAL 1 DAY
+        GROUP BY period
+        ORDER BY period
+        """
+        return {mode: self._trend(query, (mode,), date_from, date_to, granularity, columns=TREND_COLUMNS[:4])
+                for mode in dict.fromkeys(row['payment_mode'] for row in modes)}
+    
+    def rebuild_hourly_stats(self, date_from, date_to, retries=3):
+        """Rebuild the hourly rollups of the inclusive day range from Transactions and
+        Visits, one day per transaction; yields ``(day, result)`` as each day finishes"""
+        if isinstance(date_from, str):
+            date_from = date.fromisoformat(date_from)
+        if isinstance(date_to, str):
+            date_to = date.fromisoformat(date_to)
+        day = date_from
+        try:
+            while day <= date_to:
+                for attempt in range(retries):
+                    result = self._on_every_node(self.call_procedure, 'RebuildHourlyStats',
+                                                 (day, day + timedelta(days=1)))
+                    # Live donations add to the same rows; retry a day that deadlocked
+                    if result['success'] or not result.get('retryable'):
+                        break
+                yield day, result
+                if not result['success']:
+                    return
+                day += timedelta(days=1)
+        finally:
+            self.invalidate('rollups', 'leaderboards')
+    
+    def first_activity_date(self):
+        """Date of the oldest donation or visit (where a full backfill starts)"""
+        rows = self.fetch_all_shards("""
+            SELECT DATE(LEAST(COALESCE((SELECT MIN(transaction_date) FROM Transactions), NOW()),
+                              COALESCE((SELECT MIN(visit_date) FROM Visits), NOW()))) AS first_day
+        """)
+        return min((row['first_day'] for row in rows), default=None)
+    
+    @cached(ttl=30, tags=('fundraisers',))
     def get_fundraiser_progress(self):
         query = """
         SELECT fundraiser_no, title, goal_amount, raised_amount, remaining_amount, status, deadline,
@@ -158,57 +1116,174 @@ class Database:
         FROM Fundraiser
         ORDER BY deadline ASC
         """
-        return self.fetch_all(query)
+        return self.fetch_all_shards(query, key=('deadline',))
     
+    @cached(ttl=60, tags=('admins',))
     def get_all_administrators(self):
         query = """
-        SELECT a.Admin_id, a.name, a.email, a.total_earnings,
+        SELECT a.Admin_id, a.name, a.email, c.total_earnings,
                GROUP_CONCAT(ap.A_phone SEPARATOR ', ') as phones
         FROM Administrator a
+        JOIN vw_administrator_counters c ON a.Admin_id = c.Admin_id
         LEFT JOIN Admins_phone ap ON a.Admin_id = ap.Admin_id
-        GROUP BY a.Admin_id, a.name, a.email, a.total_earnings
+        GROUP BY a.Admin_id, a.name, a.email, c.total_earnings
         """
-        return self.fetch_all(query)
+        return self._add_shard_totals(self.fetch_all(query), 'vw_administrator_counters', 'Admin_id',
+                                      ('total_earnings',))
     
+    @cached(ttl=60, tags=('admins', 'admin:{admin_id}'))
     def get_administrator(self, admin_id):
-        admin = self.fetch_one("SELECT * FROM Administrator WHERE Admin_id = %s", (admin_id,))
+        admin = self.fetch_one("""
+            SELECT a.Admin_id, a.name, a.email, c.total_earnings, a.created_at
+            FROM Administrator a
+            JOIN vw_administrator_counters c ON a.Admin_id = c.Admin_id
+            WHERE a.Admin_id = %s
+        """, (admin_id,))
         if admin:
+            self._add_shard_totals([admin], 'vw_administrator_counters', 'Admin_id', ('total_earnings',))
             admin['phones'] = self.fetch_all("SELECT A_phone FROM Admins_phone WHERE Admin_id = %s", (admin_id,))
         return admin
     
+    def _add_shard_totals(self, rows, table, key, columns):
+        """Add the other shard nodes' share of donor or administrator running
+        totals to ``rows`` read on node 0. Donor and Administrator rows are on
+        every node, and each node's triggers total its own fundraisers' donations."""
+        if not self.shards or _shard.get() is not None or not rows:
+            return rows
+        by_key = {row[key]: row for row in rows}
+        query = (f"SELECT {key}, {', '.join(columns)} FROM {table} "
+                 f"WHERE {key} IN ({', '.join(['%s'] * len(by_key))})")
+        for node_rows in self.scatter(self.fetch_all, query, tuple(by_key), nodes=range(1, len(self.shards))):
+            for node_row in node_rows:
+                row = by_key[node_row[key]]
+                for column in columns:
+                    row[column] = (row[column] or 0) + (node_row[column] or 0)
+        return rows
+    
+    def _add_reference_row(self, procedure, params, id_column, insert):
+        """Add a donor or administrator with ``procedure`` on node 0, then copy
+        it under the same id to every other shard node with ``insert``
+        (whose parameters are the id and then ``params``)"""
+        if not self.shards or _shard.get() is not None:
+            return self.execute_procedure(procedure, params)
+        with self.on_shard(0):
+            result = self.call_procedure(procedure, params)
+        new_id = (result.get('data') or {}).get(id_column)
+        if not result['success'] or new_id is None:
+            message = (result.get('data') or {}).get('Error_Message') or result.get('message')
+            return {'success': False, 'message': message}
+        for node in range(1, len(self.shards)):
+            with self.on_shard(node):
+                copied = self.execute_query(insert, (new_id, *params))
+            if not copied['success']:
+                return {'success': False, 'message': f"Added on node 0 but not copied to node {node} "
+                                                     f"(run `flask --app app reshard --sync-node {node}`): {copied['message']}"}
+        return {'success': True, 'data': result['data']}
+    
+    def _referenced_on_any_node(self, query, params):
+        """True if ``query`` (a SELECT 1 ... LIMIT 1) finds a row on any shard node"""
+        return bool(self.fetch_all_shards(query, params))
+    
+    @invalidates('admins', 'stats')
     def add_administrator(self, name, email, phone=None):
-        result = self.execute_procedure('AddAdministrator', (name, email))
+        result = self._add_reference_row('AddAdministrator', (name, email), 'Admin_id',
+                                         "INSERT INTO Administrator (Admin_id, name, email) VALUES (%s, %s, %s)")
         if result['success'] and phone:
-            admin = self.fetch_one("SELECT Admin_id FROM Administrator WHERE email = %s", (email,))
+            with self.on_shard(0):
+                admin = self.fetch_one("SELECT Admin_id FROM Administrator WHERE email = %s", (email,))
             if admin:
                 self.add_admin_phone(admin['Admin_id'], phone)
         return result
     
+    @invalidates('admins', 'admin:{admin_id}', 'fundraisers', 'payroll')
     def update_administrator(self, admin_id, name, email):
-        return self.execute_procedure('UpdateAdministrator', (admin_id, name, email))
+        result = self._on_every_node(self.execute_procedure, 'UpdateAdministrator', (admin_id, name, email))
+        if result['success']:
+            # Fundraiser pages show the administrator's name (header, payroll table)
+            self.invalidate_each('fundraiser:{fundraiser_no}',
+                                 "SELECT fundraiser_no FROM Fundraiser WHERE Admin_id = %s "
+                                 "UNION SELECT fundraiser_no FROM Payroll WHERE Admin_id = %s",
+                                 (admin_id, admin_id))
+        return result
     
+    @invalidates('admins', 'admin:{admin_id}', 'stats')
     def delete_administrator(self, admin_id):
-        return self.execute_procedure('DeleteAdministrator', (admin_id,))
+        # Each node's DeleteAdministrator only sees its own fundraisers
+        if self.shards and self._referenced_on_any_node(
+                "SELECT 1 FROM Fundraiser WHERE Admin_id = %s LIMIT 1", (admin_id,)):
+            return {'success': False,
+                    'message': 'Cannot delete administrator with active fundraisers. Set Admin_id to NULL first.'}
+        return self._on_every_node(self.execute_procedure, 'DeleteAdministrator', (admin_id,))
     
+    @invalidates('admins', 'admin:{admin_id}')
     def add_admin_phone(self, admin_id, phone):
         """Add phone number to administrator"""
-        return self.execute_procedure('AddAdminPhone', (admin_id, phone))
+        return self._on_every_node(self.execute_procedure, 'AddAdminPhone', (admin_id, phone))
     
+    @cached(ttl=60, tags=('donors',))
     def get_all_donors(self):
-        return self.fetch_all("SELECT * FROM Donor ORDER BY donor_id DESC")
+        return self._add_shard_totals(self.fetch_all("SELECT * FROM Donor ORDER BY donor_id DESC"),
+                                      'Donor', 'donor_id', ('total_donated',))
+    
+    @cached(ttl=30, tags=('donors',))
+    def get_donors_page(self, cursor=None, direction='next', limit=None):
+        page = self.fetch_page("SELECT * FROM Donor", [('donor_id', 'donor_id')],
+                               cursor=cursor, direction=direction, limit=limit)
+        self._add_shard_totals(page['rows'], 'Donor', 'donor_id', ('total_donated',))
+        return page
     
+    @cached(ttl=60, tags=('donor:{donor_id}',))
     def get_donor(self, donor_id):
-        return self.fetch_one("SELECT * FROM Donor WHERE donor_id = %s", (donor_id,))
+        donor = self.fetch_one("SELECT * FROM Donor WHERE donor_id = %s", (donor_id,))
+        if donor:
+            self._add_shard_totals([donor], 'Donor', 'donor_id', ('total_donated',))
+        return donor
     
+    @cached(ttl=30, tags=('donors',))
+    def search_donors(self, q, limit=None):
+        """Donors whose name or email match every word of ``q`` (see
+        ``search_expression``), best match first: ``{'query', 'results', 'total'}``"""
+        expression = search_expression(q)
+        if expression is None:
+            return {'query': q, 'results': [], 'total': 0}
+        match = f"MATCH({DONOR_SEARCH_COLUMNS}) AGAINST (%s IN BOOLEAN MODE)"
+        results = self.fetch_all(
+            f"""SELECT donor_id, dname, demail, dphone, total_donated, created_at, {match} AS score
+               FROM Donor
+               WHERE {match}
+               ORDER BY score DESC, donor_id DESC
+               LIMIT %s""",
+            (expression, expression, clamp_page_size(limit))
+        )
+        self._add_shard_totals(results, 'Donor', 'donor_id', ('total_donated',))
+        total = self.fetch_one(f"SELECT COUNT(*) AS total FROM Donor WHERE {match}", (expression,))
+        return {'query': q, 'results': results, 'total': (total or {}).get('total', 0)}
+    
+    @invalidates('donors', 'stats')
     def add_donor(self, name, email, phone):
-        return self.execute_procedure('AddDonor', (name, email, phone))
+        return self._add_reference_row('AddDonor', (name, email, phone), 'Donor_id',
+                                       "INSERT INTO Donor (donor_id, dname, demail, dphone) VALUES (%s, %s, %s, %s)")
     
+    @invalidates('donors', 'donor:{donor_id}', 'transactions', 'visits')
     def update_donor(self, donor_id, name, email, phone):
-        return self.execute_procedure('UpdateDonor', (donor_id, name, email, phone))
+        result = self._on_every_node(self.execute_procedure, 'UpdateDonor', (donor_id, name, email, phone))
+        if result['success']:
+            # Fundraiser pages show donor names in their donation and visit tables
+            self.invalidate_each('fundraiser:{fundraiser_no}',
+                                 "SELECT fundraiser_no FROM Transactions WHERE donor_id = %s "
+                                 "UNION SELECT fundraiser_no FROM Visits WHERE donor_id = %s",
+                                 (donor_id, donor_id))
+        return result
     
+    @invalidates('donors', 'donor:{donor_id}', 'visits', 'stats')
     def delete_donor(self, donor_id):
-        return self.execute_procedure('DeleteDonor', (donor_id,))
+        # Each node's DeleteDonor only sees its own transactions
+        if self.shards and self._referenced_on_any_node(
+                "SELECT 1 FROM Transactions WHERE donor_id = %s LIMIT 1", (donor_id,)):
+            return {'success': False, 'message': 'Cannot delete donor with existing transactions'}
+        return self._on_every_node(self.execute_procedure, 'DeleteDonor', (donor_id,))
     
+    @cached(ttl=30, tags=('donor:{donor_id}',))
     def get_donor_transactions(self, donor_id):
         query = """
         SELECT t.*, f.title as fundraiser_title
@@ -217,8 +1292,9 @@ class Database:
         WHERE t.donor_id = %s
         ORDER BY t.transaction_date DESC
         """
-        return self.fetch_all(query, (donor_id,))
+        return self.fetch_all_shards(query, (donor_id,), key=('transaction_date',), reverse=True)
     
+    @cached(ttl=30, tags=('donor:{donor_id}',))
     def get_donor_visits(self, donor_id):
         query = """
         SELECT v.*, f.title as fundraiser_title
@@ -227,45 +1303,233 @@ class Database:
         WHERE v.donor_id = %s
         ORDER BY v.visit_date DESC
         """
-        return self.fetch_all(query, (donor_id,))
+        return self.fetch_all_shards(query, (donor_id,), key=('visit_date',), reverse=True)
     
+    @cached(ttl=30, tags=('fundraisers',))
     def get_all_fundraisers(self):
         query = """
         SELECT f.*, a.name as admin_name,
                ROUND((f.raised_amount / f.goal_amount * 100), 2) as progress,
-               (SELECT COUNT(*) FROM Visits v WHERE v.fundraiser_no = f.fundraiser_no) as total_visits,
-               (SELECT COUNT(DISTINCT v.donor_id) FROM Visits v WHERE v.fundraiser_no = f.fundraiser_no) as unique_visitors
+               COALESCE(vs.total_visits, 0) as total_visits,
+               COALESCE(vs.unique_visitors, 0) as unique_visitors
         FROM Fundraiser f
         LEFT JOIN Administrator a ON f.Admin_id = a.Admin_id
+        LEFT JOIN FundraiserVisitStats vs ON f.fundraiser_no = vs.fundraiser_no
         ORDER BY f.fundraiser_no DESC
         """
-        return self.fetch_all(query)
+        return self.fetch_all_shards(query, key=('fundraiser_no',), reverse=True)
+    
+    @cached(ttl=30, tags=('fundraisers',))
+    def get_active_fundraisers(self):
+        """Active fundraisers with progress, soonest deadline first"""
+        return self.fetch_all_shards(
+            """SELECT f.fundraiser_no, f.title, f.description, f.goal_amount, f.raised_amount, 
+                      f.deadline, f.status, 
+                      ROUND((f.raised_amount / f.goal_amount * 100), 2) as progress
+               FROM Fundraiser f
+               WHERE f.status = 'Active'
+               ORDER BY f.deadline ASC""",
+            key=('deadline',)
+        )
+    
+    @cached(ttl=30, tags=('fundraisers',))
+    def get_fundraiser_options(self):
+        """Lightweight fundraiser list for dropdowns"""
+        return self.fetch_all_shards(
+            "SELECT fundraiser_no, title, remaining_amount, status FROM Fundraiser ORDER BY fundraiser_no DESC",
+            key=('fundraiser_no',), reverse=True
+        )
+    
+    @cached(ttl=30, tags=('fundraisers',))
+    def get_fundraisers_page(self, status=None, admin_id=None, cursor=None, direction='next', limit=None):
+        query = """
+        SELECT f.*, a.name as admin_name,
+               ROUND((f.raised_amount / f.goal_amount * 100), 2) as progress,
+               COALESCE(vs.total_visits, 0) as total_visits,
+               COALESCE(vs.unique_visitors, 0) as unique_visitors
+        FROM Fundraiser f
+        LEFT JOIN Administrator a ON f.Admin_id = a.Admin_id
+        LEFT JOIN FundraiserVisitStats vs ON f.fundraiser_no = vs.fundraiser_no
+        """
+        filters, params = [], []
+        if status:
+            filters.append("f.status = %s")
+            params.append(status)
+        if admin_id:
+            filters.append("f.Admin_id = %s")
+            params.append(admin_id)
+        return self.fetch_page(query, [('f.fundraiser_no', 'fundraiser_no')], filters, params,
+                               cursor=cursor, direction=direction, limit=limit, sharded=True)
     
+    @cached(ttl=30, tags=('fundraisers',))
+    def search_fundraisers(self, q, status=None, admin_id=None, deadline=None, limit=None):
+        """Fundraisers whose title, description or owner name match every word
+        of ``q`` (see ``search_expression``), best match first, filtered on
+        ``status``, ``admin_id`` and the ``deadline`` window (a
+        SEARCH_DEADLINE_WINDOWS key).
+
+        Returns ``{'query', 'results', 'total', 'facets'}``. The facets count
+        the matches per status, administrator and deadline window under the
+        other two filters, so picking one value still shows the
+        alternatives. They come from one GROUP BY over the FULLTEXT matches
+        (one row per combination, added up across shard nodes), not from a
+        scan of the table.
+        """
+        expression = search_expression(q)
+        facets = {'status': [], 'admin': [], 'deadline': []}
+        if expression is None:
+            return {'query': q, 'results': [], 'total': 0, 'facets': facets}
+        match = f"MATCH({FUNDRAISER_SEARCH_COLUMNS}) AGAINST (%s IN BOOLEAN MODE)"
+        filters, params = [match], [expression]
+        if status:
+            filters.append("f.status = %s")
+            params.append(status)
+        if admin_id:
+            filters.append("f.Admin_id = %s")
+            params.append(admin_id)
+        if deadline in SEARCH_DEADLINE_WINDOWS:
+            filters.append(SEARCH_DEADLINE_WINDOWS[deadline][1])
+        limit = clamp_page_size(limit)
+        results = self.fetch_all_shards(
+            f"""SELECT f.fundraiser_no, f.title, f.fundraiser_owner_name, f.status, f.deadline,
+                      f.goal_amount, f.raised_amount, f.Admin_id, a.name as admin_name,
+                      ROUND((f.raised_amount / f.goal_amount * 100), 2) as progress,
+                      {match} AS score
+               FROM Fundraiser f
+               LEFT JOIN Administrator a ON f.Admin_id = a.Admin_id
+               WHERE {' AND '.join(filters)}
+               ORDER BY score DESC, f.fundraiser_no DESC
+               LIMIT %s""",
+            (expression, *params, limit), key=('score', 'fundraiser_no'), reverse=True, limit=limit
+        )
+        window = ' '.join(f"WHEN {condition} THEN '{key}'"
+                          for key, (label, condition) in SEARCH_DEADLINE_WINDOWS.items())
+        groups = self.fetch_all_shards(
+            f"""SELECT f.status, f.Admin_id as admin_id, a.name as admin_name,
+                      CASE {window} END AS deadline_window, COUNT(*) AS matches
+               FROM Fundraiser f
+               LEFT JOIN Administrator a ON f.Admin_id = a.Admin_id
+               WHERE {match}
+               GROUP BY f.status, f.Admin_id, a.name, deadline_window""",
+            (expression,)
+        )
+        selected = {'status': status or None, 'admin_id': int(admin_id) if admin_id else None,
+                    'deadline_window': deadline if deadline in SEARCH_DEADLINE_WINDOWS else None}
+        counts = {column: {} for column in selected}
+        admin_names = {}
+        total = 0
+        for group in groups:
+            admin_names[group['admin_id']] = group['admin_name']
+            misses = [column for column, value in selected.items()
+                      if value is not None and group[column] != value]
+            if not misses:
+                total += group['matches']
+            for column in selected:
+                if not misses or misses == [column]:
+                    counts[column][group[column]] = counts[column].get(group[column], 0) + group['matches']
+        facets['status'] = [{'value': value, 'label': value, 'count': count, 'selected': value == selected['status']}
+                            for value, count in sorted(counts['status'].items(), key=lambda item: -item[1])]
+        facets['admin'] = [{'value': value, 'label': admin_names.get(value) or 'Unassigned', 'count': count,
+                            'selected': value is not None and value == selected['admin_id']}
+                           for value, count in sorted(counts['admin_id'].items(), key=lambda item: -item[1])]
+        facets['deadline'] = [{'value': key, 'label': label, 'count': counts['deadline_window'][key],
+                               'selected': key == selected['deadline_window']}
+                              for key, (label, condition) in SEARCH_DEADLINE_WINDOWS.items()
+                              if key in counts['deadline_window']]
+        return {'query': q, 'results': results, 'total': total, 'facets': facets}
+    
+    @cached(ttl=30, tags=('fundraisers', 'donors'))
+    def suggest(self, q, limit=8):
+        """Typeahead: the best ``limit`` fundraiser titles and donor names for
+        a partly typed ``q``, straight off the FULLTEXT indexes"""
+        expression = search_expression(q)
+        if expression is None:
+            return {'fundraisers': [], 'donors': []}
+        match = f"MATCH({FUNDRAISER_SEARCH_COLUMNS}) AGAINST (%s IN BOOLEAN MODE)"
+        fundraisers = self.fetch_all_shards(
+            f"""SELECT f.fundraiser_no, f.title, f.status, {match} AS score
+               FROM Fundraiser f
+               WHERE {match}
+               ORDER BY score DESC, f.fundraiser_no DESC
+               LIMIT %s""",
+            (expression, expression, limit), key=('score', 'fundraiser_no'), reverse=True, limit=limit
+        )
+        match = f"MATCH({DONOR_SEARCH_COLUMNS}) AGAINST (%s IN BOOLEAN MODE)"
+        donors = self.fetch_all(
+            f"""SELECT donor_id, dname, demail, {match} AS score
+               FROM Donor
+               WHERE {match}
+               ORDER BY score DESC, donor_id DESC
+               LIMIT %s""",
+            (expression, expression, limit)
+        )
+        return {'fundraisers': fundraisers, 'donors': donors}
+    
+    @cached(ttl=30, tags=('fundraiser:{fundraiser_no}',))
+    @routed
     def get_fundraiser(self, fundraiser_no):
         query = """
         SELECT f.*, a.name as admin_name,
                ROUND((f.raised_amount / f.goal_amount * 100), 2) as progress,
-               (SELECT COUNT(*) FROM Visits v WHERE v.fundraiser_no = f.fundraiser_no) as total_visits,
-               (SELECT COUNT(DISTINCT v.donor_id) FROM Visits v WHERE v.fundraiser_no = f.fundraiser_no) as unique_visitors
+               COALESCE(vs.total_visits, 0) as total_visits,
+               COALESCE(vs.unique_visitors, 0) as unique_visitors
         FROM Fundraiser f
         LEFT JOIN Administrator a ON f.Admin_id = a.Admin_id
+        LEFT JOIN FundraiserVisitStats vs ON f.fundraiser_no = vs.fundraiser_no
         WHERE f.fundraiser_no = %s
         """
         return self.fetch_one(query, (fundraiser_no,))
     
+    @invalidates('fundraisers', 'admins', 'stats')
     def add_fundraiser(self, admin_id, bank_details, title, description, goal_amount, deadline, status, fundraiser_owner_name):
-        return self.execute_procedure('AddFundraiser', (admin_id, bank_details, title, description, goal_amount, deadline, status, fundraiser_owner_name))
+        """Add a fundraiser; with shard nodes, on the node holding the fewest"""
+        params = (admin_id, bank_details, title, description, goal_amount, deadline, status, fundraiser_owner_name)
+        if not self.shards or _shard.get() is not None:
+            return self.execute_procedure('AddFundraiser', params)
+        counts = self.scatter(self.fetch_one, "SELECT COUNT(*) AS fundraisers FROM Fundraiser")
+        node = min(range(len(counts)), key=lambda n: (counts[n] or {}).get('fundraisers', 0))
+        with self.on_shard(node):
+            result = self.call_procedure('AddFundraiser', params)
+        fundraiser_no = (result.get('data') or {}).get('Fundraiser_no')
+        if not result['success'] or fundraiser_no is None:
+            message = (result.get('data') or {}).get('Error_Message') or result.get('message')
+            return {'success': False, 'message': message}
+        if node:
+            try:
+                self.shards.assign(fundraiser_no, node)
+            except Error as e:
+                # Unlisted, the fundraiser would be looked for on node 0
+                with self.on_shard(node):
+                    self.execute_query("DELETE FROM Fundraiser WHERE fundraiser_no = %s", (fundraiser_no,))
+                return {'success': False, 'message': f"Could not record the fundraiser's shard: {e}"}
+        return {'success': True, 'data': result['data']}
     
+    @invalidates('fundraisers', 'fundraiser:{fundraiser_no}', 'transactions', 'payroll', 'visits', 'stats')
+    @routed
     def update_fundraiser(self, fundraiser_no, title, description, goal_amount, deadline, status, fundraiser_owner_name):
-        return self.execute_procedure('UpdateFundraiser', (fundraiser_no, title, description, goal_amount, deadline, status, fundraiser_owner_name))
+        result = self.execute_procedure('UpdateFundraiser', (fundraiser_no, title, description, goal_amount, deadline, status, fundraiser_owner_name))
+        if result['success']:
+            # Donor pages show the fundraiser's title in their donation, visit and interest tables
+            self.invalidate_each('donor:{donor_id}',
+                                 "SELECT donor_id FROM Transactions WHERE fundraiser_no = %s "
+                                 "UNION SELECT donor_id FROM Visits WHERE fundraiser_no = %s",
+                                 (fundraiser_no, fundraiser_no))
+        return result
     
+    @invalidates('fundraisers', 'fundraiser:{fundraiser_no}', 'admins', 'transactions', 'payroll',
+                 'visits', 'stats')
+    @routed
     def delete_fundraiser(self, fundraiser_no):
         return self.execute_procedure('DeleteFundraiser', (fundraiser_no,))
     
+    @invalidates('fundraisers', 'fundraiser:{fundraiser_no}', 'admins', 'stats')
+    @routed
     def soft_delete_fundraiser(self, fundraiser_no):
         """Soft delete fundraiser (sets status to 'Deleted')"""
         return self.execute_procedure('SoftDeleteFundraiser', (fundraiser_no,))
     
+    @cached(ttl=30, tags=('fundraiser:{fundraiser_no}',))
+    @routed
     def get_fundraiser_transactions(self, fundraiser_no):
         query = """
         SELECT t.*, d.dname as donor_name
@@ -276,6 +1540,8 @@ class Database:
         """
         return self.fetch_all(query, (fundraiser_no,))
     
+    @cached(ttl=30, tags=('fundraiser:{fundraiser_no}',))
+    @routed
     def get_fundraiser_payrolls(self, fundraiser_no):
         query = """
         SELECT p.*, a.name as admin_name
@@ -286,16 +1552,22 @@ class Database:
         """
         return self.fetch_all(query, (fundraiser_no,))
     
+    @cached(ttl=30, tags=('fundraiser:{fundraiser_no}',))
+    @routed
     def get_fundraiser_visits(self, fundraiser_no):
+        """Visits to a fundraiser with each donor's current interest level"""
         query = """
-        SELECT v.*, d.dname as donor_name
+        SELECT v.*, d.dname as donor_name,
+               e.interest_level, e.visit_count as donor_visit_count
         FROM Visits v
         JOIN Donor d ON v.donor_id = d.donor_id
+        JOIN DonorFundraiserEngagement e ON e.donor_id = v.donor_id AND e.fundraiser_no = v.fundraiser_no
         WHERE v.fundraiser_no = %s
         ORDER BY v.visit_date DESC
         """
         return self.fetch_all(query, (fundraiser_no,))
     
+    @cached(ttl=10, tags=('transactions',))
     def get_all_transactions(self):
         query = """
         SELECT t.*, d.dname as donor_name, f.title as fundraiser_title,
@@ -305,33 +1577,305 @@ class Database:
         JOIN Fundraiser f ON t.fundraiser_no = f.fundraiser_no
         ORDER BY t.transaction_date DESC
         """
-        return self.fetch_all(query)
+        return self.fetch_all_shards(query, key=('transaction_date',), reverse=True)
     
-    def process_donation(self, donor_id, fundraiser_no, amount, payment_mode):
-        """Process donation using new ProcessDonation procedure (auto-calculates commission)"""
+    @cached(ttl=10, tags=('transactions',))
+    def get_transactions_page(self, date_from=None, date_to=None, fundraiser_no=None, donor_id=None,
+                              payment_mode=None, cursor=None, direction='next', limit=None):
+        """Keyset page of transactions on (transaction_date, Transaction_id), newest first"""
+        query = """
+        SELECT t.*, d.dname as donor_name, f.title as fundraiser_title,
+               'IMMUTABLE' as record_status
+        FROM Transactions t
+        JOIN Donor d ON t.donor_id = d.donor_id
+        JOIN Fundraiser f ON t.fundraiser_no = f.fundraiser_no
+        """
+        filters, params = self._date_range_filters('t.transaction_date', date_from, date_to)
+        if fundraiser_no:
+            filters.append("t.fundraiser_no = %s")
+            params.append(fundraiser_no)
+        if donor_id:
+            filters.append("t.donor_id = %s")
+            params.append(donor_id)
+        if payment_mode:
+            filters.append("t.payment_mode = %s")
+            params.append(payment_mode)
+        keys = [('t.transaction_date', 'transaction_date'), ('t.Transaction_id', 'Transaction_id')]
+        with self.on_home_shard(fundraiser_no):
+            return self.fetch_page(query, keys, filters, params, cursor=cursor, direction=direction, limit=limit,
+                                   sharded=True)
+    
+    def _date_range_filters(self, column, date_from=None, date_to=None):
+        """WHERE fragments for an inclusive [date_from, date_to] day range"""
+        filters, params = [], []
+        if date_from:
+            filters.append(f"{column} >= %s")
+            params.append(date_from)
+        if date_to:
+            filters.append(f"{column} < %s + INTERVAL 1 DAY")
+            params.append(date_to)
+        return filters, params
+    
+    def export_transactions(self, date_from=None, date_to=None, fundraiser_no=None, chunk_size=1000):
+        """Stream all matching transactions in (transaction_date, Transaction_id) order"""
+        filters, params = self._date_range_filters('t.transaction_date', date_from, date_to)
+        if fundraiser_no:
+            filters.append("t.fundraiser_no = %s")
+            params.append(fundraiser_no)
+        query = """
+        SELECT t.Transaction_id, t.transaction_date, t.donor_id, d.dname AS donor_name,
+               t.fundraiser_no, f.title AS fundraiser_title, t.amount, t.platform_fee,
+               t.net_amount, t.payment_mode
+        FROM Transactions t
+        JOIN Donor d ON t.donor_id = d.donor_id
+        JOIN Fundraiser f ON t.fundraiser_no = f.fundraiser_no
+        """
+        if filters:
+            query += " WHERE " + " AND ".join(filters)
+        query += " ORDER BY t.transaction_date, t.Transaction_id"
+        return self.stream_shards(query, params, chunk_size, ('transaction_date', 'Transaction_id'), fundraiser_no)
+    
+    @invalidates('fundraisers', 'fundraiser:{fundraiser_no}', 'donors', 'donor:{donor_id}', 'admins',
+                 'transactions', 'payroll', 'visits', 'stats')
+    @routed
+    def process_donation(self, donor_id, fundraiser_no, amount, payment_mode, retries=3, idempotency_key=None):
+        """Process donation using new ProcessDonation procedure (auto-calculates commission)
+
+        Retried on lock wait timeout or deadlock, which the procedure's lock
+        ordering should make rare. With ``idempotency_key``, a repeat of a
+        donation already made under that key returns its stored result
+        (with ``replayed``) from one primary-key lookup instead of donating again.
+        The session's later reads see the donation (see ``read_after``).
+        """
+        if idempotency_key:
+            replayed = self.replay_donation(idempotency_key, donor_id, fundraiser_no, amount, payment_mode)
+            if replayed is not None:
+                if replayed['success']:
+                    # The original response (and its session update) may have been lost
+                    self._note_write()
+                return replayed
+        for attempt in range(retries):
+            if idempotency_key:
+                result = self.call_procedure('ProcessDonationOnce',
+                                             (idempotency_key, donor_id, fundraiser_no, amount, payment_mode))
+            else:
+                result = self.call_procedure('ProcessDonation', (donor_id, fundraiser_no, amount, payment_mode))
+            if idempotency_key and result.get('errno') == DUPLICATE_KEY_ERRNO:
+                # A concurrent request with the same key committed first
+                return self.replay_donation(idempotency_key, donor_id, fundraiser_no, amount, payment_mode) or result
+            if result['success'] or not result.get('retryable'):
+                break
+        if result['success']:
+            self._note_write()
+        return result
+    
+    @routed
+    def replay_donation(self, idempotency_key, donor_id, fundraiser_no, amount, payment_mode):
+        """Stored result of the donation made under ``idempotency_key``, or None if there is none
+        (keys live on the fundraiser's shard node)"""
+        # A replica may not have the key yet, and the retry would then donate again
+        with self.primary_reads():
+            row = self.fetch_one(
+                "SELECT donor_id, fundraiser_no, amount, payment_mode, result "
+                "FROM DonationIdempotencyKeys WHERE idempotency_key = %s",
+                (idempotency_key,)
+            )
+        return self.stored_donation_result(row, donor_id, fundraiser_no, amount, payment_mode)
+    
+    @staticmethod
+    def stored_donation_result(row, donor_id, fundraiser_no, amount, payment_mode):
+        """Turn a DonationIdempotencyKeys row into a process_donation() result"""
+        if row is None:
+            return None
+        try:
+            same = (row['donor_id'] == int(donor_id) and row['fundraiser_no'] == int(fundraiser_no)
+                    and row['amount'] == Decimal(str(amount)) and row['payment_mode'] == payment_mode)
+        except (TypeError, ValueError, InvalidOperation):
+            same = False
+        if not same:
+            return {'success': False, 'message': 'Idempotency key was already used for a different donation'}
+        return {'success': True, 'data': json.loads(row['result'], parse_float=Decimal), 'replayed': True}
+    
+    def sweep_idempotency_keys(self, older_than_hours, batch_size=5000):
+        """Delete idempotency keys older than ``older_than_hours`` in batches; returns the count"""
+        if self.shards and _shard.get() is None:
+            results = self.scatter(self.sweep_idempotency_keys, older_than_hours, batch_size)
+            failed = next((result for result in results if not result['success']), None)
+            if failed is not None:
+                return failed
+            return {'success': True, 'deleted': sum(result['deleted'] for result in results)}
         connection = self.get_connection()
         if connection is None:
             return {'success': False, 'message': 'Database connection failed'}
         
         try:
-            cursor = connection.cursor(dictionary=True)
-            cursor.callproc('ProcessDonation', (donor_id, fundraiser_no, amount, payment_mode))
-            
-            # Fetch the result
-            result = None
-            for result_set in cursor.stored_results():
-                result = result_set.fetchone()
+            with self._timed(connection, 'transaction', 'sweep_idempotency_keys') as call:
+                cursor = connection.cursor()
+                deleted = 0
+                while True:
+                    # Short batches along the created_at index keep row locks brief
+                    cursor.execute(
+                        "DELETE FROM DonationIdempotencyKeys WHERE created_at < NOW() - INTERVAL %s HOUR LIMIT %s",
+                        (older_than_hours, batch_size)
+                    )
+                    connection.commit()
+                    deleted += cursor.rowcount
+                    if cursor.rowcount < batch_size:
+                        break
+                cursor.close()
+                call.rows = deleted
+            return {'success': True, 'deleted': deleted}
+        except Error as e:
+            return {'success': False, 'message': str(e)}
+        finally:
+            self.release_connection(connection)
+    
+    def import_donation_chunk(self, donations, retries=3):
+        """Write one chunk of parsed donations (see donation_import) in a single transaction.
+
+        With shard nodes the chunk is split by the fundraisers' home nodes
+        into one transaction per node. A node's part that still fails after
+        ``retries`` (on deadlock or lock wait timeout) has its rows reported
+        as errors, since the other parts are already committed.
+        """
+        if not self.shards or _shard.get() is not None:
+            return self._import_donation_chunk(donations)
+        groups = self._per_home_shard(self._import_donation_chunk, donations, lambda d: d['fundraiser_no'])
+        if len(groups) == 1:
+            return groups[0][1]
+        imported, errors = 0, []
+        for group, result in groups:
+            for attempt in range(1, retries):
+                if result['success'] or not result.get('retryable'):
+                    break
+                with self.on_home_shard(group[0]['fundraiser_no']):
+                    result = self._import_donation_chunk(group)
+            if result['success']:
+                imported += result['imported']
+                errors.extend(result['errors'])
+            else:
+                errors.extend({'row': d['row'], 'message': result['message']} for d in group)
+        errors.sort(key=lambda error: error['row'])
+        return {'success': True, 'imported': imported, 'errors': errors}
+    
+    def _import_donation_chunk(self, donations):
+        """One node's import transaction.
+
+        Donors and fundraisers are validated with one lookup each and
+        locked, the fundraisers so the remaining goal can be checked cumulatively
+        across the chunk, and the valid rows written with multi-row INSERTs.
+        ``@bulk_donation_import`` makes the transaction triggers skip their
+        per-row bookkeeping, which ApplyBulkDonations() then applies once for
+        the whole chunk. Returns the rows rejected with their reasons.
+        """
+        if not donations:
+            return {'success': True, 'imported': 0, 'errors': []}
+        connection = self.get_connection()
+        if connection is None:
+            return {'success': False, 'message': 'Database connection failed'}
+        
+        try:
+            with self._timed(connection, 'transaction', 'import_donation_chunk') as call:
+                cursor = connection.cursor()
+                cursor.execute("SET @bulk_donation_import = 1")
+                # Donors then fundraisers, each in key order: the lock order of
+                # ProcessDonation, so imports and live donations cannot deadlock
+                donor_ids = sorted({d['donor_id'] for d in donations})
+                cursor.execute(
+                    f"""SELECT donor_id FROM Donor WHERE donor_id IN ({', '.join(['%s'] * len(donor_ids))})
+                        ORDER BY donor_id FOR UPDATE""",
+                    donor_ids
+                )
+                valid_donors = {row[0] for row in cursor.fetchall()}
+                fundraiser_nos = sorted({d['fundraiser_no'] for d in donations})
+                cursor.execute(
+                    f"""SELECT fundraiser_no, Admin_id, status, goal_amount - raised_amount
+                        FROM Fundraiser WHERE fundraiser_no IN ({', '.join(['%s'] * len(fundraiser_nos))})
+                        ORDER BY fundraiser_no FOR UPDATE""",
+                    fundraiser_nos
+                )
+                fundraisers = {row[0]: row[1:] for row in cursor.fetchall()}
             
-            connection.commit()
-            cursor.close()
-            connection.close()
+                remaining = {no: fundraiser[2] for no, fundraiser in fundraisers.items()}
+                accepted, errors = [], []
+                for d in donations:
+                    fundraiser = fundraisers.get(d['fundraiser_no'])
+                    if d['donor_id'] not in valid_donors:
+                        message = 'Donor does not exist'
+                    elif fundraiser is None:
+                        message = 'Fundraiser does not exist'
+                    elif fundraiser[1] != 'Active':
+                        message = 'Fundraiser is not active. Cannot accept donations.'
+                    elif fundraiser[0] is None:
+                        message = 'Fundraiser has no administrator'
+                    elif d['net_amount'] > remaining[d['fundraiser_no']]:
+                        message = 'Donation exceeds remaining goal amount'
+                    else:
+                        remaining[d['fundraiser_no']] -= d['net_amount']
+                        accepted.append(d)
+                        continue
+                    errors.append({'row': d['row'], 'message': message})
             
-            if result:
-                return {'success': True, 'data': result}
-            return {'success': True}
+                if accepted:
+                    params = []
+                    for d in accepted:
+                        params.extend((d['donor_id'], d['fundraiser_no'], d['amount'], d['platform_fee'],
+                                       d['net_amount'], d['payment_mode'], d['transaction_date']))
+                    cursor.execute(
+                        "INSERT INTO Transactions (donor_id, fundraiser_no, amount, platform_fee, net_amount, "
+                        "payment_mode, transaction_date) VALUES "
+                        + ", ".join(["(%s, %s, %s, %s, %s, %s, COALESCE(%s, NOW()))"] * len(accepted)),
+                        params
+                    )
+                    # A multi-row INSERT gets consecutive ids, auto_increment_increment
+                    # apart (the node count when sharded); confirm they are ours
+                    # before ApplyBulkDonations works on them
+                    first_id = cursor.lastrowid
+                    cursor.execute("SELECT @@auto_increment_increment")
+                    step = cursor.fetchone()[0]
+                    last_id = first_id + (len(accepted) - 1) * step
+                    cursor.execute(
+                        "SELECT donor_id, fundraiser_no, amount FROM Transactions "
+                        "WHERE Transaction_id BETWEEN %s AND %s AND MOD(Transaction_id - %s, %s) = 0 "
+                        "ORDER BY Transaction_id",
+                        (first_id, last_id, first_id, step)
+                    )
+                    if cursor.fetchall() != [(d['donor_id'], d['fundraiser_no'], d['amount']) for d in accepted]:
+                        raise Error(msg='Imported transactions did not receive consecutive ids')
+                    cursor.callproc('ApplyBulkDonations', (first_id, last_id, step))
+                
+                    # Record a visit per donation as ProcessDonation does, in
+                    # (donor, fundraiser) order like insert_visits_batch
+                    visits = sorted(accepted, key=lambda d: (d['donor_id'], d['fundraiser_no']))
+                    params = []
+                    for d in visits:
+                        params.extend((d['donor_id'], d['fundraiser_no'], d['transaction_date']))
+                    cursor.execute(
+                        "INSERT INTO Visits (donor_id, fundraiser_no, visit_date, duration, visit_type) VALUES "
+                        + ", ".join(["(%s, %s, COALESCE(%s, NOW()), 20, 'Transaction')"] * len(visits)),
+                        params
+                    )
+                connection.commit()
+                cursor.close()
+                call.rows = len(accepted)
+            if accepted:
+                self.invalidate('fundraisers', 'donors', 'admins', 'transactions', 'payroll', 'visits', 'stats',
+                                *{f"donor:{d['donor_id']}" for d in accepted},
+                                *{f"fundraiser:{d['fundraiser_no']}" for d in accepted},
+                                *{f"admin:{fundraisers[d['fundraiser_no']][0]}" for d in accepted})
+            return {'success': True, 'imported': len(accepted), 'errors': errors}
         except Error as e:
-            return {'success': False, 'message': str(e)}
+            return {'success': False, 'message': str(e), 'retryable': e.errno in RETRYABLE_ERRNOS}
+        finally:
+            try:
+                reset = connection.cursor()
+                reset.execute("SET @bulk_donation_import = NULL")
+                reset.close()
+            except Error:
+                pass
+            self.release_connection(connection)
     
+    @cached(ttl=10, tags=('payroll',))
     def get_all_payroll(self):
         query = """
         SELECT p.*, a.name as admin_name, f.title as fundraiser_title
@@ -340,11 +1884,55 @@ class Database:
         JOIN Fundraiser f ON p.fundraiser_no = f.fundraiser_no
         ORDER BY p.payout_date DESC
         """
-        return self.fetch_all(query)
+        return self.fetch_all_shards(query, key=('payout_date',), reverse=True)
     
+    @cached(ttl=10, tags=('payroll',))
+    def get_payroll_page(self, date_from=None, date_to=None, fundraiser_no=None, admin_id=None,
+                         cursor=None, direction='next', limit=None):
+        """Keyset page of payroll entries on (payout_date, Payroll_id), newest first"""
+        query = """
+        SELECT p.*, a.name as admin_name, f.title as fundraiser_title
+        FROM Payroll p
+        JOIN Administrator a ON p.Admin_id = a.Admin_id
+        JOIN Fundraiser f ON p.fundraiser_no = f.fundraiser_no
+        """
+        filters, params = self._date_range_filters('p.payout_date', date_from, date_to)
+        if fundraiser_no:
+            filters.append("p.fundraiser_no = %s")
+            params.append(fundraiser_no)
+        if admin_id:
+            filters.append("p.Admin_id = %s")
+            params.append(admin_id)
+        keys = [('p.payout_date', 'payout_date'), ('p.Payroll_id', 'Payroll_id')]
+        with self.on_home_shard(fundraiser_no):
+            return self.fetch_page(query, keys, filters, params, cursor=cursor, direction=direction, limit=limit,
+                                   sharded=True)
+    
+    def export_payroll(self, date_from=None, date_to=None, fundraiser_no=None, chunk_size=1000):
+        """Stream all matching payroll entries in (payout_date, Payroll_id) order"""
+        filters, params = self._date_range_filters('p.payout_date', date_from, date_to)
+        if fundraiser_no:
+            filters.append("p.fundraiser_no = %s")
+            params.append(fundraiser_no)
+        query = """
+        SELECT p.Payroll_id, p.payout_date, p.Admin_id, a.name AS admin_name,
+               p.fundraiser_no, f.title AS fundraiser_title, p.Transaction_id,
+               p.admin_earnings, p.platform_fee_deducted, p.payout_type
+        FROM Payroll p
+        LEFT JOIN Administrator a ON p.Admin_id = a.Admin_id
+        LEFT JOIN Fundraiser f ON p.fundraiser_no = f.fundraiser_no
+        """
+        if filters:
+            query += " WHERE " + " AND ".join(filters)
+        query += " ORDER BY p.payout_date, p.Payroll_id"
+        return self.stream_shards(query, params, chunk_size, ('payout_date', 'Payroll_id'), fundraiser_no)
+    
+    @invalidates('payroll', 'admins', 'admin:{admin_id}', 'fundraiser:{fundraiser_no}', 'stats')
+    @routed
     def add_payroll(self, admin_id, fundraiser_no, payout_date, amount_released):
         return self.execute_procedure('AddPayroll', (admin_id, fundraiser_no, payout_date, amount_released))
     
+    @cached(ttl=10, tags=('visits',))
     def get_all_visits(self):
         query = """
         SELECT v.*, d.dname as donor_name, f.title as fundraiser_title
@@ -353,7 +1941,48 @@ class Database:
         JOIN Fundraiser f ON v.fundraiser_no = f.fundraiser_no
         ORDER BY v.visit_date DESC
         """
-        return self.fetch_all(query)
+        return self.fetch_all_shards(query, key=('visit_date',), reverse=True)
+    
+    @cached(ttl=10, tags=('visits',))
+    def get_visits_page(self, date_from=None, date_to=None, fundraiser_no=None, donor_id=None,
+                        cursor=None, direction='next', limit=None):
+        """Keyset page of visits on (visit_date, visit_id), newest first"""
+        query = """
+        SELECT v.*, d.dname as donor_name, f.title as fundraiser_title
+        FROM Visits v
+        JOIN Donor d ON v.donor_id = d.donor_id
+        JOIN Fundraiser f ON v.fundraiser_no = f.fundraiser_no
+        """
+        filters, params = self._date_range_filters('v.visit_date', date_from, date_to)
+        if fundraiser_no:
+            filters.append("v.fundraiser_no = %s")
+            params.append(fundraiser_no)
+        if donor_id:
+            filters.append("v.donor_id = %s")
+            params.append(donor_id)
+        keys = [('v.visit_date', 'visit_date'), ('v.visit_id', 'visit_id')]
+        with self.on_home_shard(fundraiser_no):
+            return self.fetch_page(query, keys, filters, params, cursor=cursor, direction=direction, limit=limit,
+                                   sharded=True)
+    
+    def export_visits(self, date_from=None, date_to=None, fundraiser_no=None, chunk_size=1000):
+        """Stream all matching visits in (visit_date, visit_id) order"""
+        filters, params = self._date_range_filters('v.visit_date', date_from, date_to)
+        if fundraiser_no:
+            filters.append("v.fundraiser_no = %s")
+            params.append(fundraiser_no)
+        query = """
+        SELECT v.visit_id, v.visit_date, v.donor_id, d.dname AS donor_name,
+               v.fundraiser_no, f.title AS fundraiser_title, v.duration,
+               v.interest_level, v.visit_type
+        FROM Visits v
+        JOIN Donor d ON v.donor_id = d.donor_id
+        JOIN Fundraiser f ON v.fundraiser_no = f.fundraiser_no
+        """
+        if filters:
+            query += " WHERE " + " AND ".join(filters)
+        query += " ORDER BY v.visit_date, v.visit_id"
+        return self.stream_shards(query, params, chunk_size, ('visit_date', 'visit_id'), fundraiser_no)
     
     def get_visit(self, visit_id):
         query = """
@@ -363,230 +1992,712 @@ class Database:
         JOIN Fundraiser f ON v.fundraiser_no = f.fundraiser_no
         WHERE v.visit_id = %s
         """
-        return self.fetch_one(query, (visit_id,))
+        rows = self.fetch_all_shards(query, (visit_id,))
+        return rows[0] if rows else None
     
+    @invalidates('visits', 'donor:{donor_id}', 'fundraiser:{fundraiser_no}', 'fundraisers', 'stats')
+    @routed
     def add_visit(self, donor_id, fundraiser_no, visit_date, duration, interest_level):
         return self.execute_procedure('AddVisit', (donor_id, fundraiser_no, visit_date, duration, interest_level))
     
+    @invalidates('visits')
     def update_visit(self, visit_id, duration, interest_level):
-        return self.execute_procedure('UpdateVisit', (visit_id, duration, interest_level))
+        # Visit ids are unique across nodes, so only the visit's node has the row
+        return self._on_every_node(self.execute_procedure, 'UpdateVisit', (visit_id, duration, interest_level))
     
+    @invalidates('visits', 'donor:{donor_id}', 'fundraiser:{fundraiser_no}', 'fundraisers', 'stats')
+    @routed
     def record_fundraiser_visit(self, donor_id, fundraiser_no, duration):
         """Record a visit using RecordFundraiserVisit procedure"""
+        result = self.call_procedure('RecordFundraiserVisit', (donor_id, fundraiser_no, duration))
+        if result['success']:
+            self._note_write()
+        return result
+    
+    def insert_visits_batch(self, visits):
+        """Insert buffered visits in one transaction (used by VisitQueue).
+
+        ``visits`` is a list of (donor_id, fundraiser_no, duration, visit_type,
+        age_seconds). Unknown donors/fundraisers and negative durations are
+        filtered out with two set-based lookups so one bad beacon cannot fail
+        the whole batch. The visit insert trigger keeps
+        DonorFundraiserEngagement (visit count, interest level) current.
+        With shard nodes there is one transaction per home node; if one
+        fails, the result is a failure that still counts the ``inserted``
+        visits of the others.
+        """
+        if self.shards and _shard.get() is None and visits:
+            groups = self._per_home_shard(self.insert_visits_batch, visits, lambda visit: visit[1])
+            inserted = sum(result.get('inserted', 0) for _, result in groups)
+            rejected = sum(result.get('rejected', 0) for _, result in groups)
+            failed = [result['message'] for _, result in groups if not result['success']]
+            if failed:
+                return {'success': False, 'message': '; '.join(failed), 'inserted': inserted}
+            return {'success': True, 'inserted': inserted, 'rejected': rejected}
+        if not visits:
+            return {'success': True, 'inserted': 0, 'rejected': 0}
         connection = self.get_connection()
         if connection is None:
             return {'success': False, 'message': 'Database connection failed'}
         
         try:
-            cursor = connection.cursor(dictionary=True)
-            cursor.callproc('RecordFundraiserVisit', (donor_id, fundraiser_no, duration))
+            with self._timed(connection, 'transaction', 'insert_visits_batch') as call:
+                cursor = connection.cursor()
+                # Share-lock all donors, then all fundraisers, in key order (the
+                # donation lock order) before the per-row triggers run, so a
+                # flush cannot deadlock with a donation
+                donor_ids = sorted({visit[0] for visit in visits})
+                cursor.execute(
+                    f"""SELECT donor_id FROM Donor WHERE donor_id IN ({', '.join(['%s'] * len(donor_ids))})
+                        ORDER BY donor_id FOR SHARE""",
+                    donor_ids
+                )
+                valid_donors = {row[0] for row in cursor.fetchall()}
+                fundraiser_nos = sorted({visit[1] for visit in visits})
+                cursor.execute(
+                    f"""SELECT fundraiser_no FROM Fundraiser WHERE fundraiser_no IN ({', '.join(['%s'] * len(fundraiser_nos))})
+                        ORDER BY fundraiser_no FOR SHARE""",
+                    fundraiser_nos
+                )
+                valid_fundraisers = {row[0] for row in cursor.fetchall()}
             
-            # Fetch the result
-            result = None
-            for result_set in cursor.stored_results():
-                result = result_set.fetchone()
-            
-            connection.commit()
-            cursor.close()
-            connection.close()
-            
-            if result:
-                return {'success': True, 'data': result}
-            return {'success': True}
+                valid = [visit for visit in visits
+                         if visit[0] in valid_donors and visit[1] in valid_fundraisers and visit[2] >= 0]
+                if valid:
+                    # Insert in (donor, fundraiser) order so concurrent flushes
+                    # take the engagement row locks in the same order
+                    valid.sort(key=lambda visit: (visit[0], visit[1]))
+                    params = []
+                    for donor_id, fundraiser_no, duration, visit_type, age in valid:
+                        params.extend((donor_id, fundraiser_no, age, duration, visit_type))
+                    cursor.execute(
+                        "INSERT INTO Visits (donor_id, fundraiser_no, visit_date, duration, visit_type) VALUES "
+                        + ", ".join(["(%s, %s, NOW() - INTERVAL %s SECOND, %s, %s)"] * len(valid)),
+                        params
+                    )
+                connection.commit()
+                cursor.close()
+                call.rows = len(valid)
+            if valid:
+                self.invalidate('visits', 'fundraisers', 'stats',
+                                *{f"donor:{visit[0]}" for visit in valid},
+                                *{f"fundraiser:{visit[1]}" for visit in valid})
+            return {'success': True, 'inserted': len(valid), 'rejected': len(visits) - len(valid)}
         except Error as e:
             return {'success': False, 'message': str(e)}
+        finally:
+            self.release_connection(connection)
     
+    @cached(ttl=30, tags=('donor:{donor_id}',))
     def get_donor_interest_analytics(self, donor_id):
         """Get donor interest analytics"""
-        connection = self.get_connection()
-        if connection is None:
-            return []
-        
-        try:
-            cursor = connection.cursor(dictionary=True)
-            cursor.callproc('GetDonorInterestAnalytics', (donor_id,))
-            
-            results = []
-            for result_set in cursor.stored_results():
-                results = result_set.fetchall()
-            
-            cursor.close()
-            connection.close()
-            return results
-        except Error as e:
-            print(f"Error fetching donor analytics: {e}")
-            return []
+        return self.fetch_all_shards('GetDonorInterestAnalytics', (donor_id,), key=('total_visits',), reverse=True,
+                                     procedure=True)
+    
+    @cached(ttl=30, tags=('payroll', 'admin:{admin_id}'))
+    def get_administrator_payrolls(self, admin_id):
+        return self.fetch_all_shards(
+            "SELECT p.*, f.title as fundraiser_title FROM Payroll p JOIN Fundraiser f ON p.fundraiser_no = f.fundraiser_no WHERE p.Admin_id = %s ORDER BY p.payout_date DESC",
+            (admin_id,), key=('payout_date',), reverse=True
+        )
     
+    @cached(ttl=30, tags=('admins', 'admin:{admin_id}'))
     def get_administrator_earnings(self, admin_id):
         """Get administrator earnings summary"""
-        connection = self.get_connection()
-        if connection is None:
-            return None
-        
-        try:
-            cursor = connection.cursor(dictionary=True)
-            cursor.callproc('GetAdministratorEarnings', (admin_id,))
-            
-            result = None
-            for result_set in cursor.stored_results():
-                result = result_set.fetchone()
-            
-            cursor.close()
-            connection.close()
-            return result
-        except Error as e:
-            print(f"Error fetching admin earnings: {e}")
-            return None
+        earnings = self.fetch_one_shards('GetAdministratorEarnings', (admin_id,), first=('Admin_id',), procedure=True)
+        if earnings and self.shards and _shard.get() is None:
+            earnings['Earnings_Breakdown'] = (
+                f"Admin receives 99% of donations (₹{earnings['Total_Earnings_Received']}) | "
+                f"Platform collects 1% (₹{earnings['Platform_Fees_From_My_Fundraisers']})"
+            )
+        return earnings
     
+    @cached(ttl=30, tags=('fundraiser:{fundraiser_no}',))
+    @routed
     def get_fundraiser_summary(self, fundraiser_no):
         """Get comprehensive fundraiser summary"""
-        connection = self.get_connection()
-        if connection is None:
-            return None
-        
-        try:
-            cursor = connection.cursor(dictionary=True)
-            cursor.callproc('GetFundraiserSummary', (fundraiser_no,))
-            
-            result = None
-            for result_set in cursor.stored_results():
-                result = result_set.fetchone()
-            
-            cursor.close()
-            connection.close()
-            return result
-        except Error as e:
-            print(f"Error fetching fundraiser summary: {e}")
-            return None
+        return self.fetch_procedure_one('GetFundraiserSummary', (fundraiser_no,))
     
+    @cached(ttl=10, tags=('stats',))
     def get_platform_statistics(self):
-        """Get overall platform statistics"""
+        """Get overall platform statistics (reads the PlatformCounters row of
+        every shard node; Unique_Visitors counts a donor once per node)"""
+        stats = self.fetch_one_shards('GetPlatformStatistics', (), first=('Total_Administrators', 'Total_Donors'),
+                                      procedure=True)
+        if stats and self.shards and _shard.get() is None:
+            stats['Platform_Revenue_Note'] = f"Platform earned: ₹{stats['Total_Platform_Revenue']} (1% of all donations)"
+            stats['Admin_Revenue_Note'] = f"Admins earned: ₹{stats['Total_Admin_Earnings']} (99% of all donations)"
+        return stats
+    
+    @invalidates('stats')
+    def reconcile_platform_counters(self):
+        """Rebuild PlatformCounters from the base tables"""
+        return self._on_every_node(self.call_procedure, 'ReconcilePlatformCounters', ())
+    
+    @invalidates('fundraisers', 'donors', 'admins')
+    def refresh_summary_tables(self):
+        """Rebuild the *Stats summary tables from the live reporting views"""
+        return self._on_every_node(self.call_procedure, 'RefreshSummaryTables', ())
+    
+    def check_summary_tables(self):
+        """Compare each summary-backed view read against its live view.
+
+        Both sides are read in one consistent snapshot, so concurrent writes
+        cannot show up as drift. Returns one entry per view with the rows
+        missing on either side and the columns that differ.
+        """
         connection = self.get_connection()
         if connection is None:
-            return None
+            return {'success': False, 'message': 'Database connection failed'}
         
         try:
+            connection.start_transaction(consistent_snapshot=True, readonly=True)
             cursor = connection.cursor(dictionary=True)
-            cursor.callproc('GetPlatformStatistics', ())
-            
-            result = None
-            for result_set in cursor.stored_results():
-                result = result_set.fetchone()
-            
+            report = []
+            for view, (key, query) in SUMMARY_VIEWS.items():
+                cursor.execute(f"SELECT * FROM {view}")
+                live = {row[key]: row for row in cursor.fetchall()}
+                cursor.execute(query)
+                summary = {row[key]: row for row in cursor.fetchall()}
+                
+                mismatches = []
+                for value in sorted(live.keys() | summary.keys()):
+                    expected, actual = live.get(value), summary.get(value)
+                    if expected is None or actual is None:
+                        mismatches.append({key: value, 'missing_from': 'view' if expected is None else 'summary'})
+                        continue
+                    columns = {column: {'view': expected[column], 'summary': actual.get(column)}
+                               for column in expected if actual.get(column) != expected[column]}
+                    if columns:
+                        mismatches.append({key: value, 'columns': columns})
+                report.append({'view': view, 'rows': len(live), 'mismatches': mismatches})
+            connection.commit()
             cursor.close()
-            connection.close()
-            return result
+            return {'success': True, 'views': report}
         except Error as e:
-            print(f"Error fetching platform stats: {e}")
-            return None
-    
-    def view_visit_history(self, fundraiser_no):
-        """View all visits to a fundraiser"""
+            return {'success': False, 'message': str(e)}
+        finally:
+            self.release_connection(connection)
+
+    @routed
+    def check_donation_totals(self, fundraiser_no):
+        """Check a fundraiser's running totals against its Transactions and Payroll rows.
+
+        Covers the amounts the donation triggers maintain: raised/remaining
+        amount and status, FundraiserDonationStats, one payout per donation,
+        the owner's earnings and the platform totals, with counter shards
+        folded in. Read in one consistent snapshot. Returns the problems found.
+        """
         connection = self.get_connection()
         if connection is None:
-            return []
-        
+            return {'success': False, 'message': 'Database connection failed'}
+
         try:
+            connection.start_transaction(consistent_snapshot=True, readonly=True)
             cursor = connection.cursor(dictionary=True)
-            cursor.callproc('ViewVisitHistory', (fundraiser_no,))
-            
-            results = []
-            for result_set in cursor.stored_results():
-                results = result_set.fetchall()
-            
+            cursor.execute("""
+                SELECT f.Admin_id, f.goal_amount, f.raised_amount, f.remaining_amount, f.status,
+                       (SELECT COUNT(*) FROM Transactions t WHERE t.fundraiser_no = f.fundraiser_no) AS transactions,
+                       (SELECT COALESCE(SUM(t.amount), 0) FROM Transactions t WHERE t.fundraiser_no = f.fundraiser_no) AS gross,
+                       (SELECT COALESCE(SUM(t.net_amount), 0) FROM Transactions t WHERE t.fundraiser_no = f.fundraiser_no) AS net,
+                       (SELECT COUNT(*) FROM Payroll p WHERE p.fundraiser_no = f.fundraiser_no) AS payouts,
+                       (SELECT COALESCE(SUM(p.admin_earnings), 0) FROM Payroll p WHERE p.fundraiser_no = f.fundraiser_no) AS paid_out,
+                       ds.total_transactions AS stats_transactions, ds.total_gross AS stats_gross, ds.total_net AS stats_net
+                FROM Fundraiser f
+                LEFT JOIN FundraiserDonationStats ds ON f.fundraiser_no = ds.fundraiser_no
+                WHERE f.fundraiser_no = %s
+            """, (fundraiser_no,))
+            fundraiser = cursor.fetchone()
+            if fundraiser is None:
+                connection.commit()
+                return {'success': False, 'message': f'Fundraiser {fundraiser_no} does not exist'}
+
+            problems = []
+            def expect(name, actual, expected):
+                if actual != expected:
+                    problems.append({'check': name, 'actual': actual, 'expected': expected})
+
+            expect('raised_amount = SUM(net_amount)', fundraiser['raised_amount'], fundraiser['net'])
+            expect('remaining_amount = goal - raised', fundraiser['remaining_amount'],
+                   fundraiser['goal_amount'] - fundraiser['raised_amount'])
+            if fundraiser['raised_amount'] > fundraiser['goal_amount']:
+                problems.append({'check': 'raised_amount <= goal_amount', 'actual': fundraiser['raised_amount'],
+                                 'expected': fundraiser['goal_amount']})
+            if fundraiser['raised_amount'] >= fundraiser['goal_amount']:
+                expect('status once goal reached', fundraiser['status'], 'Goal Reached')
+            expect('FundraiserDonationStats.total_transactions', fundraiser['stats_transactions'] or 0,
+                   fundraiser['transactions'])
+            expect('FundraiserDonationStats.total_gross', fundraiser['stats_gross'] or 0, fundraiser['gross'])
+            expect('FundraiserDonationStats.total_net', fundraiser['stats_net'] or 0, fundraiser['net'])
+            expect('one payout per donation', fundraiser['payouts'], fundraiser['transactions'])
+            expect('SUM(admin_earnings) = SUM(net_amount)', fundraiser['paid_out'], fundraiser['net'])
+
+            if fundraiser['Admin_id'] is not None:
+                cursor.execute("""
+                    SELECT c.total_earnings,
+                           (SELECT COALESCE(SUM(admin_earnings), 0) FROM Payroll WHERE Admin_id = c.Admin_id) AS paid_out
+                    FROM vw_administrator_counters c
+                    WHERE c.Admin_id = %s
+                """, (fundraiser['Admin_id'],))
+                admin = cursor.fetchone()
+                if admin:
+                    expect('administrator total_earnings = SUM(admin_earnings)', admin['total_earnings'], admin['paid_out'])
+
+            cursor.execute("""
+                SELECT pc.total_transactions, pc.total_gross, pc.total_net, pc.total_raised,
+                       t.n, t.gross, t.net, f.raised
+                FROM vw_platform_counters pc
+                CROSS JOIN (SELECT COUNT(*) AS n, COALESCE(SUM(amount), 0) AS gross,
+                                   COALESCE(SUM(net_amount), 0) AS net FROM Transactions) t
+                CROSS JOIN (SELECT COALESCE(SUM(raised_amount), 0) AS raised FROM Fundraiser) f
+            """)
+            platform = cursor.fetchone()
+            if platform:
+                expect('platform total_transactions', platform['total_transactions'], platform['n'])
+                expect('platform total_gross', platform['total_gross'], platform['gross'])
+                expect('platform total_net', platform['total_net'], platform['net'])
+                expect('platform total_raised', platform['total_raised'], platform['raised'])
+
+            connection.commit()
             cursor.close()
-            connection.close()
-            return results
+            return {'success': True, 'fundraiser': fundraiser, 'problems': problems}
         except Error as e:
-            print(f"Error fetching visit history: {e}")
-            return []
+            return {'success': False, 'message': str(e)}
+        finally:
+            self.release_connection(connection)
+
+    @cached(ttl=30, tags=('fundraiser:{fundraiser_no}',))
+    @routed
+    def view_visit_history(self, fundraiser_no):
+        """View all visits to a fundraiser"""
+        return self.fetch_procedure_all('ViewVisitHistory', (fundraiser_no,))
     
+    @cached(ttl=30, tags=('donor:{donor_id}',))
     def view_donor_visits(self, donor_id):
         """View all fundraisers visited by a donor"""
-        connection = self.get_connection()
-        if connection is None:
-            return []
-        
-        try:
-            cursor = connection.cursor(dictionary=True)
-            cursor.callproc('ViewDonorVisits', (donor_id,))
-            
-            results = []
-            for result_set in cursor.stored_results():
-                results = result_set.fetchall()
-            
-            cursor.close()
-            connection.close()
-            return results
-        except Error as e:
-            print(f"Error fetching donor visits: {e}")
-            return []
+        return self.fetch_all_shards('ViewDonorVisits', (donor_id,), key=('visit_date',), reverse=True, procedure=True)
     
+    @cached(ttl=300, tags=('fundraisers', 'donors'))
     def view_transaction_details(self, transaction_id):
         """View complete transaction details with payroll link"""
-        connection = self.get_connection()
-        if connection is None:
-            return None
-        
-        try:
-            cursor = connection.cursor(dictionary=True)
-            cursor.callproc('ViewTransactionDetails', (transaction_id,))
-            
-            result = None
-            for result_set in cursor.stored_results():
-                result = result_set.fetchone()
-            
-            cursor.close()
-            connection.close()
-            return result
-        except Error as e:
-            print(f"Error fetching transaction details: {e}")
-            return None
+        if not self.shards or _shard.get() is not None:
+            return self.fetch_procedure_one('ViewTransactionDetails', (transaction_id,))
+        rows = self.fetch_all_shards('ViewTransactionDetails', (transaction_id,), procedure=True)
+        return rows[0] if rows else None
     
+    @cached(ttl=30, tags=('fundraiser:{fundraiser_no}',))
+    @routed
     def view_audit_trail(self, fundraiser_no):
         """View complete audit trail for a fundraiser"""
-        connection = self.get_connection()
-        if connection is None:
-            return []
-        
-        try:
-            cursor = connection.cursor(dictionary=True)
-            cursor.callproc('ViewAuditTrail', (fundraiser_no,))
-            
-            results = []
-            for result_set in cursor.stored_results():
-                results = result_set.fetchall()
-            
-            cursor.close()
-            connection.close()
-            return results
-        except Error as e:
-            print(f"Error fetching audit trail: {e}")
-            return []
+        return self.fetch_procedure_all('ViewAuditTrail', (fundraiser_no,))
     
     # ========== DATABASE VIEWS ==========
+    # The donor engagement, administrator dashboard and high-interest donor
+    # views total per donor or administrator, which shard nodes only know
+    # for their own fundraisers: they read node 0.
     
+    @cached(ttl=30, tags=('fundraisers',))
     def get_active_fundraisers_view(self):
-        """Query vw_active_fundraisers view"""
-        query = "SELECT * FROM vw_active_fundraisers"
-        return self.fetch_all(query)
+        """Rows of vw_active_fundraisers, read from the summary tables"""
+        return self.fetch_all_shards(SUMMARY_VIEWS['vw_active_fundraisers'][1], key=('deadline',))
     
+    @cached(ttl=30, tags=('transactions',))
     def get_transaction_summary_view(self):
         """Query vw_transaction_summary view"""
         query = "SELECT * FROM vw_transaction_summary"
-        return self.fetch_all(query)
+        return self.fetch_all_shards(query, key=('transaction_date',), reverse=True)
     
+    @cached(ttl=60, tags=('donors',))
     def get_donor_engagement_view(self):
-        """Query vw_donor_engagement view"""
-        query = "SELECT * FROM vw_donor_engagement"
-        return self.fetch_all(query)
+        """Rows of vw_donor_engagement, read from DonorStats"""
+        return self.fetch_all(SUMMARY_VIEWS['vw_donor_engagement'][1])
     
+    @cached(ttl=60, tags=('admins',))
     def get_administrator_dashboard_view(self):
-        """Query vw_administrator_dashboard view"""
-        query = "SELECT * FROM vw_administrator_dashboard"
-        return self.fetch_all(query)
+        """Rows of vw_administrator_dashboard, read from AdministratorStats"""
+        return self.fetch_all(SUMMARY_VIEWS['vw_administrator_dashboard'][1])
     
+    @cached(ttl=60, tags=('visits',))
     def get_high_interest_donors_view(self):
         """Query vw_high_interest_donors view (donors with 5+ visits)"""
         query = "SELECT * FROM vw_high_interest_donors"
         return self.fetch_all(query)
+    
+    # ========== LIVE PROGRESS FEED ==========
+    # Read by live_feed.LiveFeed from one node at a time (on_shard), on the
+    # primary: the outbox is polled by event_id and must not lag.
+    
+    def last_fundraiser_event(self):
+        """Newest FundraiserEvents id (0 when empty) and the node's id ``step``
+        (``auto_increment_increment``)"""
+        return self.fetch_one("SELECT COALESCE(MAX(event_id), 0) AS event_id, "
+                              "@@auto_increment_increment AS step FROM FundraiserEvents")
+    
+    def fundraiser_events(self, after, missing=(), limit=1000):
+        """Outbox rows after event id ``after``, plus any of the ids in ``missing``
+        that have committed since, oldest first"""
+        query = "SELECT event_id, fundraiser_no, kind, ref_id FROM FundraiserEvents WHERE event_id > %s"
+        params = [after]
+        if missing:
+            query += f" OR event_id IN ({', '.join(['%s'] * len(missing))})"
+            params.extend(missing)
+        return self.fetch_all(query + " ORDER BY event_id LIMIT %s", (*params, limit))
+    
+    def get_live_progress(self, fundraiser_nos):
+        """Progress of each of ``fundraiser_nos``: amounts, status and visit and donation counts"""
+        if not fundraiser_nos:
+            return []
+        return self.fetch_all(f"""
+            SELECT f.fundraiser_no, f.title, f.goal_amount, f.raised_amount, f.remaining_amount, f.status,
+                   ROUND((f.raised_amount / f.goal_amount * 100), 2) as progress,
+                   COALESCE(vs.total_visits, 0) as total_visits,
+                   COALESCE(vs.unique_visitors, 0) as unique_visitors,
+                   COALESCE(ds.total_transactions, 0) as total_transactions
+            FROM Fundraiser f
+            LEFT JOIN FundraiserVisitStats vs ON f.fundraiser_no = vs.fundraiser_no
+            LEFT JOIN FundraiserDonationStats ds ON f.fundraiser_no = ds.fundraiser_no
+            WHERE f.fundraiser_no IN ({', '.join(['%s'] * len(fundraiser_nos))})
+        """, tuple(fundraiser_nos))
+    
+    def get_live_transactions(self, transaction_ids):
+        """The donations ``transaction_ids``, newest first, with the donor's name"""
+        if not transaction_ids:
+            return []
+        return self.fetch_all(f"""
+            SELECT t.Transaction_id, t.fundraiser_no, t.amount, t.platform_fee, t.net_amount, t.payment_mode, t.transaction_date,
+                   d.dname as donor_name
+            FROM Transactions t
+            JOIN Donor d ON t.donor_id = d.donor_id
+            WHERE t.Transaction_id IN ({', '.join(['%s'] * len(transaction_ids))})
+            ORDER BY t.Transaction_id DESC
+        """, tuple(transaction_ids))
+    
+    def sweep_fundraiser_events(self, keep, batch_size=5000):
+        """Delete all but the newest ``keep`` FundraiserEvents rows in batches; returns the count"""
+        if self.shards and _shard.get() is None:
+            results = self.scatter(self.sweep_fundraiser_events, keep, batch_size)
+            failed = next((result for result in results if not result['success']), None)
+            if failed is not None:
+                return failed
+            return {'success': True, 'deleted': sum(result['deleted'] for result in results)}
+        connection = self.get_connection()
+        if connection is None:
+            return {'success': False, 'message': 'Database connection failed'}
+        
+        try:
+            with self._timed(connection, 'transaction', 'sweep_fundraiser_events') as call:
+                cursor = connection.cursor()
+                cursor.execute("SELECT COALESCE(MAX(event_id), 0) FROM FundraiserEvents")
+                cutoff = cursor.fetchone()[0] - keep
+                deleted = 0
+                while cutoff > 0:
+                    # Primary-key ranges from the oldest row: no index on created_at to maintain
+                    cursor.execute("DELETE FROM FundraiserEvents WHERE event_id <= %s ORDER BY event_id LIMIT %s",
+                                   (cutoff, batch_size))
+                    connection.commit()
+                    deleted += cursor.rowcount
+                    if cursor.rowcount < batch_size:
+                        break
+                cursor.close()
+                call.rows = deleted
+            return {'success': True, 'deleted': deleted}
+        except Error as e:
+            return {'success': False, 'message': str(e)}
+        finally:
+            self.release_connection(connection)
+    
+    # ========== SHARD MAINTENANCE ==========
+    
+    def _shard_connection(self, node):
+        with self.on_shard(node):
+            return self.get_connection()
+    
+    def move_fundraiser(self, fundraiser_no, node, batch_size=1000):
+        """Move a fundraiser and all its rows (``SHARD_TABLES``) to shard ``node``.
+
+        The source Fundraiser row stays locked FOR UPDATE throughout, so its
+        donations, payouts and visits wait for the move (and then fail as
+        for a deleted fundraiser, until their process's cached home expires).
+        Rows keep their ids. ``@shard_move`` makes the triggers neither
+        re-count them on the target nor un-count them on the source, so both
+        nodes need ``reconcile_shard`` afterwards (from ``first_day``, for
+        the payment mode rollups). The target commits, then the directory
+        changes, then the source commits: a failure in between leaves the
+        source rows behind as orphans for ``drop_orphans``, never a
+        fundraiser on no node.
+        """
+        source = self.shards.home(fundraiser_no, fresh=True)
+        if not 0 <= node < len(self.shards):
+            return {'success': False, 'message': f'No shard node {node}'}
+        if node == source:
+            return {'success': False, 'message': f'Fundraiser {fundraiser_no} is already on node {node}'}
+        src = self._shard_connection(source)
+        dst = self._shard_connection(node) if src is not None else None
+        if dst is None:
+            if src is not None:
+                self.release_connection(src)
+            return {'success': False, 'message': 'Database connection failed'}
+        
+        try:
+            with self._timed(src, 'transaction', 'move_fundraiser') as call:
+                read, write = src.cursor(), dst.cursor()
+                read.execute("SET @shard_move = 1")
+                write.execute("SET @shard_move = 1")
+                read.execute("SELECT fundraiser_no FROM Fundraiser WHERE fundraiser_no = %s FOR UPDATE",
+                             (fundraiser_no,))
+                if not read.fetchall():
+                    return {'success': False, 'message': f'Fundraiser {fundraiser_no} not found on node {source}'}
+                read.execute("SELECT DATE(MIN(transaction_date)) FROM Transactions WHERE fundraiser_no = %s",
+                             (fundraiser_no,))
+                first_day = read.fetchall()[0][0]
+                
+                moved = {}
+                for table in SHARD_TABLES:
+                    read.execute(f"SELECT * FROM {table} WHERE fundraiser_no = %s", (fundraiser_no,))
+                    insert = (f"INSERT INTO {table} ({', '.join(read.column_names)}) "
+                              f"VALUES ({', '.join(['%s'] * len(read.column_names))})")
+                    moved[table] = 0
+                    while True:
+                        rows = read.fetchmany(batch_size)
+                        if not rows:
+                            break
+                        write.executemany(insert, rows)
+                        moved[table] += len(rows)
+                for table in reversed(SHARD_TABLES):
+                    read.execute(f"DELETE FROM {table} WHERE fundraiser_no = %s", (fundraiser_no,))
+                dst.commit()
+                try:
+                    self.shards.assign(fundraiser_no, node)
+                except Error:
+                    # Still routed to the source: take the copy back off the target
+                    for table in reversed(SHARD_TABLES):
+                        write.execute(f"DELETE FROM {table} WHERE fundraiser_no = %s", (fundraiser_no,))
+                    dst.commit()
+                    raise
+                src.commit()
+                read.close()
+                write.close()
+                call.rows = sum(moved.values())
+            self.invalidate('fundraisers', f"fundraiser:{fundraiser_no}", 'transactions', 'payroll', 'visits',
+                            'stats', 'rollups', 'leaderboards')
+            return {'success': True, 'fundraiser_no': fundraiser_no, 'source': source, 'target': node,
+                    'rows': moved, 'first_day': first_day}
+        except Error as e:
+            return {'success': False, 'message': str(e), 'retryable': e.errno in RETRYABLE_ERRNOS}
+        finally:
+            for connection in (src, dst):
+                try:
+                    reset = connection.cursor()
+                    reset.execute("SET @shard_move = NULL")
+                    reset.close()
+                except Error:
+                    pass
+                self.release_connection(connection)
+    
+    def _delete_shard_rows(self, node, fundraiser_nos=None, tables=SHARD_TABLES):
+        """Delete ``fundraiser_nos``' rows (all rows without) of ``tables`` on
+        shard ``node`` in one transaction, under ``@shard_move``"""
+        connection = self._shard_connection(node)
+        if connection is None:
+            return {'success': False, 'message': 'Database connection failed'}
+        
+        try:
+            with self._timed(connection, 'transaction', 'delete_shard_rows') as call:
+                cursor = connection.cursor()
+                cursor.execute("SET @shard_move = 1")
+                deleted = 0
+                for table in reversed(tables):
+                    if fundraiser_nos is None:
+                        cursor.execute(f"DELETE FROM {table}")
+                    else:
+                        cursor.execute(
+                            f"DELETE FROM {table} WHERE fundraiser_no IN ({', '.join(['%s'] * len(fundraiser_nos))})",
+                            list(fundraiser_nos)
+                        )
+                    deleted += cursor.rowcount
+                connection.commit()
+                cursor.close()
+                call.rows = deleted
+            return {'success': True, 'deleted': deleted}
+        except Error as e:
+            return {'success': False, 'message': str(e)}
+        finally:
+            try:
+                reset = connection.cursor()
+                reset.execute("SET @shard_move = NULL")
+                reset.close()
+            except Error:
+                pass
+            self.release_connection(connection)
+    
+    def _orphans(self, node, directory):
+        """Fundraisers on ``node`` that the directory homes elsewhere"""
+        with self.on_shard(node):
+            rows = self.fetch_all("SELECT fundraiser_no FROM Fundraiser ORDER BY fundraiser_no")
+        return [row['fundraiser_no'] for row in rows if directory.get(row['fundraiser_no'], 0) != node]
+    
+    def drop_orphans(self, node):
+        """Delete the rows of fundraisers left on ``node`` by an interrupted move"""
+        orphans = self._orphans(node, self.shards.directory())
+        if not orphans:
+            return {'success': True, 'fundraisers': [], 'deleted': 0}
+        result = self._delete_shard_rows(node, orphans)
+        if result['success']:
+            result['fundraisers'] = orphans
+        return result
+    
+    def reconcile_shard(self, node, since=None):
+        """Recompute ``node``'s running totals and summaries from its own rows
+        (after moves, which bypass the triggers): donor and administrator
+        totals, summary tables, platform counters and leaderboard buckets,
+        plus the hourly rollups from ``since`` (a date) to today"""
+        with self.on_shard(node):
+            for procedure in ('ReconcileRunningTotals', 'RefreshSummaryTables', 'ReconcilePlatformCounters',
+                              'RebuildLeaderboardBuckets'):
+                result = self.call_procedure(procedure, ())
+                if not result['success']:
+                    return {'success': False, 'message': f"{procedure} on node {node}: {result['message']}"}
+            if since is not None:
+                for day, result in self.rebuild_hourly_stats(since, date.today()):
+                    if not result['success']:
+                        return {'success': False, 'message': f"Hourly rollups for {day} on node {node}: "
+                                                             f"{result['message']}"}
+        self.invalidate('fundraisers', 'donors', 'admins', 'stats', 'rollups', 'leaderboards')
+        return {'success': True}
+    
+    def sync_reference_data(self, node, batch_size=1000):
+        """Copy node 0's donors, administrators and administrator phones to
+        shard ``node`` (new rows inserted, existing ones updated); their
+        running totals there come from ``reconcile_shard``"""
+        copies = (
+            ("SELECT donor_id, dname, demail, dphone, created_at FROM Donor ORDER BY donor_id",
+             "INSERT INTO Donor (donor_id, dname, demail, dphone, created_at) VALUES (%s, %s, %s, %s, %s) "
+             "ON DUPLICATE KEY UPDATE dname = VALUES(dname), demail = VALUES(demail), dphone = VALUES(dphone)"),
+            ("SELECT Admin_id, name, email, created_at FROM Administrator ORDER BY Admin_id",
+             "INSERT INTO Administrator (Admin_id, name, email, created_at) VALUES (%s, %s, %s, %s) "
+             "ON DUPLICATE KEY UPDATE name = VALUES(name), email = VALUES(email)"),
+            ("SELECT A_phone, Admin_id FROM Admins_phone",
+             "INSERT IGNORE INTO Admins_phone (A_phone, Admin_id) VALUES (%s, %s)"),
+        )
+        if node == 0:
+            return {'success': False, 'message': 'Node 0 holds the reference data'}
+        connection = self._shard_connection(node)
+        if connection is None:
+            return {'success': False, 'message': 'Database connection failed'}
+        
+        try:
+            with self._timed(connection, 'transaction', 'sync_reference_data') as call:
+                cursor = connection.cursor()
+                copied = 0
+                with self.primary_reads():
+                    for select, insert in copies:
+                        rows = self.stream_query(select, chunk_size=batch_size, node=0)
+                        next(rows)
+                        for chunk in rows:
+                            cursor.executemany(insert, chunk)
+                            connection.commit()
+                            copied += len(chunk)
+                cursor.close()
+                call.rows = copied
+            self.invalidate('donors', 'admins')
+            return {'success': True, 'rows': copied}
+        except Error as e:
+            return {'success': False, 'message': str(e)}
+        finally:
+            self.release_connection(connection)
+    
+    def init_shard_node(self, node):
+        """Prepare shard ``node`` to receive fundraisers: empty it (including
+        its own donors and administrators, e.g. sample data), copy node 0's
+        reference data and reconcile its totals. Refused while the directory
+        homes any fundraiser there."""
+        if not 0 < node < len(self.shards):
+            return {'success': False, 'message': f'No shard node {node} (node 0 cannot be initialized)'}
+        homed = [no for no, home in self.shards.directory().items() if home == node]
+        if homed:
+            return {'success': False, 'message': f'{len(homed)} fundraisers live on node {node}'}
+        result = self._delete_shard_rows(node, tables=('Administrator', 'Donor') + SHARD_TABLES + (
+            'Leaderboards', 'LeaderboardBuckets', 'PaymentModeHourlyStats'))
+        if not result['success']:
+            return result
+        result = self.sync_reference_data(node)
+        if not result['success']:
+            return result
+        return self.reconcile_shard(node)
+    
+    def plan_rebalance(self):
+        """Moves that even out the number of fundraisers per node: the newest
+        fundraisers of the fullest nodes go to the emptiest. Returns a list
+        of ``(fundraiser_no, source, target)``."""
+        directory = self.shards.directory()
+        held = []
+        for node in range(len(self.shards)):
+            with self.on_shard(node):
+                rows = self.fetch_all("SELECT fundraiser_no FROM Fundraiser ORDER BY fundraiser_no")
+            held.append([row['fundraiser_no'] for row in rows
+                         if directory.get(row['fundraiser_no'], 0) == node])
+        moves = []
+        while True:
+            fullest = max(range(len(held)), key=lambda n: len(held[n]))
+            emptiest = min(range(len(held)), key=lambda n: len(held[n]))
+            if len(held[fullest]) - len(held[emptiest]) < 2:
+                return moves
+            fundraiser_no = held[fullest].pop()
+            held[emptiest].append(fundraiser_no)
+            moves.append((fundraiser_no, fullest, emptiest))
+    
+    def check_shards(self):
+        """Check every shard node: reachable, auto-increment settings that keep
+        ids unique across nodes, fundraisers agreeing with the directory, and
+        the reference data matching node 0. Returns one entry per node with
+        its problems."""
+        directory = self.shards.directory()
+        homed = {}
+        for fundraiser_no, node in directory.items():
+            homed.setdefault(node, set()).add(fundraiser_no)
+        nodes, offsets = [], {}
+        reference = None
+        for node, name in enumerate(self.shards.names):
+            entry = {'node': node, 'name': name, 'problems': []}
+            nodes.append(entry)
+            with self.on_shard(node), self.primary_reads():
+                row = self.fetch_one("""
+                    SELECT @@auto_increment_increment AS increment, @@auto_increment_offset AS offset,
+                           (SELECT COUNT(*) FROM information_schema.PARAMETERS
+                            WHERE SPECIFIC_SCHEMA = DATABASE() AND SPECIFIC_NAME = 'ApplyBulkDonations'
+                              AND PARAMETER_NAME = 'p_step') AS bulk_step,
+                           (SELECT COUNT(*) FROM Fundraiser) AS fundraisers,
+                           (SELECT COUNT(*) FROM Donor) AS donors,
+                           (SELECT COUNT(*) FROM Administrator) AS administrators
+                """)
+                held = {r['fundraiser_no'] for r in self.fetch_all("SELECT fundraiser_no FROM Fundraiser")}
+            if row is None:
+                entry['problems'].append('unreachable')
+                continue
+            entry.update(row)
+            if row['increment'] < len(self.shards):
+                entry['problems'].append(f"auto_increment_increment {row['increment']} is below the "
+                                         f"{len(self.shards)} nodes")
+            if row['increment'] > 1 and not row['bulk_step']:
+                entry['problems'].append("ApplyBulkDonations assumes ids go up by 1; bulk imports fail "
+                                         "until the procedures are reloaded from crowdfundingdb.sql")
+            if row['offset'] in offsets:
+                entry['problems'].append(f"auto_increment_offset {row['offset']} is also node "
+                                         f"{offsets[row['offset']]}'s")
+            offsets.setdefault(row['offset'], node)
+            orphans = sorted(no for no in held if directory.get(no, 0) != node)
+            missing = sorted(homed.get(node, set()) - held)
+            if orphans:
+                entry['problems'].append(f"{len(orphans)} fundraisers homed elsewhere (drop with --cleanup): "
+                                         f"{orphans[:10]}")
+            if missing:
+                entry['problems'].append(f"{len(missing)} fundraisers routed here but missing: {missing[:10]}")
+            if node == 0:
+                reference = row
+            elif reference is not None:
+                for column in ('donors', 'administrators'):
+                    if row[column] != reference[column]:
+                        entry['problems'].append(f"{row[column]} {column}, node 0 has {reference[column]} "
+                                                 f"(copy with --sync-node)")
+        return {'success': True, 'nodes': nodes,
+                'ok': all(not entry['problems'] for entry in nodes)}
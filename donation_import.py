@@ -0,0 +1,157 @@
+import csv
+import io
+import itertools
+import json
+import time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+CENT = Decimal('0.01')
+MAX_AMOUNT = Decimal('9999999999.99')  # DECIMAL(12,2)
+FORMATS = ('csv', 'ndjson', 'json')
+
+
+def platform_fee(amount):
+    """1% platform fee, rounded like CalculatePlatformFee()"""
+    return (amount * CENT).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def read_donations(stream, fmt):
+    """Yield (row_number, record) pairs from a text stream.
+
+    ``csv`` needs a header row (donor_id, fundraiser_no, amount,
+    payment_mode and optionally transaction_date); ``ndjson`` is one JSON
+    object per line. Both are read lazily. ``json`` is a single array and
+    is loaded whole. Row numbers count data rows from 1. A line that
+    cannot be decoded is yielded as a string error message instead of a dict.
+    """
+    if fmt == 'csv':
+        for number, record in enumerate(csv.DictReader(stream), start=1):
+            yield number, record
+    elif fmt == 'ndjson':
+        number = 0
+        for line in stream:
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                yield number, json.loads(line)
+            except ValueError as e:
+                yield number, f'Invalid JSON: {e}'
+    elif fmt == 'json':
+        records = json.load(stream)
+        if not isinstance(records, list):
+            raise ValueError('Expected a JSON array of donations')
+        yield from enumerate(records, start=1)
+    else:
+        raise ValueError(f"Unknown format '{fmt}' (expected one of {', '.join(FORMATS)})")
+
+
+def parse_donation(record):
+    """Validate one raw record; raises ValueError with a per-row message"""
+    if isinstance(record, str):
+        raise ValueError(record)
+    if not isinstance(record, dict):
+        raise ValueError('Expected an object with donor_id, fundraiser_no, amount and payment_mode')
+    try:
+        donor_id = int(record.get('donor_id'))
+        fundraiser_no = int(record.get('fundraiser_no'))
+    except (TypeError, ValueError):
+        raise ValueError('donor_id and fundraiser_no must be integers')
+    try:
+        amount = Decimal(str(record.get('amount')).strip())
+    except InvalidOperation:
+        raise ValueError('Amount must be a number')
+    if not amount.is_finite() or amount <= 0:
+        raise ValueError('Amount must be greater than 0')
+    if amount > MAX_AMOUNT or amount != amount.quantize(CENT):
+        raise ValueError('Amount must have at most 2 decimal places and fit DECIMAL(12,2)')
+    payment_mode = str(record.get('payment_mode') or '').strip()
+    if not payment_mode or len(payment_mode) > 50:
+        raise ValueError('payment_mode is required (max 50 characters)')
+
+    transaction_date = record.get('transaction_date') or None
+    if transaction_date is not None:
+        try:
+            transaction_date = datetime.fromisoformat(str(transaction_date).strip())
+        except ValueError:
+            raise ValueError('transaction_date must be ISO formatted (YYYY-MM-DD[ HH:MM:SS])')
+        if transaction_date > datetime.now():
+            raise ValueError('transaction_date cannot be in the future')
+
+    fee = platform_fee(amount)
+    return {
+        'donor_id': donor_id,
+        'fundraiser_no': fundraiser_no,
+        'amount': amount,
+        'platform_fee': fee,
+        'net_amount': amount - fee,
+        'payment_mode': payment_mode,
+        'transaction_date': transaction_date,
+    }
+
+
+def import_donations(db, records, chunk_size=1000, max_errors=1000, retries=3):
+    """Import (row_number, record) pairs in chunks of ``chunk_size``.
+
+    Each chunk is validated and written in one transaction by
+    ``Database.import_donation_chunk``. Invalid rows are reported and
+    skipped without aborting the import. A chunk that fails as a whole
+    (e.g. a lost connection) is retried on deadlock/lock timeout and
+    otherwise reported row by row. At most ``max_errors`` errors are kept;
+    if the input itself becomes unreadable the import stops and the report
+    carries ``aborted``.
+    """
+    start = time.monotonic()
+    report = {'rows': 0, 'imported': 0, 'failed': 0, 'chunks': 0, 'errors': []}
+
+    def fail(row, message):
+        report['failed'] += 1
+        if len(report['errors']) < max_errors:
+            report['errors'].append({'row': row, 'message': message})
+
+    records = iter(records)
+    while True:
+        try:
+            chunk = list(itertools.islice(records, chunk_size))
+        except (ValueError, csv.Error) as e:
+            # Unreadable input: keep what was imported so far and stop
+            report['aborted'] = str(e)
+            break
+        if not chunk:
+            break
+        report['rows'] += len(chunk)
+        report['chunks'] += 1
+
+        donations = []
+        for row, record in chunk:
+            try:
+                donation = parse_donation(record)
+            except ValueError as e:
+                fail(row, str(e))
+                continue
+            donation['row'] = row
+            donations.append(donation)
+
+        for attempt in range(retries):
+            result = db.import_donation_chunk(donations)
+            if result['success'] or not result.get('retryable'):
+                break
+        if not result['success']:
+            for donation in donations:
+                fail(donation['row'], result['message'])
+            continue
+        report['imported'] += result['imported']
+        for error in result['errors']:
+            fail(error['row'], error['message'])
+
+    report['errors'].sort(key=lambda error: error['row'])
+    report['elapsed_seconds'] = round(time.monotonic() - start, 3)
+    return report
+
+
+def import_file(db, stream, fmt, **kwargs):
+    """Import donations from a binary or text stream in the given format"""
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    return import_donations(db, read_donations(stream, fmt), **kwargs)
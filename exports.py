@@ -0,0 +1,59 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def csv_chunks(columns, chunks):
+    """Encode a header row and row chunks as CSV, one string per chunk"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+    for rows in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue()
+
+
+def ndjson_chunks(columns, chunks):
+    """Encode row chunks as newline-delimited JSON objects, one string per chunk"""
+    for rows in chunks:
+        yield ''.join(json.dumps(dict(zip(columns, row)), default=_json_value) + '\n' for row in rows)
+
+
+class ExportStream:
+    """Response body for a ``Database.stream_query`` generator.
+
+    Reads the column names on construction, so the query has started (and
+    any connection or SQL error has been raised) before a response is
+    sent. ``close()``, called by the WSGI server even if the client went
+    away before the first chunk, hands the connection back.
+    """
+
+    def __init__(self, stream, fmt):
+        self.stream = stream
+        columns = next(stream)
+        self.chunks = csv_chunks(columns, stream) if fmt == 'csv' else ndjson_chunks(columns, stream)
+
+    def __iter__(self):
+        return self.chunks
+
+    def close(self):
+        self.chunks.close()
+        self.stream.close()
@@ -0,0 +1,393 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import date, datetime
+from decimal import Decimal
+
+# Newest donations listed in one progress message
+MAX_TRANSACTIONS = 10
+
+Message = namedtuple('Message', 'seq fundraiser_no payload data')
+
+
+class Subscription:
+    def __init__(self, fundraiser_no, seq):
+        self.fundraiser_no = fundraiser_no   # None: every fundraiser (the dashboard)
+        self.seq = seq                       # last message number sent
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class LiveFeed:
+    """Pushes fundraiser progress to Server-Sent Events subscribers.
+
+    Donations and visits append a row to the FundraiserEvents outbox in the
+    same transaction as the write. While anyone is subscribed, one
+    background thread per process reads each shard node's new outbox rows
+    every ``poll_interval`` seconds and turns them into one ``progress``
+    message per watched fundraiser: its current amounts and counts plus the
+    poll's new donations, read with two queries per node however many
+    events there were, so a burst of donations is one message.
+
+    Messages are numbered, encoded once and kept in a ring of the last
+    ``backlog`` that every subscriber reads from. A subscriber that fell
+    behind gets its fundraiser's pending messages merged into one; a
+    reconnecting stream whose Last-Event-ID fell off the ring gets a
+    ``reset`` event (the page reloads). A page's own ``since`` that fell off
+    starts from the oldest message kept instead: the page may be a copy the
+    browser revalidated with a 304, current but rendered long ago. Waiting
+    streams are woken once per publish: through a Condition for threads
+    (the Flask route) and through one asyncio.Event per event loop (the
+    ASGI route), so a loop holding thousands of streams takes one wakeup.
+    """
+
+    def __init__(self, db, poll_interval=0.5, keepalive=15, backlog=1000, max_subscribers=10000,
+                 batch_size=1000, gap_timeout=10):
+        self.db = db
+        self.poll_interval = poll_interval
+        self.keepalive = keepalive
+        self.backlog = backlog
+        self.max_subscribers = max_subscribers
+        self.batch_size = batch_size
+        self.gap_timeout = gap_timeout
+        self._cond = threading.Condition()
+        self._active = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._ring = []            # [Message], oldest first
+        self._seq = 0              # number of the newest message
+        self._by_fundraiser = {}   # fundraiser_no -> deque of its recent message numbers
+        self._watchers = {}        # fundraiser_no (None: all) -> open streams
+        self._subscribers = 0
+        self._loop_events = {}     # event loop -> asyncio.Event set at the next publish
+        self._last = {}            # node -> newest event_id read
+        self._step = {}            # node -> auto_increment_increment
+        self._gaps = {}            # node -> {event_id not yet committed: first missed at}
+        self._published = 0
+        self._rejected = 0
+        self._polls = 0
+        self._events_read = 0
+        self._poll_errors = 0
+        self._last_poll_time = 0.0
+        self._max_poll_time = 0.0
+
+    @property
+    def seq(self):
+        """Number of the newest message; pages pass it back as ``since`` so
+        the stream replays what was published after they were rendered"""
+        with self._cond:
+            return self._seq
+
+    def _ensure_worker(self):
+        # Threads do not survive fork(), so each worker process starts its own
+        if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+            return
+        with self._cond:
+            if self._pid != os.getpid() or not (self._thread and self._thread.is_alive()):
+                self._pid = os.getpid()
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='live-feed', daemon=True)
+                self._thread.start()
+
+    # ---------- subscribers ----------
+
+    def _full(self):
+        with self._cond:
+            if self._subscribers < self.max_subscribers:
+                return False
+            self._rejected += 1
+            return True
+
+    def _subscribe(self, fundraiser_no, since, resume):
+        with self._cond:
+            if self._subscribers >= self.max_subscribers:
+                self._rejected += 1
+                return None
+            self._subscribers += 1
+            self._watchers[fundraiser_no] = self._watchers.get(fundraiser_no, 0) + 1
+            # A number from the future was issued by another process (or
+            # before a restart): start from now
+            seq = since if since is not None and 0 <= since <= self._seq else self._seq
+            if not resume and self._ring:
+                seq = max(seq, self._ring[0].seq - 1)
+            self._active.set()
+        self._ensure_worker()
+        return Subscription(fundraiser_no, seq)
+
+    def _unsubscribe(self, subscription):
+        with self._cond:
+            self._subscribers -= 1
+            remaining = self._watchers.get(subscription.fundraiser_no, 0) - 1
+            if remaining > 0:
+                self._watchers[subscription.fundraiser_no] = remaining
+            else:
+                self._watchers.pop(subscription.fundraiser_no, None)
+            if not self._subscribers:
+                self._active.clear()
+
+    def _take(self, subscription):
+        """The encoded events published since the subscription's last, at most
+        one per fundraiser"""
+        with self._cond:
+            if subscription.seq >= self._seq:
+                return []
+            first = self._ring[0].seq if self._ring else self._seq + 1
+            if subscription.seq < first - 1:
+                subscription.seq = self._seq
+                return [f"id: {self._seq}\nevent: reset\ndata: {{}}\n\n".encode()]
+            if subscription.fundraiser_no is None:
+                messages = self._ring[subscription.seq + 1 - first:]
+            else:
+                messages = [self._ring[seq - first]
+                            for seq in self._by_fundraiser.get(subscription.fundraiser_no, ())
+                            if seq > subscription.seq and seq >= first]
+            subscription.seq = self._seq
+        pending = {}
+        for message in messages:
+            pending.setdefault(message.fundraiser_no, []).append(message)
+        # In publish order, so the stream's last event id is its newest
+        return [self._merge(group) for group in sorted(pending.values(), key=lambda group: group[-1].seq)]
+
+    def _merge(self, messages):
+        if len(messages) == 1:
+            return messages[0].data
+        # The newest amounts and counts, and the donations of all of them
+        payload = dict(messages[-1].payload)
+        payload['transactions'] = [transaction for message in reversed(messages)
+                                   for transaction in message.payload['transactions']][:MAX_TRANSACTIONS]
+        return self._encode(messages[-1].seq, payload)
+
+    @staticmethod
+    def _encode(seq, payload):
+        return f"id: {seq}\nevent: progress\ndata: {json.dumps(payload, default=_json_default)}\n\n".encode()
+
+    def stream(self, fundraiser_no=None, since=None, last_event_id=None):
+        """SSE byte stream of ``fundraiser_no``'s progress (every fundraiser's
+        for None) for a WSGI response, resuming after ``last_event_id`` (a
+        reconnect) or ``since`` (the page's ``seq``), or None when
+        ``max_subscribers`` streams are already open. Blocks a server
+        thread while open."""
+        if self._full():
+            return None
+        resume = last_event_id is not None
+        if resume:
+            since = last_event_id
+
+        # Subscribed on the first read, so a response the server never
+        # starts sending leaves nothing to clean up
+        def generate():
+            subscription = self._subscribe(fundraiser_no, since, resume)
+            if subscription is None:
+                return
+            try:
+                yield f"retry: {int(self.poll_interval * 4000)}\n\n".encode()
+                while not self._stop.is_set():
+                    with self._cond:
+                        if subscription.seq >= self._seq:
+                            self._cond.wait(self.keepalive)
+                    chunks = self._take(subscription)
+                    # The keepalive comment also finds closed connections
+                    yield b''.join(chunks) if chunks else b': keepalive\n\n'
+            finally:
+                self._unsubscribe(subscription)
+        return generate()
+
+    def astream(self, fundraiser_no=None, since=None, last_event_id=None):
+        """``stream()`` as an async generator, for an ASGI response; waiting
+        takes no thread"""
+        if self._full():
+            return None
+        resume = last_event_id is not None
+        if resume:
+            since = last_event_id
+
+        async def generate():
+            subscription = self._subscribe(fundraiser_no, since, resume)
+            if subscription is None:
+                return
+            try:
+                yield f"retry: {int(self.poll_interval * 4000)}\n\n".encode()
+                while not self._stop.is_set():
+                    # Taken before checking, so a publish in between still wakes us
+                    event = self._loop_event()
+                    chunks = self._take(subscription)
+                    if not chunks:
+                        try:
+                            await asyncio.wait_for(event.wait(), self.keepalive)
+                        except asyncio.TimeoutError:
+                            yield b': keepalive\n\n'
+                            continue
+                        chunks = self._take(subscription)
+                    if chunks:
+                        yield b''.join(chunks)
+            finally:
+                self._unsubscribe(subscription)
+        return generate()
+
+    def _loop_event(self):
+        loop = asyncio.get_running_loop()
+        with self._cond:
+            event = self._loop_events.get(loop)
+            if event is None:
+                event = self._loop_events[loop] = asyncio.Event()
+            return event
+
+    def _wake(self, loop):
+        # Runs on ``loop``: streams waiting from now on get a fresh event
+        with self._cond:
+            event = self._loop_events.get(loop)
+            self._loop_events[loop] = asyncio.Event()
+        if event is not None:
+            event.set()
+
+    def _publish(self, payloads):
+        with self._cond:
+            for payload in payloads:
+                self._seq += 1
+                fundraiser_no = payload['fundraiser_no']
+                self._ring.append(Message(self._seq, fundraiser_no, payload, self._encode(self._seq, payload)))
+                recent = self._by_fundraiser.get(fundraiser_no)
+                if recent is None:
+                    recent = self._by_fundraiser[fundraiser_no] = deque(maxlen=32)
+                recent.append(self._seq)
+            if len(self._ring) > 2 * self.backlog:
+                del self._ring[:len(self._ring) - self.backlog]
+                first = self._ring[0].seq
+                for fundraiser_no in [no for no, recent in self._by_fundraiser.items() if recent[-1] < first]:
+                    del self._by_fundraiser[fundraiser_no]
+            self._published += len(payloads)
+            self._cond.notify_all()
+            loops = list(self._loop_events)
+        for loop in loops:
+            try:
+                loop.call_soon_threadsafe(self._wake, loop)
+            except RuntimeError:
+                # Closed loop
+                with self._cond:
+                    self._loop_events.pop(loop, None)
+
+    # ---------- outbox poller ----------
+
+    def _run(self):
+        while not self._stop.is_set():
+            if not self._active.wait(1):
+                # Nobody is listening: skip the backlog when someone is again
+                self._last.clear()
+                self._gaps.clear()
+                continue
+            start = time.monotonic()
+            try:
+                self.poll()
+            except Exception as e:
+                self._poll_errors += 1
+                print(f"Error polling fundraiser events: {e}")
+            elapsed = time.monotonic() - start
+            self._last_poll_time = elapsed
+            self._max_poll_time = max(self._max_poll_time, elapsed)
+            self._stop.wait(self.poll_interval)
+
+    def poll(self):
+        """Read every node's new outbox rows once and publish the watched
+        fundraisers' progress"""
+        with self._cond:
+            watched = set(self._watchers)
+        payloads = []
+        for node in range(len(self.db.shards)):
+            with self.db.on_shard(node), self.db.primary_reads():
+                payloads.extend(self._poll_node(node, None in watched, watched))
+        self._polls += 1
+        if payloads:
+            self._publish(payloads)
+
+    def _poll_node(self, node, everything, watched):
+        db = self.db
+        errors = db.error_count()
+        last = self._last.get(node)
+        if last is None:
+            # First poll: start after the newest event
+            row = db.last_fundraiser_event()
+            if row is not None:
+                self._last[node], self._step[node] = row['event_id'], row['step'] or 1
+            return []
+        now = time.monotonic()
+        gaps = {event_id: seen for event_id, seen in self._gaps.get(node, {}).items()
+                if now - seen < self.gap_timeout}
+        events = db.fundraiser_events(last, sorted(gaps), self.batch_size)
+        if db.error_count() != errors:
+            self._poll_errors += 1
+            return []
+
+        # Ids are handed out at insert but become visible at commit, so a
+        # skipped id may belong to a transaction still running: ask for it
+        # again until gap_timeout (rolled-back inserts never fill theirs)
+        step = self._step.get(node, 1)
+        changed, donations = set(), {}
+        for event in events:
+            event_id = event['event_id']
+            if gaps.pop(event_id, None) is None:
+                if last:
+                    for missing in range(last + step, event_id, step):
+                        gaps[missing] = now
+                last = max(last, event_id)
+            fundraiser_no = event['fundraiser_no']
+            if everything or fundraiser_no in watched:
+                changed.add(fundraiser_no)
+                if event['kind'] == 'donation' and event['ref_id']:
+                    donations.setdefault(fundraiser_no, []).append(event['ref_id'])
+
+        progress = db.get_live_progress(sorted(changed))
+        transaction_ids = [ref_id for ref_ids in donations.values() for ref_id in ref_ids[-MAX_TRANSACTIONS:]]
+        transactions = db.get_live_transactions(transaction_ids)
+        if db.error_count() != errors:
+            # Read the same events again next time
+            self._poll_errors += 1
+            return []
+        self._last[node] = last
+        self._gaps[node] = dict(sorted(gaps.items())[-self.batch_size:])
+        self._events_read += len(events)
+        by_fundraiser = {}
+        for transaction in transactions:
+            by_fundraiser.setdefault(transaction['fundraiser_no'], []).append(transaction)
+        return [dict(row, transactions=by_fundraiser.get(row['fundraiser_no'], [])) for row in progress]
+
+    def stop(self, timeout=5):
+        """Stop the poller and end every open stream (registered with atexit)"""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+            loops = list(self._loop_events)
+        for loop in loops:
+            try:
+                loop.call_soon_threadsafe(self._wake, loop)
+            except RuntimeError:
+                pass
+        if self._thread and self._pid == os.getpid():
+            self._thread.join(timeout)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'subscribers': self._subscribers,
+                'capacity': self.max_subscribers,
+                'rejected': self._rejected,
+                'watched_fundraisers': len([no for no in self._watchers if no is not None]),
+                'watching_all': self._watchers.get(None, 0),
+                'seq': self._seq,
+                'published': self._published,
+                'polls': self._polls,
+                'events_read': self._events_read,
+                'poll_errors': self._poll_errors,
+                'pending_gaps': sum(len(gaps) for gaps in self._gaps.values()),
+                'last_poll_seconds': round(self._last_poll_time, 6),
+                'max_poll_seconds': round(self._max_poll_time, 6),
+            }
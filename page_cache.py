@@ -0,0 +1,160 @@
+import hashlib
+import os
+import threading
+import time
+
+from markupsafe import Markup
+
+from cache import MISS, MemoryCache
+
+
+class PageVersion:
+    """What one render of a page is built from: the invalidation counters of
+    its cache tags (``token``, in ``tags`` order) and the request inputs
+    hashed into ``etag``"""
+
+    def __init__(self, tags, token, etag, last_modified):
+        self.tags = tags
+        self.token = token
+        self.etag = etag
+        self.last_modified = last_modified   # epoch seconds this version was first served
+
+    def versions(self, tags):
+        """The counters of ``tags``, a subset of the page's"""
+        counters = dict(zip(self.tags, self.token))
+        return tuple(counters[tag] for tag in tags)
+
+
+class PageCache:
+    """Versions of rendered pages for HTTP conditional requests, and a cache
+    of rendered page fragments.
+
+    A page's version hashes the invalidation counters of the cache tags its
+    reads carry (``fundraiser:{no}``, ``donor:{id}``, ``stats``...), which
+    ``Database`` write paths already bump for the query cache: it changes
+    whenever one of the page's reads could return something new, and
+    costs no query. The app sends it as a weak ETag and answers a matching
+    If-None-Match with 304. It also hashes the ``ttl`` second time window
+    it falls in: a ``MemoryCache`` does not see other workers' writes, and
+    pages age (days remaining), so no version outlives the window. ``salt``
+    changes with the deployed code and templates.
+
+    Fragments are sections of a page (a table, a card) cached as HTML under
+    the counters of their own tags, so a page whose stats changed still
+    reuses its unchanged transaction table. They live in the query cache
+    and are stored with the counters read before the page's queries, so a
+    render racing a write is never kept; neither is one built from reads
+    that hit a database error. Without a cache (``CACHE_BACKEND=none``)
+    there are no counters: pages are always rendered in full.
+    """
+
+    def __init__(self, db, ttl=60, salt=''):
+        self.db = db
+        self.ttl = ttl
+        self.salt = salt
+        self._started = time.time()
+        self._lock = threading.Lock()
+        self._versions = 0
+        self._not_modified = 0
+        self._fragment_hits = 0
+        self._fragment_misses = 0
+
+    @property
+    def enabled(self):
+        return self.db.cache is not None
+
+    def _hash(self, *parts):
+        salt = self.salt
+        if isinstance(self.db.cache, MemoryCache):
+            # Each process counts its own invalidations
+            salt = f"{salt}:{self._started}:{os.getpid()}"
+        return hashlib.sha1(repr((salt,) + parts).encode()).hexdigest()
+
+    def version(self, tags, *extra):
+        """The current ``PageVersion`` of a page read through ``tags`` and
+        varying with ``extra`` (session or query values), or None without a
+        cache"""
+        cache = self.db.cache
+        if cache is None:
+            return None
+        tags = tuple(tags)
+        token = cache.snapshot(tags)
+        etag = self._hash('page', tags, token, int(time.time() // self.ttl), extra)
+        key = f"pagever:{etag}"
+        first_seen = cache.get(key)
+        if first_seen is MISS:
+            first_seen = int(time.time())
+            cache.set(key, first_seen, self.ttl, tags, token)
+        with self._lock:
+            self._versions += 1
+        return PageVersion(tags, token, etag, first_seen)
+
+    def count_not_modified(self):
+        with self._lock:
+            self._not_modified += 1
+
+    def fragments(self, version, tags_by_name, *extra):
+        """``Fragments`` of one render: ``tags_by_name`` maps each fragment
+        name to its tags (a subset of the version's), ``extra`` are the
+        inputs they vary with besides the page's data"""
+        return Fragments(self, version, tags_by_name, extra)
+
+    def stats(self):
+        with self._lock:
+            lookups = self._fragment_hits + self._fragment_misses
+            return {
+                'enabled': self.enabled,
+                'ttl': self.ttl,
+                'versions': self._versions,
+                'not_modified': self._not_modified,
+                'fragment_hits': self._fragment_hits,
+                'fragment_misses': self._fragment_misses,
+                'fragment_hit_ratio': round(self._fragment_hits / lookups, 4) if lookups else 0,
+            }
+
+
+class Fragments:
+    """The fragments of one page render, by name. The route leaves out the
+    reads of fragments found cached (``missing``); the template renders
+    the rest through ``render``, which stores them."""
+
+    def __init__(self, page_cache, version, tags_by_name, extra):
+        self.page_cache = page_cache
+        self.html = {}
+        self._keys = {}
+        db = page_cache.db
+        if version is None:
+            return
+        self._errors = db.error_count()
+        for name, tags in tags_by_name.items():
+            tags = tuple(tags)
+            token = version.versions(tags)
+            self._keys[name] = (f"fragment:{name}:{page_cache._hash('fragment', name, tags, token, extra)}",
+                                tags, token)
+        # A cached fragment may have been filled from a replica that has not
+        # applied this session's last write yet
+        if db.reading_own_writes():
+            return
+        for name, (key, _, _) in self._keys.items():
+            html = db.cache.get(key)
+            if html is not MISS:
+                self.html[name] = html
+        with page_cache._lock:
+            page_cache._fragment_hits += len(self.html)
+            page_cache._fragment_misses += len(self._keys) - len(self.html)
+
+    def missing(self, **calls):
+        """The ``gather`` calls, named like the fragments they feed, whose
+        fragment has to be rendered"""
+        return {name: call for name, call in calls.items() if name not in self.html}
+
+    def render(self, name, caller):
+        html = self.html.get(name)
+        if html is not None:
+            return Markup(html)
+        html = str(caller())
+        db = self.page_cache.db
+        if name in self._keys and db.cache is not None and db.error_count() == self._errors:
+            key, tags, token = self._keys[name]
+            db.cache.set(key, html, self.page_cache.ttl, tags, token)
+        return Markup(html)
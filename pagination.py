@@ -0,0 +1,52 @@
+import base64
+import json
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(values):
+    """Encode the sort-key values of a boundary row into an opaque URL-safe token"""
+    raw = json.dumps([str(value) for value in values]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor token; returns None for missing or malformed cursors"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list):
+        return None
+    return values
+
+
+def clamp_page_size(limit):
+    if not limit or limit < 1:
+        return DEFAULT_PAGE_SIZE
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def keyset_condition(columns, operator):
+    """Build ``(a, b) < (x, y)`` as an index-friendly OR chain.
+
+    ``columns`` are compared lexicographically, so for two columns this
+    yields ``a < %s OR (a = %s AND b < %s)``. Returns the SQL fragment and
+    a function mapping the cursor values to the matching parameter list.
+    """
+    clauses = []
+    for i, column in enumerate(columns):
+        equal = [f"{c} = %s" for c in columns[:i]]
+        clauses.append('(' + ' AND '.join(equal + [f"{column} {operator} %s"]) + ')')
+
+    def params(values):
+        expanded = []
+        for i in range(len(columns)):
+            expanded.extend(values[:i + 1])
+        return expanded
+
+    return '(' + ' OR '.join(clauses) + ')', params
@@ -0,0 +1,260 @@
+import contextlib
+import functools
+import hashlib
+import json
+import re
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Frames skipped when naming the Database method a statement belongs to
+PLUMBING = frozenset({
+    'start', 'observe_acquire', 'get_connection', 'execute_query', 'execute_procedure',
+    'call_procedure', 'fetch_procedure_one', 'fetch_procedure_all', 'fetch_all', 'fetch_one',
+    'stream_query', 'fetch_page', '_run', '_timed',
+})
+
+_STRINGS = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDERS = re.compile(r"%s|%\(\w+\)s")
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ROWS = re.compile(r"(\((?:[^()]|\([^()]*\))*\))(?:\s*,\s*\1)+")
+_SPACE = re.compile(r"\s+")
+_EXPLAINABLE = ('SELECT', 'WITH', 'UPDATE', 'DELETE')
+
+
+@functools.lru_cache(maxsize=4096)
+def fingerprint(statement):
+    """``(id, normalized text)`` of a SQL statement.
+
+    Literals and placeholders become ``?``, IN lists and multi-row VALUES
+    collapse to one entry, so the same query with different arguments or
+    batch sizes shares a fingerprint.
+    """
+    text = _STRINGS.sub('?', statement)
+    text = _PLACEHOLDERS.sub('?', text)
+    text = _NUMBERS.sub('?', text)
+    text = _SPACE.sub(' ', text).strip()
+    text = _LISTS.sub('(?+)', text)
+    text = _ROWS.sub(r'\1, ...', text)
+    return hashlib.sha1(text.encode()).hexdigest()[:12], text
+
+
+def caller():
+    """Name of the nearest function on the stack that is not query plumbing"""
+    frame = sys._getframe(1)
+    while frame is not None and (frame.f_code.co_name in PLUMBING
+                                 or frame.f_code.co_filename == contextlib.__file__):
+        frame = frame.f_back
+    return frame.f_code.co_name if frame is not None else 'unknown'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+
+class QueryCall:
+    """One timed statement: ``rows`` and ``errno`` (``'unknown'`` for errors
+    without one) are filled in by the caller, which closes it with ``QueryMetrics.finish``"""
+
+    __slots__ = ('method', 'kind', 'query', 'text', 'statement', 'params', 'started', 'elapsed', 'rows', 'errno')
+
+    def __init__(self, method, kind, query, text, statement, params=None):
+        self.method = method
+        self.kind = kind
+        self.query = query
+        self.text = text
+        self.statement = statement
+        self.params = params
+        self.started = time.perf_counter()
+        self.elapsed = None
+        self.rows = 0
+        self.errno = None
+
+
+class QueryMetrics:
+    """Per-statement latency histograms, row and error counters, and a slow-query log.
+
+    Series are labelled with the calling ``Database`` method, the kind of
+    call (query, procedure, transaction, stream) and the query: the
+    procedure name, or a fingerprint of the SQL whose normalized text is
+    exported once as ``db_query_info``. Statements slower than
+    ``slow_query_ms`` are logged as JSON lines, with their EXPLAIN plan
+    at most once per ``explain_interval`` seconds per query. ``listeners``
+    get ``query(call)`` for every finished statement and
+    ``acquire(method, started, seconds)`` for every connection checkout.
+    """
+
+    def __init__(self, slow_query_ms=500, explain=True, explain_interval=60, log_path=None,
+                 buckets=DEFAULT_BUCKETS, keep_slow=100):
+        self.slow_query_ms = slow_query_ms
+        self.explain = explain
+        self.explain_interval = explain_interval
+        self.log_path = log_path
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._durations = {}       # (method, kind, query) -> Histogram
+        self._acquire = {}         # method -> Histogram
+        self._rows = {}            # (method, kind, query) -> rows
+        self._errors = {}          # (method, kind, query, errno) -> count
+        self._acquire_errors = {}  # method -> count
+        self._statements = {}      # query -> normalized text
+        self._explained = {}       # query -> last EXPLAIN (monotonic)
+        self._slow_count = 0
+        self._slow = deque(maxlen=keep_slow)
+        self.listeners = []
+
+    def _observe(self, histogram, seconds):
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                histogram.counts[i] += 1
+                break
+        histogram.sum += seconds
+        histogram.count += 1
+
+    def start(self, kind, statement, method=None, params=None):
+        """Begin timing ``statement`` (SQL, or a procedure name for kind 'procedure')
+        run with ``params`` on behalf of ``method`` (default: the calling method)"""
+        if kind in ('procedure', 'transaction'):
+            query, text = statement, statement
+        else:
+            query, text = fingerprint(statement)
+            if query not in self._statements:
+                with self._lock:
+                    self._statements[query] = text
+        return QueryCall(method or caller(), kind, query, text, statement, params)
+
+    def finish(self, call):
+        """Record a finished call; True if it was slow and should be logged"""
+        call.elapsed = time.perf_counter() - call.started
+        key = (call.method, call.kind, call.query)
+        with self._lock:
+            histogram = self._durations.get(key)
+            if histogram is None:
+                histogram = self._durations[key] = Histogram(self.buckets)
+            self._observe(histogram, call.elapsed)
+            self._rows[key] = self._rows.get(key, 0) + call.rows
+            if call.errno is not None:
+                error_key = key + (call.errno,)
+                self._errors[error_key] = self._errors.get(error_key, 0) + 1
+        for listener in self.listeners:
+            listener.query(call)
+        # Streams last as long as the client takes to read them
+        return bool(self.slow_query_ms) and call.kind != 'stream' and call.elapsed * 1000 >= self.slow_query_ms
+
+    def observe_acquire(self, seconds, failed=False, method=None):
+        """Record the wait for a pooled connection"""
+        method = method or caller()
+        with self._lock:
+            histogram = self._acquire.get(method)
+            if histogram is None:
+                histogram = self._acquire[method] = Histogram(self.buckets)
+            self._observe(histogram, seconds)
+            if failed:
+                self._acquire_errors[method] = self._acquire_errors.get(method, 0) + 1
+        for listener in self.listeners:
+            listener.acquire(method, time.perf_counter() - seconds, seconds)
+
+    def should_explain(self, call):
+        """True for a slow SELECT/UPDATE/DELETE not explained in the last ``explain_interval`` seconds"""
+        if not self.explain or call.errno is not None or call.kind not in ('query', 'execute'):
+            return False
+        if not call.statement.lstrip().upper().startswith(_EXPLAINABLE):
+            return False
+        now = time.monotonic()
+        with self._lock:
+            last = self._explained.get(call.query)
+            if last is not None and now - last < self.explain_interval:
+                return False
+            self._explained[call.query] = now
+        return True
+
+    def log_slow(self, call, plan=None):
+        entry = {
+            'time': datetime.now().isoformat(timespec='milliseconds'),
+            'method': call.method,
+            'kind': call.kind,
+            'query': call.query,
+            'duration_ms': round(call.elapsed * 1000, 3),
+            'rows': call.rows,
+            'errno': call.errno,
+            'statement': call.text,
+            'explain': plan,
+        }
+        line = json.dumps(entry, default=str)
+        with self._lock:
+            self._slow_count += 1
+            self._slow.append(entry)
+            if self.log_path:
+                with open(self.log_path, 'a') as log:
+                    log.write(line + '\n')
+        if not self.log_path:
+            print(f"Slow query: {line}")
+
+    def slow_queries(self):
+        """The most recent slow-query log entries, newest first"""
+        with self._lock:
+            return list(reversed(self._slow))
+
+    def _histogram_lines(self, name, label_names, series):
+        for values, histogram in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, histogram.counts):
+                cumulative += count
+                yield f'{name}_bucket{_labels(label_names + ("le",), values + (bound,))} {cumulative}'
+            yield f'{name}_bucket{_labels(label_names + ("le",), values + ("+Inf",))} {histogram.count}'
+            yield f'{name}_sum{_labels(label_names, values)} {histogram.sum:.6f}'
+            yield f'{name}_count{_labels(label_names, values)} {histogram.count}'
+
+    def render(self, gauges=()):
+        """Prometheus text exposition of every series, plus ``gauges``:
+        ``(name, type, help, value)`` tuples for process-level values"""
+        query_labels = ('method', 'kind', 'query')
+        with self._lock:
+            lines = [
+                '# HELP db_query_duration_seconds Statement latency, from execute to the last row fetched',
+                '# TYPE db_query_duration_seconds histogram',
+                *self._histogram_lines('db_query_duration_seconds', query_labels, self._durations),
+                '# HELP db_connection_acquire_seconds Wait for a pooled connection',
+                '# TYPE db_connection_acquire_seconds histogram',
+                *self._histogram_lines('db_connection_acquire_seconds', ('method',),
+                                       {(method,): h for method, h in self._acquire.items()}),
+                '# HELP db_query_rows_total Rows returned (or affected, for writes)',
+                '# TYPE db_query_rows_total counter',
+                *(f'db_query_rows_total{_labels(query_labels, key)} {rows}'
+                  for key, rows in sorted(self._rows.items())),
+                '# HELP db_query_errors_total Statements that raised, by MySQL error number',
+                '# TYPE db_query_errors_total counter',
+                *(f'db_query_errors_total{_labels(query_labels + ("errno",), key)} {count}'
+                  for key, count in sorted(self._errors.items(), key=lambda item: tuple(map(str, item[0])))),
+                '# HELP db_connection_errors_total Failed connection checkouts',
+                '# TYPE db_connection_errors_total counter',
+                *(f'db_connection_errors_total{_labels(("method",), (method,))} {count}'
+                  for method, count in sorted(self._acquire_errors.items())),
+                '# HELP db_slow_queries_total Statements over the slow-query threshold',
+                '# TYPE db_slow_queries_total counter',
+                f'db_slow_queries_total {self._slow_count}',
+                '# HELP db_query_info Normalized SQL text of each query fingerprint',
+                '# TYPE db_query_info gauge',
+                *(f'db_query_info{_labels(("query", "statement"), (query, text))} 1'
+                  for query, text in sorted(self._statements.items())),
+            ]
+        for name, kind, help_text, value in gauges:
+            lines.extend((f'# HELP {name} {help_text}', f'# TYPE {name} {kind}', f'{name} {value}'))
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,291 @@
+import re
+
+# Composite and covering indexes matched to the query shapes in database.py,
+# the views and the read procedures: (table, index, columns). Mirrors the
+# CREATE TABLE statements in crowdfundingdb.sql for databases created
+# before they were added.
+INDEX_PACK = (
+    ('Fundraiser', 'idx_fundraiser_status_deadline', '(status, deadline)'),
+    ('Fundraiser', 'idx_fundraiser_raised', '(raised_amount)'),
+    ('Donor', 'idx_donor_total_donated', '(total_donated)'),
+    ('Transactions', 'idx_trans_donor_fundraiser', '(donor_id, fundraiser_no, amount)'),
+)
+
+# FULLTEXT indexes behind search and typeahead, same shape as INDEX_PACK.
+# InnoDB cannot build one with LOCK=NONE (the first on a table also adds
+# its FTS_DOC_ID column), so writes to the table wait while it builds.
+FULLTEXT_INDEXES = (
+    ('Fundraiser', 'ft_fundraiser_search', '(title, description, fundraiser_owner_name)'),
+    ('Donor', 'ft_donor_search', '(dname, demail)'),
+)
+
+# Plain indexes that duplicate a UNIQUE key and only cost writes
+REDUNDANT_INDEXES = (
+    ('Administrator', 'idx_admin_email'),
+    ('Donor', 'idx_donor_email'),
+)
+
+# Bounded by the shard count, so scanning them is the plan
+SMALL_TABLES = frozenset({'PlatformCounters', 'PlatformCounterShards', 'AdministratorCounterShards'})
+
+# (Database method, arguments by sample id, plan steps it may use); an
+# argument that names no sample id is passed as is. The methods that call a
+# read procedure are covered by PROCEDURE_CHECKS. Keyed, paginated and
+# top-N reads may neither scan a table nor filesort; the unpaginated
+# whole-table lists read every row anyway.
+METHOD_CHECKS = (
+    ('get_dashboard_stats', {}, ()),
+    ('get_recent_transactions', {}, ()),
+    ('get_top_fundraisers', {}, ()),
+    ('get_top_donors', {}, ()),
+    ('get_leaderboard', {'board': 'donor'}, ()),
+    ('get_leaderboard', {'board': 'fundraiser'}, ()),
+    ('get_leaderboard', {'board': 'donor', 'period': '7d'}, ()),
+    ('get_leaderboard', {'board': 'fundraiser', 'period': '7d'}, ()),
+    ('get_active_fundraisers', {}, ()),
+    ('get_administrator', {'admin_id': 'admin_id'}, ()),
+    ('get_administrator_payrolls', {'admin_id': 'admin_id'}, ()),
+    ('get_donor', {'donor_id': 'donor_id'}, ()),
+    ('get_donor_transactions', {'donor_id': 'donor_id'}, ()),
+    ('get_donor_visits', {'donor_id': 'donor_id'}, ()),
+    ('get_fundraiser', {'fundraiser_no': 'fundraiser_no'}, ()),
+    ('get_fundraiser_transactions', {'fundraiser_no': 'fundraiser_no'}, ()),
+    ('get_fundraiser_payrolls', {'fundraiser_no': 'fundraiser_no'}, ()),
+    ('get_fundraiser_visits', {'fundraiser_no': 'fundraiser_no'}, ()),
+    ('get_visit', {'visit_id': 'visit_id'}, ()),
+    ('get_donors_page', {}, ()),
+    ('get_fundraisers_page', {}, ()),
+    ('get_fundraisers_page', {'status': 'status'}, ()),
+    ('get_fundraisers_page', {'admin_id': 'admin_id'}, ()),
+    ('get_transactions_page', {}, ()),
+    ('get_transactions_page', {'fundraiser_no': 'fundraiser_no'}, ()),
+    ('get_transactions_page', {'donor_id': 'donor_id'}, ()),
+    ('get_transactions_page', {'payment_mode': 'payment_mode'}, ()),
+    ('get_payroll_page', {}, ()),
+    ('get_payroll_page', {'fundraiser_no': 'fundraiser_no'}, ()),
+    ('get_payroll_page', {'admin_id': 'admin_id'}, ()),
+    ('get_visits_page', {}, ()),
+    ('get_visits_page', {'fundraiser_no': 'fundraiser_no'}, ()),
+    ('get_visits_page', {'donor_id': 'donor_id'}, ()),
+    ('get_high_interest_donors_view', {}, ()),
+    # Search reads the FULLTEXT index; ranking and facets sort the matches
+    ('search_fundraisers', {'q': 'fund'}, ('filesort',)),
+    ('search_donors', {'q': 'a'}, ('filesort',)),
+    ('suggest', {'q': 'me'}, ('filesort',)),
+    # Trends sort at most one grouped row per hour or day
+    ('get_fundraiser_trend', {'fundraiser_no': 'fundraiser_no', 'date_from': '2025-01-01',
+                              'date_to': '2025-01-30'}, ('filesort',)),
+    ('get_administrator_trend', {'admin_id': 'admin_id', 'date_from': '2025-01-01',
+                                 'date_to': '2025-01-30'}, ('filesort',)),
+    ('get_platform_trend', {'date_from': '2025-01-01', 'date_to': '2025-01-30'}, ('filesort',)),
+    ('get_payment_mode_trend', {'date_from': '2025-01-01', 'date_to': '2025-01-30'}, ('filesort',)),
+    ('get_active_fundraisers_view', {}, ()),
+    ('get_fundraiser_options', {}, ('scan', 'filesort')),
+    ('get_fundraiser_progress', {}, ('scan', 'filesort')),
+    ('get_all_administrators', {}, ('scan', 'filesort')),
+    ('get_all_donors', {}, ('scan', 'filesort')),
+    ('get_all_fundraisers', {}, ('scan', 'filesort')),
+    ('get_all_transactions', {}, ('scan', 'filesort')),
+    ('get_all_payroll', {}, ('scan', 'filesort')),
+    ('get_all_visits', {}, ('scan', 'filesort')),
+    ('get_transaction_summary_view', {}, ('scan', 'filesort')),
+    ('get_donor_engagement_view', {}, ('scan', 'filesort')),
+    ('get_administrator_dashboard_view', {}, ('scan', 'filesort')),
+)
+
+# Read procedures, whose single SELECT is explained from its stored
+# definition: (procedure, arguments by sample id)
+PROCEDURE_CHECKS = (
+    ('GetPlatformStatistics', ()),
+    ('GetAdministratorEarnings', ('admin_id',)),
+    ('GetDonorInterestAnalytics', ('donor_id',)),
+    ('GetDonorHistory', ('donor_id',)),
+    ('ViewDonorVisits', ('donor_id',)),
+    ('GetFundraiserSummary', ('fundraiser_no',)),
+    ('ViewVisitHistory', ('fundraiser_no',)),
+    ('ViewAuditTrail', ('fundraiser_no',)),
+    ('ViewTransactionDetails', ('transaction_id',)),
+)
+
+_SINGLE_SELECT = re.compile(r"^\s*BEGIN\s+((?:SELECT|WITH)\b.*?)\s*;?\s*END\s*$", re.S | re.I)
+
+
+def _existing_indexes(db):
+    rows = db.fetch_all(
+        "SELECT DISTINCT TABLE_NAME AS table_name, INDEX_NAME AS index_name "
+        "FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE()"
+    )
+    return {(row['table_name'], row['index_name']) for row in rows}
+
+
+def migrate_indexes(db, drop_redundant=True):
+    """Add the missing INDEX_PACK indexes (and drop REDUNDANT_INDEXES) online.
+
+    Each change is its own ``ALTER TABLE ... ALGORITHM=INPLACE, LOCK=NONE``,
+    so reads and writes continue while the index builds; indexes already in
+    place are skipped, so it is safe to re-run. Missing FULLTEXT_INDEXES are
+    added with ``LOCK=SHARED`` instead: reads continue, writes wait.
+    """
+    existing = _existing_indexes(db)
+    changes = []
+    for table, name, columns in INDEX_PACK:
+        if (table, name) not in existing:
+            changes.append((f"add {table}.{name} {columns}",
+                            f"ALTER TABLE {table} ADD INDEX {name} {columns}, ALGORITHM=INPLACE, LOCK=NONE"))
+    for table, name, columns in FULLTEXT_INDEXES:
+        if (table, name) not in existing:
+            changes.append((f"add {table}.{name} FULLTEXT {columns}",
+                            f"ALTER TABLE {table} ADD FULLTEXT INDEX {name} {columns}, "
+                            f"ALGORITHM=INPLACE, LOCK=SHARED"))
+    if drop_redundant:
+        for table, name in REDUNDANT_INDEXES:
+            if (table, name) in existing:
+                changes.append((f"drop {table}.{name}",
+                                f"ALTER TABLE {table} DROP INDEX {name}, ALGORITHM=INPLACE, LOCK=NONE"))
+    report = []
+    for description, statement in changes:
+        result = db.execute_query(statement)
+        report.append({'change': description, 'success': result['success'], 'message': result.get('message')})
+        if not result['success']:
+            break
+    return report
+
+
+def sample_ids(db):
+    """Ids to explain the keyed reads with: the busiest fundraiser and donor,
+    the fundraiser's administrator and the newest transaction and visit"""
+    sample = db.fetch_one("""
+        SELECT ds.fundraiser_no, f.Admin_id AS admin_id, f.status,
+               (SELECT donor_id FROM DonorStats ORDER BY total_donations DESC LIMIT 1) AS donor_id,
+               (SELECT MAX(Transaction_id) FROM Transactions) AS transaction_id,
+               (SELECT MAX(visit_id) FROM Visits) AS visit_id,
+               (SELECT payment_mode FROM Transactions ORDER BY Transaction_id DESC LIMIT 1) AS payment_mode
+        FROM FundraiserDonationStats ds
+        JOIN Fundraiser f ON ds.fundraiser_no = f.fundraiser_no
+        ORDER BY ds.total_transactions DESC
+        LIMIT 1
+    """)
+    return sample or {}
+
+
+def plan_problems(plan, allow=()):
+    """Full table scans and filesorts in an EXPLAIN plan that ``allow`` does not permit.
+
+    Materialized derived tables and unions (``<derived2>``, ``<union1,2>``)
+    are skipped: the steps that fill them are checked on their own rows.
+    """
+    problems = []
+    for step in plan:
+        if 'error' in step:
+            problems.append(f"EXPLAIN failed: {step['error']}")
+            continue
+        table = step.get('table') or ''
+        if table.startswith('<') or table in SMALL_TABLES:
+            continue
+        if step.get('type') == 'ALL' and 'scan' not in allow:
+            problems.append(f"full scan of {table} (~{step.get('rows')} rows)")
+        if 'Using filesort' in (step.get('Extra') or '') and 'filesort' not in allow:
+            problems.append(f"filesort on {table}")
+    return problems
+
+
+def procedure_statement(db, name, args):
+    """The single SELECT of a stored procedure, with its parameters as ``%s``
+    placeholders, and the argument for each; ``(None, None)`` if the
+    definition is not readable or is not a single SELECT"""
+    row = db.fetch_one(
+        "SELECT ROUTINE_DEFINITION AS body FROM information_schema.ROUTINES "
+        "WHERE ROUTINE_SCHEMA = DATABASE() AND ROUTINE_TYPE = 'PROCEDURE' AND ROUTINE_NAME = %s",
+        (name,)
+    )
+    match = _SINGLE_SELECT.match((row or {}).get('body') or '')
+    if match is None:
+        return None, None
+    statement = match.group(1)
+    names = [param['name'] for param in db.fetch_all(
+        "SELECT PARAMETER_NAME AS name FROM information_schema.PARAMETERS "
+        "WHERE SPECIFIC_SCHEMA = DATABASE() AND SPECIFIC_NAME = %s AND PARAMETER_MODE IS NOT NULL "
+        "ORDER BY ORDINAL_POSITION",
+        (name,)
+    )]
+    if not names:
+        return statement, ()
+    values = dict(zip(names, args))
+    params = []
+
+    def placeholder(parameter):
+        params.append(values.get(parameter.group(0)))
+        return '%s'
+    pattern = r'\b(?:' + '|'.join(map(re.escape, names)) + r')\b'
+    return re.sub(pattern, placeholder, statement.replace('%', '%%')), tuple(params)
+
+
+class _Recorder:
+    """QueryMetrics listener keeping the SELECTs a Database method runs"""
+
+    def __init__(self):
+        self.calls = []
+
+    def query(self, call):
+        if call.kind == 'query':
+            self.calls.append((call.statement, call.params))
+
+    def acquire(self, method, started, seconds):
+        pass
+
+
+def _explain(db, statement, params):
+    connection = db.get_connection()
+    if connection is None:
+        return [{'error': 'Database connection failed'}]
+    try:
+        return db._explain(connection, statement, params)
+    finally:
+        db.release_connection(connection)
+
+
+def _entry(db, name, statement, params, allow=()):
+    plan = _explain(db, statement, params)
+    return {'name': name, 'statement': statement, 'plan': plan, 'problems': plan_problems(plan, allow)}
+
+
+def check_plans(db, sample=None):
+    """EXPLAIN every statement of METHOD_CHECKS and PROCEDURE_CHECKS.
+
+    Each method is run once with the result cache bypassed, recording the
+    statements it sends; each is then explained with the same parameters.
+    Returns one ``{name, statement, plan, problems}`` entry per statement.
+    Plans depend on table statistics: run it against a realistically sized
+    database (``flask --app app seed-benchmark``), not an empty one.
+    """
+    sample = sample if sample is not None else sample_ids(db)
+    report = []
+    recorder = _Recorder()
+    cache, db.cache = db.cache, None
+    db.metrics.listeners.append(recorder)
+    try:
+        for method, args, allow in METHOD_CHECKS:
+            kwargs = {name: sample.get(key, key) for name, key in args.items()}
+            name = method + (f"({', '.join(f'{arg}={value!r}' for arg, value in kwargs.items())})" if kwargs else '')
+            del recorder.calls[:]
+            getattr(db, method)(**kwargs)
+            if not recorder.calls:
+                report.append({'name': name, 'statement': None, 'plan': [],
+                               'problems': ['no statement recorded (did the query fail?)']})
+            seen = set()
+            for statement, params in recorder.calls:
+                if statement not in seen:
+                    seen.add(statement)
+                    report.append(_entry(db, name, statement, params, allow))
+    finally:
+        db.metrics.listeners.remove(recorder)
+        db.cache = cache
+
+    for name, args in PROCEDURE_CHECKS:
+        statement, params = procedure_statement(db, name, [sample.get(key) for key in args])
+        if statement is None:
+            report.append({'name': name, 'statement': None, 'plan': [],
+                           'problems': ['definition not readable or not a single SELECT']})
+        else:
+            report.append(_entry(db, name, statement, params))
+    return report
@@ -0,0 +1,157 @@
+import itertools
+import threading
+import time
+
+from mysql.connector import Error
+
+from connection_pool import ConnectionPool
+
+# MySQL error for a statement the server does not know (SHOW REPLICA STATUS before 8.0.22)
+PARSE_ERRNO = 1064
+
+
+class Replica:
+    """One read replica: its connection pool and the result of its last health check"""
+
+    def __init__(self, name, pool):
+        self.name = name
+        self.pool = pool
+        self.healthy = True   # until the first check says otherwise
+        self.lag = None       # seconds behind the primary at the last check
+        self.error = None
+        self.checked_at = None
+        self.lock = threading.Lock()
+
+
+class ReplicaSet:
+    """Read replicas of the primary, each with its own ``ConnectionPool``.
+
+    ``acquire`` hands out a connection to a healthy replica, round robin,
+    or None when no replica can serve the read (the caller then reads the
+    primary). A replica is healthy while its last check found it
+    replicating at most ``max_lag`` seconds behind. Each replica is checked
+    at most every ``check_interval`` seconds, by the first read that finds
+    its check stale; a failed check or checkout takes it out of rotation
+    until a later check passes. ``gtid`` (the primary's executed GTID set
+    after a session's write) restricts the read to replicas that have
+    applied it.
+    """
+
+    def __init__(self, hosts, max_lag=5, check_interval=5, pool_size=10, max_lifetime=1800,
+                 timeout=10, health_check_interval=30, **connect_args):
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.replicas = []
+        for host in hosts:
+            host, _, port = host.strip().partition(':')
+            pool = ConnectionPool(pool_size=pool_size, max_lifetime=max_lifetime, timeout=timeout,
+                                  health_check_interval=health_check_interval,
+                                  host=host, port=int(port or 3306), **connect_args)
+            self.replicas.append(Replica(f"{host}:{port or 3306}", pool))
+        self._next = itertools.count()
+
+    def __bool__(self):
+        return bool(self.replicas)
+
+    def owner(self, connection):
+        """The pool a checked-out replica connection came from, or None"""
+        for replica in self.replicas:
+            if replica.pool.owns(connection):
+                return replica.pool
+        return None
+
+    def check(self, replica):
+        """Read the replica's replication status and update its health"""
+        try:
+            connection = replica.pool.acquire()
+        except Error as e:
+            self._mark_down(replica, e)
+            return
+        try:
+            cursor = connection.cursor(dictionary=True)
+            try:
+                cursor.execute("SHOW REPLICA STATUS")
+            except Error as e:
+                if e.errno != PARSE_ERRNO:
+                    raise
+                cursor.execute("SHOW SLAVE STATUS")
+            status = cursor.fetchone()
+            cursor.fetchall()
+            cursor.close()
+        except Error as e:
+            replica.pool.release(connection)
+            self._mark_down(replica, e)
+            return
+        replica.pool.release(connection)
+
+        replica.checked_at = time.monotonic()
+        if status is None:
+            replica.healthy, replica.lag, replica.error = False, None, 'not configured as a replica'
+            return
+        lag = status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+        if lag is None:
+            replica.healthy, replica.lag, replica.error = False, None, 'replication is stopped'
+        else:
+            replica.lag = lag
+            replica.healthy = lag <= self.max_lag
+            replica.error = None if replica.healthy else f'{lag}s behind the primary'
+
+    def check_all(self):
+        for replica in self.replicas:
+            with replica.lock:
+                self.check(replica)
+        return self.stats()
+
+    def _mark_down(self, replica, error):
+        replica.healthy = False
+        replica.error = str(error)
+        replica.checked_at = time.monotonic()
+
+    def _usable(self, replica):
+        stale = replica.checked_at is None or time.monotonic() - replica.checked_at >= self.check_interval
+        # One thread re-checks; the others go by the last result meanwhile
+        if stale and replica.lock.acquire(blocking=False):
+            try:
+                self.check(replica)
+            finally:
+                replica.lock.release()
+        return replica.healthy
+
+    def _applied(self, connection, gtid):
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT GTID_SUBSET(%s, @@GLOBAL.gtid_executed)", (gtid,))
+            applied = cursor.fetchone()[0]
+            cursor.close()
+            return bool(applied)
+        except Error:
+            return False
+
+    def acquire(self, gtid=None):
+        """A connection to a healthy replica (that has applied ``gtid``), or None"""
+        start = next(self._next)
+        for i in range(len(self.replicas)):
+            replica = self.replicas[(start + i) % len(self.replicas)]
+            if not self._usable(replica):
+                continue
+            try:
+                connection = replica.pool.acquire()
+            except Error as e:
+                self._mark_down(replica, e)
+                continue
+            if gtid and not self._applied(connection, gtid):
+                replica.pool.release(connection)
+                continue
+            return connection
+        return None
+
+    def stats(self):
+        now = time.monotonic()
+        return [{
+            'replica': replica.name,
+            'healthy': replica.healthy,
+            'lag_seconds': replica.lag,
+            'error': replica.error,
+            'checked_seconds_ago': round(now - replica.checked_at, 3) if replica.checked_at is not None else None,
+            'pool': replica.pool.stats(),
+        } for replica in self.replicas]
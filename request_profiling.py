@@ -0,0 +1,220 @@
+import contextvars
+import itertools
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+from flask import before_render_template, g, request, template_rendered
+
+_current = contextvars.ContextVar('request_trace', default=None)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class RequestTrace:
+    """Time split of one request; with ``spans`` it also keeps the span tree.
+
+    Database time is the sum of the request's statements and pool waits,
+    on every thread (``Database.gather`` runs some in parallel), so it can
+    exceed the wall time of a page that overlaps its queries.
+    """
+
+    def __init__(self, route, method, path, spans=False):
+        self.id = uuid.uuid4().hex[:16] if spans else None
+        self.route = route
+        self.method = method
+        self.path = path
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.thread = threading.get_ident()
+        self.elapsed = None
+        self.status = None
+        self.db_seconds = 0.0
+        self.render_seconds = 0.0
+        self.queries = 0
+        self.spans = [] if spans else None   # [(name, category, started, elapsed, thread, args)]
+        self._lock = threading.Lock()
+        self._rendering = []
+
+    @property
+    def name(self):
+        return f"{self.method} {self.route}"
+
+    def add(self, name, category, started, elapsed, args=None):
+        with self._lock:
+            if category == 'render':
+                self.render_seconds += elapsed
+            else:
+                self.db_seconds += elapsed
+                self.queries += category == 'db'
+            if self.spans is not None:
+                self.spans.append((name, category, started, elapsed, threading.get_ident(), args or {}))
+
+    def chrome_trace(self):
+        """Chrome trace-event JSON (chrome://tracing, Perfetto, speedscope)"""
+        pid = os.getpid()
+        events = [{
+            'name': self.name, 'cat': 'request', 'ph': 'X', 'ts': 0,
+            'dur': round(self.elapsed * 1e6), 'pid': pid, 'tid': self.thread,
+            'args': {'path': self.path, 'status': self.status},
+        }]
+        for name, category, started, elapsed, thread, args in self.spans:
+            events.append({
+                'name': name, 'cat': category, 'ph': 'X',
+                'ts': round((started - self.started) * 1e6), 'dur': round(elapsed * 1e6),
+                'pid': pid, 'tid': thread, 'args': args,
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms',
+                'otherData': {'id': self.id, 'started_at': self.started_at}}
+
+    def folded(self):
+        """Collapsed stacks (``frame;frame weight_us`` per line) for flamegraph.pl and speedscope"""
+        weights = OrderedDict()
+        for name, category, started, elapsed, thread, args in self.spans:
+            frames = [self.name, name]
+            if args.get('query'):
+                frames.append(args['query'])
+            stack = ';'.join(frame.replace(';', ',').replace('\n', ' ') for frame in frames)
+            weights[stack] = weights.get(stack, 0) + round(elapsed * 1e6)
+        python = round(max(self.elapsed - self.db_seconds - self.render_seconds, 0) * 1e6)
+        weights[f"{self.name};python"] = python
+        return ''.join(f"{stack} {weight}\n" for stack, weight in weights.items())
+
+
+class RequestProfiler:
+    """Per-route latency percentiles and opt-in span trees for the Flask app.
+
+    Every request is timed and split into database, template rendering
+    and remaining (Python) time; the last ``window`` requests of each route
+    give its p50/p95/p99. Every ``sample_every``-th request, or one sent
+    with ``X-Profile: <header_token>``, also records its span tree (route,
+    Database statements and pool waits, template renders); the last
+    ``keep`` are available as Chrome trace or folded-stack dumps.
+    """
+
+    def __init__(self, sample_every=0, header_token=None, keep=50, window=1000):
+        self.sample_every = sample_every
+        self.header_token = header_token
+        self.window = window
+        self.keep = keep
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+        self._routes = {}                  # route name -> deque[(elapsed, db, render)]
+        self._profiles = OrderedDict()     # id -> RequestTrace
+
+    def init_app(self, app, metrics):
+        metrics.listeners.append(self)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        before_render_template.connect(self._before_render, app, weak=False)
+        template_rendered.connect(self._rendered, app, weak=False)
+
+    def _sampled(self):
+        if self.header_token and request.headers.get('X-Profile') == self.header_token:
+            return True
+        return bool(self.sample_every) and next(self._counter) % self.sample_every == 0
+
+    def _before_request(self):
+        if request.endpoint == 'static':
+            return
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        trace = RequestTrace(route, request.method, request.full_path.rstrip('?'), spans=self._sampled())
+        g.request_trace = trace
+        g.request_trace_token = _current.set(trace)
+
+    def _after_request(self, response):
+        trace = g.get('request_trace')
+        if trace is not None:
+            trace.status = response.status_code
+            if trace.id:
+                response.headers['X-Profile-Id'] = trace.id
+        return response
+
+    def _teardown_request(self, exc):
+        trace = g.pop('request_trace', None)
+        if trace is None:
+            return
+        _current.reset(g.pop('request_trace_token'))
+        trace.elapsed = time.perf_counter() - trace.started
+        if trace.status is None:
+            trace.status = 500
+        with self._lock:
+            samples = self._routes.get(trace.name)
+            if samples is None:
+                samples = self._routes[trace.name] = deque(maxlen=self.window)
+            samples.append((trace.elapsed, trace.db_seconds, trace.render_seconds))
+            if trace.id:
+                self._profiles[trace.id] = trace
+                while len(self._profiles) > self.keep:
+                    self._profiles.popitem(last=False)
+
+    def _before_render(self, sender, template, context, **extra):
+        trace = _current.get()
+        if trace is not None:
+            trace._rendering.append(time.perf_counter())
+
+    def _rendered(self, sender, template, context, **extra):
+        trace = _current.get()
+        if trace is not None and trace._rendering:
+            started = trace._rendering.pop()
+            trace.add(template.name, 'render', started, time.perf_counter() - started)
+
+    # QueryMetrics listener interface
+
+    def query(self, call):
+        trace = _current.get()
+        if trace is not None:
+            trace.add(call.method, 'db', call.started, call.elapsed,
+                      {'kind': call.kind, 'query': call.text, 'rows': call.rows, 'errno': call.errno})
+
+    def acquire(self, method, started, seconds):
+        trace = _current.get()
+        if trace is not None:
+            trace.add(f"{method} (pool wait)", 'pool', started, seconds)
+
+    def route_stats(self):
+        """p50/p95/p99 and the mean time split of each route, slowest p95 first"""
+        with self._lock:
+            routes = {name: list(samples) for name, samples in self._routes.items()}
+        stats = []
+        for name, samples in routes.items():
+            elapsed = sorted(sample[0] for sample in samples)
+            count = len(samples)
+            mean = sum(elapsed) / count
+            db = sum(sample[1] for sample in samples) / count
+            render = sum(sample[2] for sample in samples) / count
+            stats.append({
+                'route': name,
+                'count': count,
+                'p50_ms': round(percentile(elapsed, 0.50) * 1000, 2),
+                'p95_ms': round(percentile(elapsed, 0.95) * 1000, 2),
+                'p99_ms': round(percentile(elapsed, 0.99) * 1000, 2),
+                'mean_ms': round(mean * 1000, 2),
+                'db_ms': round(db * 1000, 2),
+                'render_ms': round(render * 1000, 2),
+                'python_ms': round(max(mean - db - render, 0) * 1000, 2),
+            })
+        return sorted(stats, key=lambda route: route['p95_ms'], reverse=True)
+
+    def profiles(self):
+        """Summaries of the kept span trees, newest first"""
+        with self._lock:
+            traces = list(reversed(self._profiles.values()))
+        return [{
+            'id': trace.id, 'route': trace.name, 'path': trace.path, 'status': trace.status,
+            'started_at': trace.started_at, 'elapsed_ms': round(trace.elapsed * 1000, 2),
+            'db_ms': round(trace.db_seconds * 1000, 2), 'render_ms': round(trace.render_seconds * 1000, 2),
+            'queries': trace.queries,
+        } for trace in traces]
+
+    def get(self, profile_id):
+        with self._lock:
+            return self._profiles.get(profile_id)
@@ -0,0 +1,197 @@
+import functools
+import heapq
+import inspect
+import itertools
+import threading
+import time
+from decimal import Decimal
+
+from mysql.connector import Error
+
+from connection_pool import ConnectionPool
+
+# Tables holding a fundraiser's rows, parents first: the unit a shard move
+# copies (and then deletes in reverse). Donor, Administrator and
+# Admins_phone are reference data present on every node; everything else is
+# a total spanning fundraisers that each node keeps for its own rows.
+SHARD_TABLES = ('Fundraiser', 'Transactions', 'Payroll', 'Visits', 'DonorFundraiserEngagement',
+                'FundraiserVisitStats', 'FundraiserDonationStats', 'FundraiserHourlyStats',
+                'DonationIdempotencyKeys')
+
+
+class ShardMap:
+    """The MySQL nodes the fundraiser-keyed tables are split across, and which
+    node holds each fundraiser.
+
+    Node 0 is the primary (``primary``, the ``Database.pool``); ``hosts``
+    are the other nodes, numbered from 1 in order, each with its own
+    ``ConnectionPool``. Every node runs the full schema. A fundraiser and
+    all its rows (``SHARD_TABLES``) live on one node, its home: the
+    FundraiserShards directory on node 0 lists the home of every fundraiser
+    not on node 0, so an unsharded database needs no directory rows at all.
+    A home is cached per fundraiser for ``refresh`` seconds, which bounds
+    how long another process keeps routing to a node a fundraiser left.
+    """
+
+    def __init__(self, primary, hosts, refresh=5, primary_name='primary', max_cached=100000,
+                 pool_size=10, max_lifetime=1800, timeout=10, health_check_interval=30, **connect_args):
+        self.refresh = refresh
+        self.max_cached = max_cached
+        self.pools = [primary]
+        self.names = [primary_name]
+        for host in hosts:
+            host, _, port = host.strip().partition(':')
+            self.pools.append(ConnectionPool(pool_size=pool_size, max_lifetime=max_lifetime, timeout=timeout,
+                                             health_check_interval=health_check_interval,
+                                             host=host, port=int(port or 3306), **connect_args))
+            self.names.append(f"{host}:{port or 3306}")
+        self._homes = {}   # fundraiser_no -> (node, looked_up_at)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.pools)
+
+    def __bool__(self):
+        return len(self.pools) > 1
+
+    def pool(self, node):
+        return self.pools[node]
+
+    def owner(self, connection):
+        """The pool a checked-out shard node connection came from, or None
+        (node 0's connections belong to the primary pool)"""
+        for pool in self.pools[1:]:
+            if pool.owns(connection):
+                return pool
+        return None
+
+    def _query(self, query, params=()):
+        connection = self.pools[0].acquire()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+            cursor.close()
+            return rows
+        finally:
+            self.pools[0].release(connection)
+
+    def home(self, fundraiser_no, fresh=False):
+        """Node holding ``fundraiser_no`` (0 when the directory has no row for it)"""
+        if len(self.pools) == 1:
+            return 0
+        try:
+            fundraiser_no = int(fundraiser_no)
+        except (TypeError, ValueError):
+            return 0
+        with self._lock:
+            cached = self._homes.get(fundraiser_no)
+        if cached is not None and not fresh and time.monotonic() - cached[1] < self.refresh:
+            return cached[0]
+        try:
+            rows = self._query("SELECT shard_no FROM FundraiserShards WHERE fundraiser_no = %s", (fundraiser_no,))
+        except Error:
+            # Keep routing by the last answer while node 0 is unreachable
+            if cached is not None:
+                return cached[0]
+            raise
+        node = rows[0][0] if rows else 0
+        with self._lock:
+            if len(self._homes) >= self.max_cached:
+                self._homes.clear()
+            self._homes[fundraiser_no] = (node, time.monotonic())
+        return node
+
+    def assign(self, fundraiser_no, node):
+        """Record ``node`` as the home of ``fundraiser_no`` in the directory"""
+        connection = self.pools[0].acquire()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(
+                "INSERT INTO FundraiserShards (fundraiser_no, shard_no) VALUES (%s, %s) "
+                "ON DUPLICATE KEY UPDATE shard_no = VALUES(shard_no)",
+                (fundraiser_no, node)
+            )
+            connection.commit()
+            cursor.close()
+        finally:
+            self.pools[0].release(connection)
+        with self._lock:
+            self._homes[int(fundraiser_no)] = (node, time.monotonic())
+
+    def directory(self):
+        """Every directory entry: ``{fundraiser_no: node}``"""
+        return dict(self._query("SELECT fundraiser_no, shard_no FROM FundraiserShards"))
+
+    def stats(self):
+        with self._lock:
+            cached = len(self._homes)
+        return {
+            'nodes': [{'node': node, 'name': name, 'pool': pool.stats()}
+                      for node, (name, pool) in enumerate(zip(self.names, self.pools))],
+            'cached_homes': cached,
+        }
+
+
+def routed(method):
+    """Run a ``Database`` method on the home node of its ``fundraiser_no`` argument
+    (see ``Database.on_home_shard``); a no-op without shard nodes"""
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if not self.shards:
+            return method(self, *args, **kwargs)
+        fundraiser_no = signature.bind(self, *args, **kwargs).arguments.get('fundraiser_no')
+        with self.on_home_shard(fundraiser_no):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def merge_sorted(results, key=(), reverse=False, limit=None):
+    """Merge per-node row lists, each already sorted on the ``key`` columns
+    (descending for ``reverse``), into one list of at most ``limit`` rows;
+    without ``key`` the lists are concatenated"""
+    if key:
+        rows = heapq.merge(*results, key=lambda row: tuple(row[column] for column in key), reverse=reverse)
+    else:
+        rows = itertools.chain.from_iterable(results)
+    return list(itertools.islice(rows, limit))
+
+
+def sum_rows(rows, first=()):
+    """Add up per-node rows of totals column by column. Columns in ``first``
+    (counts of the reference data every node holds) and non-numeric ones
+    keep the first node's value."""
+    rows = [row for row in rows if row]
+    if not rows:
+        return None
+    total = dict(rows[0])
+    for row in rows[1:]:
+        for column, value in row.items():
+            if column in first or isinstance(value, bool) or not isinstance(value, (int, float, Decimal)):
+                continue
+            total[column] = (total[column] or 0) + value
+    return total
+
+
+def merge_streams(streams, key, chunk_size=1000):
+    """Merge per-node ``Database.stream_query`` generators, each ordered on the
+    ``key`` columns, into one generator of the same shape (column names,
+    then lists of row tuples)"""
+    try:
+        columns = None
+        for stream in streams:
+            columns = next(stream)
+        yield columns
+        index = [columns.index(column) for column in key]
+        rows = heapq.merge(*(itertools.chain.from_iterable(stream) for stream in streams),
+                           key=lambda row: tuple(row[i] for i in index))
+        while True:
+            chunk = list(itertools.islice(rows, chunk_size))
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        for stream in streams:
+            stream.close()
@@ -0,0 +1,147 @@
+import os
+import queue
+import threading
+import time
+
+
+class VisitQueue:
+    """Bounded in-process buffer that writes visits to MySQL in batches.
+
+    ``submit()`` only enqueues; a background thread drains the queue and
+    hands up to ``batch_size`` visits at a time to
+    ``Database.insert_visits_batch`` at least every ``flush_interval``
+    seconds. When the queue is full ``submit()`` waits up to
+    ``put_timeout`` seconds and then rejects the visit, so a slow database
+    pushes back on callers instead of growing memory without bound.
+    """
+
+    def __init__(self, db, max_size=10000, batch_size=500, flush_interval=0.2, put_timeout=0.05):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self._queue = queue.Queue(maxsize=max_size)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._enqueued = 0
+        self._rejected = 0
+        self._flushed = 0
+        self._invalid = 0
+        self._failed = 0
+        self._flushes = 0
+        self._total_flush_time = 0.0
+        self._max_flush_time = 0.0
+        self._last_flush_time = 0.0
+
+    def _ensure_worker(self):
+        # Threads do not survive fork(), so each worker process starts its own
+        if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid != os.getpid() or not (self._thread and self._thread.is_alive()):
+                self._pid = os.getpid()
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='visit-queue', daemon=True)
+                self._thread.start()
+
+    def submit(self, donor_id, fundraiser_no, duration, visit_type='View', block=True):
+        """Queue a visit; returns False if the queue stayed full for ``put_timeout``
+
+        Pass ``block=False`` from an event loop to fail fast instead of waiting.
+        """
+        self._ensure_worker()
+        visit = (donor_id, fundraiser_no, duration, visit_type, time.time())
+        try:
+            self._queue.put(visit, block=block, timeout=self.put_timeout if block else None)
+        except queue.Full:
+            with self._lock:
+                self._rejected += 1
+            return False
+        with self._lock:
+            self._enqueued += 1
+        return True
+
+    def _drain(self, first=None):
+        batch = [first] if first is not None else []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0 and not self._stop.is_set():
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        if not batch:
+            return
+        start = time.monotonic()
+        now = time.time()
+        visits = [(donor_id, fundraiser_no, duration, visit_type, max(0, int(now - queued_at)))
+                  for donor_id, fundraiser_no, duration, visit_type, queued_at in batch]
+        result = self.db.insert_visits_batch(visits)
+        elapsed = time.monotonic() - start
+        with self._lock:
+            self._flushes += 1
+            self._total_flush_time += elapsed
+            self._max_flush_time = max(self._max_flush_time, elapsed)
+            self._last_flush_time = elapsed
+            if result['success']:
+                self._flushed += result.get('inserted', 0)
+                self._invalid += result.get('rejected', 0)
+            else:
+                # With shard nodes, the batch may have been written in part
+                self._flushed += result.get('inserted', 0)
+                self._failed += len(batch) - result.get('inserted', 0)
+        if not result['success']:
+            print(f"Error flushing {len(batch)} visits: {result.get('message')}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            with self._flush_lock:
+                self._write(self._drain(first))
+
+    def flush(self):
+        """Synchronously write everything currently queued"""
+        with self._flush_lock:
+            while not self._queue.empty():
+                batch = []
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                self._write(batch)
+
+    def stop(self, timeout=5):
+        """Stop the worker and flush what is left (registered with atexit)"""
+        self._stop.set()
+        if self._thread and self._pid == os.getpid():
+            self._thread.join(timeout)
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'depth': self._queue.qsize(),
+                'capacity': self._queue.maxsize,
+                'enqueued': self._enqueued,
+                'rejected': self._rejected,
+                'flushed': self._flushed,
+                'invalid': self._invalid,
+                'failed': self._failed,
+                'flushes': self._flushes,
+                'last_flush_seconds': round(self._last_flush_time, 6),
+                'avg_flush_seconds': round(self._total_flush_time / self._flushes, 6) if self._flushes else 0,
+                'max_flush_seconds': round(self._max_flush_time, 6),
+            }